@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark PDF text extraction backends: pages/s and text fidelity.
+
+Usage:
+    python benchmarks/benchmark_pdf_extractors.py [corpus_dir] [--repeat N]
+
+corpus_dir holds *.pdf files; a sibling *.txt with the same name is used as
+ground truth. Without a corpus a sample one is generated with ReportLab.
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from collections import Counter
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.pdf_extractors import EXTRACTORS
+
+WORDS = ("analysis network model traffic learning data results method performance "
+         "accuracy system evaluation research approach feature training baseline").split()
+
+
+def build_sample_corpus():
+    """Generate PDFs with known text so fidelity can be scored exactly"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, PageBreak
+
+    styles = getSampleStyleSheet()
+    corpus = []
+    for pages in (5, 20, 60):
+        paragraphs = []
+        story = []
+        for page in range(pages):
+            for block in range(4):
+                words = [WORDS[(page * 7 + block * 3 + i) % len(WORDS)] for i in range(90)]
+                text = f"Section {page}.{block} " + ' '.join(words) + '.'
+                paragraphs.append(text)
+                story.append(Paragraph(text, styles['Normal']))
+            story.append(PageBreak())
+
+        buffer = BytesIO()
+        SimpleDocTemplate(buffer, pagesize=A4).build(story)
+        corpus.append((f"sample_{pages}p.pdf", buffer.getvalue(), '\n'.join(paragraphs)))
+    return corpus
+
+
+def load_corpus(corpus_dir):
+    corpus = []
+    for name in sorted(os.listdir(corpus_dir)):
+        if not name.lower().endswith('.pdf'):
+            continue
+        with open(os.path.join(corpus_dir, name), 'rb') as f:
+            data = f.read()
+        truth_path = os.path.join(corpus_dir, name[:-4] + '.txt')
+        truth = None
+        if os.path.exists(truth_path):
+            with open(truth_path, encoding='utf-8') as f:
+                truth = f.read()
+        corpus.append((name, data, truth))
+    return corpus
+
+
+def word_fidelity(extracted, truth):
+    """F1 over word multisets, insensitive to line wrapping and column order"""
+    extracted_words = Counter(re.findall(r'\w+', extracted.lower()))
+    truth_words = Counter(re.findall(r'\w+', truth.lower()))
+    total = sum(extracted_words.values()) + sum(truth_words.values())
+    if not total:
+        return 1.0
+    return 2 * sum((extracted_words & truth_words).values()) / total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus_dir', nargs='?')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus_dir) if args.corpus_dir else build_sample_corpus()
+    print(f"Corpus: {len(corpus)} PDFs")
+
+    # Without ground truth, PyPDF2 output is the reference
+    reference = EXTRACTORS['pypdf2']
+    corpus = [(name, data, truth if truth is not None else '\n'.join(reference.extract_pages(data)))
+              for name, data, truth in corpus]
+
+    print(f"{'backend':<12}{'pages':>8}{'pages/s':>12}{'fidelity':>10}")
+    for name, extractor in EXTRACTORS.items():
+        if not extractor.is_available():
+            print(f"{name:<12}{'not installed':>30}")
+            continue
+
+        total_pages = 0
+        best_time = 0.0
+        scores = []
+        for _, data, truth in corpus:
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                pages = extractor.extract_pages(data)
+                timings.append(time.perf_counter() - start)
+            best_time += min(timings)
+            total_pages += len(pages)
+            scores.append(word_fidelity('\n'.join(pages), truth))
+
+        pages_per_second = total_pages / best_time if best_time else float('inf')
+        print(f"{name:<12}{total_pages:>8}{pages_per_second:>12.1f}{sum(scores) / len(scores):>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
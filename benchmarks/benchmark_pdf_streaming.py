@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark standard vs low-memory streaming PDF rendering on long papers.
+
+Usage:
+    python benchmarks/benchmark_pdf_streaming.py [--pages 100 200 400]
+
+Peak Python heap is measured with tracemalloc around each render. Streaming
+mode builds flowables only as layout consumes them and writes every
+CHUNK_PAGES pages to a temporary PDF, then concatenates the chunks one at a
+time, so its peak stays flat as page count grows.
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyPDF2 import PdfReader
+from services.pdf_service import PDFService
+from services.markdown_flowables import flowable_cache
+
+WORDS = ("analysis network model traffic learning data results method performance "
+         "accuracy system evaluation research approach feature training baseline").split()
+# Roughly one IEEE-template page of body text per block
+WORDS_PER_BLOCK = 830
+SECTIONS = ('introduction', 'literature_review', 'methodology', 'results')
+
+
+def build_paper(pages):
+    """Distinct text per paragraph so no render is helped by the conversion cache"""
+    paper = {'title': f'Extended Study ({pages} pages)', 'abstract': 'Synthetic benchmark paper.',
+             'conclusion': 'Done.', 'references': [f'Reference {i}' for i in range(40)]}
+    per_section = max(1, pages // len(SECTIONS))
+    for s, section in enumerate(SECTIONS):
+        blocks = []
+        for b in range(per_section):
+            words = [WORDS[(s * 31 + b * 7 + i) % len(WORDS)] for i in range(WORDS_PER_BLOCK)]
+            blocks.append(f"## Part {b}\n" + f"Block {s}.{b} " + ' '.join(words) + '.')
+        paper[section] = '\n\n'.join(blocks)
+    return paper
+
+
+def measure(render):
+    flowable_cache.clear()
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = render()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, nargs='+', default=[100, 200, 400])
+    args = parser.parse_args()
+
+    service = PDFService()
+    output = os.path.join(tempfile.gettempdir(), 'benchmark_streaming.pdf')
+
+    print(f"{'pages':>6}{'mode':>11}{'seconds':>10}{'peak MB':>10}{'file KB':>10}")
+    for pages in args.pages:
+        paper = build_paper(pages)
+        modes = (
+            ('streaming', lambda: os.path.getsize(service.generate_pdf_streaming(paper, output))),
+            ('standard', lambda: len(service.generate_pdf(paper).getvalue()))
+        )
+        rendered_pages = None
+        for mode, render in modes:
+            elapsed, peak, size = measure(render)
+            rendered_pages = rendered_pages or len(PdfReader(output).pages)
+            print(f"{rendered_pages:>6}{mode:>11}{elapsed:>10.2f}{peak / 1e6:>10.1f}{size / 1e3:>10.0f}")
+
+    if os.path.exists(output):
+        os.remove(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,7 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, send_file
 from blueprints.paper_generator import papers_storage
+from services.markup_export import markup_exporter
+from services.export_service import export_service
 import uuid
 from datetime import datetime
 
@@ -225,11 +227,16 @@ def export_paper_format(paper_id, format_type):
                 'filename': f"paper_{paper_id}.html"
             })
         elif format_type.lower() == 'docx':
-            return jsonify({
-                'success': True,
-                'content': _convert_to_markdown(paper),
-                'filename': f"paper_{paper_id}.docx"
-            })
+            # Binary download, served from the artifact cache when the paper is unchanged
+            key, path = export_service.docx_artifact(paper)
+            return send_file(
+                path,
+                as_attachment=True,
+                download_name=f"paper_{paper_id}.docx",
+                mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+                conditional=True,
+                etag=key
+            )
         else:
             return jsonify({'error': 'Format not supported'}), 400
             
@@ -237,26 +244,7 @@ def export_paper_format(paper_id, format_type):
         return jsonify({'error': str(e)}), 500
 
 def _convert_to_markdown(paper):
-    md_content = f"# {paper.get('title', 'Research Paper')}\n\n"
-    
-    if 'abstract' in paper:
-        md_content += f"## Abstract\n\n{paper['abstract']}\n\n"
-    
-    if 'introduction' in paper:
-        md_content += f"## Introduction\n\n{paper['introduction']}\n\n"
-    
-    if 'literature_review' in paper:
-        md_content += f"## Literature Review\n\n{paper['literature_review']}\n\n"
-    
-    if 'conclusion' in paper:
-        md_content += f"## Conclusion\n\n{paper['conclusion']}\n\n"
-    
-    if 'references' in paper:
-        md_content += "## References\n\n"
-        for i, ref in enumerate(paper['references'], 1):
-            md_content += f"{i}. {ref}\n"
-    
-    return md_content
+    return markup_exporter.to_markdown(paper)
 
 def _convert_to_latex(paper):
     from services.latex_service import LaTeXService
@@ -264,38 +252,4 @@ def _convert_to_latex(paper):
     return latex_service.generate_latex_document(paper, 'article')
 
 def _convert_to_html(paper):
-    html_content = f"""<!DOCTYPE html>
-<html>
-<head>
-    <title>{paper.get('title', 'Research Paper')}</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px; }}
-        h1 {{ color: #333; text-align: center; }}
-        h2 {{ color: #666; border-bottom: 2px solid #eee; }}
-        .abstract {{ background: #f9f9f9; padding: 15px; border-left: 4px solid #007bff; }}
-    </style>
-</head>
-<body>
-    <h1>{paper.get('title', 'Research Paper')}</h1>
-"""
-    
-    if 'abstract' in paper:
-        html_content += f'    <div class="abstract"><h2>Abstract</h2><p>{paper["abstract"]}</p></div>\n'
-    
-    if 'introduction' in paper:
-        html_content += f'    <h2>Introduction</h2><p>{paper["introduction"]}</p>\n'
-    
-    if 'literature_review' in paper:
-        html_content += f'    <h2>Literature Review</h2><p>{paper["literature_review"]}</p>\n'
-    
-    if 'conclusion' in paper:
-        html_content += f'    <h2>Conclusion</h2><p>{paper["conclusion"]}</p>\n'
-    
-    if 'references' in paper:
-        html_content += '    <h2>References</h2><ol>\n'
-        for ref in paper['references']:
-            html_content += f'        <li>{ref}</li>\n'
-        html_content += '    </ol>\n'
-    
-    html_content += '</body></html>'
-    return html_content
\ No newline at end of file
+    return markup_exporter.to_html(paper)
@@ -1,4 +1,8 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, send_file
+from services.chart_store import chart_store
+
+# Chart URLs are content hashes, so a chart never changes once served
+CHART_MAX_AGE = 365 * 24 * 3600
 
 image_bp = Blueprint('image_generator', __name__)
 # image_gen = ImageGenerator() # DISABLED FOR VERCEL DEPLOYMENT
@@ -24,4 +28,21 @@ def get_chart_types():
     else:
         chart_types = ['Performance Analysis', 'Research Trends']
     
-    return jsonify({'chart_types': chart_types})
\ No newline at end of file
+    return jsonify({'chart_types': chart_types})
+
+@image_bp.route('/api/images/charts/<chart_id>.png', methods=['GET'])
+def get_chart(chart_id):
+    """Serve a stored chart PNG"""
+    if not chart_store.exists(chart_id):
+        return jsonify({'error': 'Chart not found'}), 404
+    
+    response = send_file(
+        chart_store.path_for(chart_id),
+        mimetype='image/png',
+        conditional=True,
+        etag=chart_id,
+        max_age=CHART_MAX_AGE
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
@@ -1,11 +1,34 @@
-from flask import Blueprint, request, jsonify
+import base64
+from flask import Blueprint, request, jsonify, send_file
 from services.latex_service import LaTeXService
+from services.latex_compiler import latex_compiler, LaTeXCompileError
+from services.chart_store import chart_store
+from services.export_service import export_service
+from services.render_pool import RenderBusy, RenderTimeout
 from blueprints.paper_generator import papers_storage
 from models.database import db
 
 latex_bp = Blueprint('latex', __name__)
 latex_service = LaTeXService()
 
+def _render_latex(paper_content, template_type):
+    if template_type == 'ieee':
+        return latex_service.generate_ieee_template(paper_content)
+    if template_type == 'acm':
+        return latex_service.generate_acm_template(paper_content)
+    return latex_service.generate_latex_document(paper_content, template_type)
+
+def _figure_assets(paper_content):
+    """Files the generated .tex includes; the IEEE template shows the first chart as figure1.png"""
+    for chart in paper_content.get('charts') or []:
+        path = chart_store.path_for(chart.get('id'))
+        if path and chart_store.exists(chart['id']):
+            with open(path, 'rb') as f:
+                return {'figure1.png': f.read()}
+        if chart.get('image'):
+            return {'figure1.png': base64.b64decode(chart['image'].split(',', 1)[-1])}
+    return {}
+
 @latex_bp.route('/templates', methods=['GET'])
 def get_latex_templates():
     """Get available LaTeX templates"""
@@ -55,14 +78,9 @@ def generate_latex_template(paper_id, template_type):
             return jsonify({'error': 'Paper not found'}), 404
         
         # Generate LaTeX based on template type
-        if template_type == 'ieee':
-            latex_content = latex_service.generate_ieee_template(paper_content)
-        elif template_type == 'acm':
-            latex_content = latex_service.generate_acm_template(paper_content)
-        elif template_type in ['article', 'report']:
-            latex_content = latex_service.generate_latex_document(paper_content, template_type)
-        else:
+        if template_type not in ['ieee', 'acm', 'article', 'report']:
             return jsonify({'error': 'Invalid template type'}), 400
+        latex_content = _render_latex(paper_content, template_type)
         
         return jsonify({
             'success': True,
@@ -117,12 +135,60 @@ def preview_latex_template(paper_id, template_type):
     except Exception as e:
         return jsonify({'error': f'Preview generation failed: {str(e)}'}), 500
 
+@latex_bp.route('/compile/<paper_id>/<template_type>', methods=['GET'])
+def compile_latex_template(paper_id, template_type):
+    """Compile the paper's LaTeX to PDF with the local TeX engine"""
+    try:
+        if template_type not in ['ieee', 'acm', 'article', 'report']:
+            return jsonify({'error': 'Invalid template type'}), 400
+        
+        # Get paper from storage
+        paper_content = papers_storage.get(paper_id)
+        
+        if not paper_content:
+            paper_doc = db.get_paper(paper_id)
+            if paper_doc:
+                paper_content = paper_doc.get('content')
+        
+        if not paper_content:
+            return jsonify({'error': 'Paper not found'}), 404
+        
+        if latex_compiler.available:
+            key, path = latex_compiler.compile(_render_latex(paper_content, template_type), _figure_assets(paper_content))
+            engine = latex_compiler.engine
+        else:
+            # No TeX engine installed: stand in with the ReportLab render of the same paper
+            key, path = export_service.pdf_artifact(paper_content)
+            engine = 'stub'
+        
+        response = send_file(
+            path,
+            as_attachment=True,
+            download_name=f"paper_{paper_id}_{template_type}.pdf",
+            mimetype='application/pdf',
+            conditional=True,
+            etag=key
+        )
+        response.headers['X-LaTeX-Engine'] = engine
+        return response
+        
+    except LaTeXCompileError as e:
+        return jsonify({'error': f'LaTeX compilation failed: {str(e)}', 'log': e.log}), 422
+    except RenderBusy as e:
+        return jsonify({'error': f'LaTeX compiler busy, try again shortly: {str(e)}'}), 503
+    except RenderTimeout as e:
+        return jsonify({'error': f'LaTeX compilation timed out: {str(e)}'}), 504
+    except Exception as e:
+        return jsonify({'error': f'LaTeX compilation failed: {str(e)}'}), 500
+
 @latex_bp.route('/compile-info', methods=['GET'])
 def get_compile_info():
     """Get information about compiling LaTeX documents"""
     return jsonify({
         'success': True,
         'compile_info': {
+            'server_compile_available': latex_compiler.available,
+            'server_engine': latex_compiler.engine or 'stub',
             'recommended_compiler': 'pdflatex',
             'alternative_compilers': ['xelatex', 'lualatex'],
             'required_packages': latex_service.packages,
@@ -1,6 +1,10 @@
 from flask import Blueprint, request, jsonify
 from services.llm_service import LLMService
 from services.citation_service import CitationService
+from services.text_store import full_text_store
+from services.prerender_queue import prerender_queue
+from services.chart_store import chart_store
+from services.plagiarism_service import plagiarism_service
 from models.database import db
 import uuid
 from datetime import datetime
@@ -73,7 +77,8 @@ def generate_paper():
         from services.image_generator import ImageGenerator
         image_gen = ImageGenerator()
         charts = image_gen.generate_research_charts(topic, paper_content)
-        paper_content['charts'] = charts
+        # Stored once as PNG files; the paper keeps only ids and URLs
+        paper_content['charts'] = chart_store.store_charts(charts)
         
         # Generate summary only if LLM service succeeds
         try:
@@ -116,6 +121,14 @@ def generate_paper():
         
         # Always save to memory as backup
         papers_storage[paper_id] = paper_content
+        try:
+            plagiarism_service.index_paper(paper_id, paper_content)
+        except Exception as e:
+            # The paper is already saved; it is indexed again on the next restart
+            print(f"Plagiarism indexing failed for {paper_id}: {e}")
+        
+        # Users usually download right away, so warm the export cache in the background
+        prerender_queue.enqueue(paper_id, paper_content)
         
         return jsonify({
             'success': True,
@@ -176,14 +189,17 @@ def list_papers():
 def delete_paper(paper_id):
     try:
         # Remove from memory
-        if paper_id in papers_storage:
-            del papers_storage[paper_id]
+        paper_content = papers_storage.pop(paper_id, None)
+        full_text_store.delete(paper_id)
+        plagiarism_service.remove_paper(paper_id)
+        prerender_queue.cancel(paper_id, discard=True, paper_content=paper_content)
         
         # Try to remove from database
         if db.db:
             try:
                 from bson import ObjectId
                 db.db.papers.delete_one({'paper_id': paper_id})
+                db.db.full_texts.delete_one({'paper_id': paper_id})
             except:
                 pass
         
@@ -1,15 +1,31 @@
-from flask import Blueprint, request, jsonify, send_file
-from services.pdf_service import PDFService
-from services.latex_service import LaTeXService
+from flask import Blueprint, request, jsonify, send_file, Response, stream_with_context
+from services.export_service import export_service
+from services.pdf_service import PDF_PROFILES
+from services.render_pool import RenderBusy, RenderTimeout
+from services.batch_export import batch_export_manager, BATCH_FORMATS, MAX_BATCH_PAPERS
 from blueprints.paper_generator import papers_storage
 from models.database import db
-import os
-import tempfile
 from datetime import datetime
 
 pdf_bp = Blueprint('pdf', __name__)
-pdf_service = PDFService()
-latex_service = LaTeXService()
+
+def _send_artifact(key, path, filename, mimetype):
+    # ETag is the content key, so unchanged papers get 304s and range requests work
+    return send_file(
+        path,
+        as_attachment=True,
+        download_name=filename,
+        mimetype=mimetype,
+        conditional=True,
+        etag=key
+    )
+
+def _stream_artifact(key, chunks, filename, mimetype):
+    # Sent while still being built, so no length or range support until it is cached
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.set_etag(key)
+    return response
 
 @pdf_bp.route('/export', methods=['POST'])
 def export_pdf():
@@ -18,38 +34,36 @@ def export_pdf():
         paper_data = data.get('paper')
         filename = data.get('filename', f'research_paper_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf')
         include_metadata = data.get('include_metadata', False)
+        profile = data.get('profile', 'standard')
         
         if not paper_data:
             return jsonify({'error': 'Paper data is required'}), 400
-        
-        # Create temporary file
-        temp_dir = tempfile.gettempdir()
-        temp_path = os.path.join(temp_dir, filename)
+        if profile not in PDF_PROFILES:
+            return jsonify({'error': f'Profile must be one of {list(PDF_PROFILES)}'}), 400
         
         # Generate PDF with charts
         if include_metadata and 'plagiarism_check' in paper_data:
-            pdf_buffer = pdf_service.create_with_metadata(paper_data, paper_data['plagiarism_check'])
-            with open(temp_path, 'wb') as f:
-                f.write(pdf_buffer.getvalue())
+            key, path = export_service.pdf_with_metadata_artifact(paper_data, paper_data['plagiarism_check'])
         else:
-            pdf_buffer = pdf_service.generate_pdf(paper_data)
-            with open(temp_path, 'wb') as f:
-                f.write(pdf_buffer.getvalue())
+            key, path = export_service.pdf_artifact(paper_data, profile=profile)
         
         # Return file
-        return send_file(
-            temp_path,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/pdf'
-        )
+        return _send_artifact(key, path, filename, 'application/pdf')
         
+    except RenderBusy as e:
+        return jsonify({'error': f'PDF renderer busy, try again shortly: {str(e)}'}), 503
+    except RenderTimeout as e:
+        return jsonify({'error': f'PDF export timed out: {str(e)}'}), 504
     except Exception as e:
         return jsonify({'error': f'PDF export failed: {str(e)}'}), 500
 
 @pdf_bp.route('/export/<paper_id>', methods=['GET'])
 def export_paper_pdf(paper_id):
     try:
+        profile = request.args.get('profile', 'standard')
+        if profile not in PDF_PROFILES:
+            return jsonify({'error': f'Profile must be one of {list(PDF_PROFILES)}'}), 400
+        
         # Get paper from storage
         paper_content = papers_storage.get(paper_id)
         
@@ -66,25 +80,49 @@ def export_paper_pdf(paper_id):
         safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).rstrip()
         filename = f"{safe_title[:50]}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
         
-        # Create temporary file
-        temp_dir = tempfile.gettempdir()
-        temp_path = os.path.join(temp_dir, filename)
+        # Generate PDF with charts, or serve the cached render
+        key, path = export_service.pdf_artifact(paper_content, profile=profile)
         
-        # Generate PDF with charts
-        pdf_buffer = pdf_service.generate_pdf(paper_content)
-        with open(temp_path, 'wb') as f:
-            f.write(pdf_buffer.getvalue())
-        
-        return send_file(
-            temp_path,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/pdf'
-        )
+        return _send_artifact(key, path, filename, 'application/pdf')
         
+    except RenderBusy as e:
+        return jsonify({'error': f'PDF renderer busy, try again shortly: {str(e)}'}), 503
+    except RenderTimeout as e:
+        return jsonify({'error': f'PDF export timed out: {str(e)}'}), 504
     except Exception as e:
         return jsonify({'error': f'PDF export failed: {str(e)}'}), 500
 
+@pdf_bp.route('/size-report/<paper_id>', methods=['GET'])
+def pdf_size_report(paper_id):
+    try:
+        # Get paper from storage
+        paper_content = papers_storage.get(paper_id)
+        
+        if not paper_content:
+            paper_doc = db.get_paper(paper_id)
+            if paper_doc:
+                paper_content = paper_doc.get('content')
+        
+        if not paper_content:
+            return jsonify({'error': 'Paper not found'}), 404
+        
+        # Both renders land in the artifact cache, so the downloads that follow are instant
+        report = export_service.pdf_size_report(paper_content)
+        
+        return jsonify({
+            'success': True,
+            'paper_id': paper_id,
+            'profiles': {name: dict(settings) for name, settings in PDF_PROFILES.items()},
+            **report
+        })
+        
+    except RenderBusy as e:
+        return jsonify({'error': f'PDF renderer busy, try again shortly: {str(e)}'}), 503
+    except RenderTimeout as e:
+        return jsonify({'error': f'PDF export timed out: {str(e)}'}), 504
+    except Exception as e:
+        return jsonify({'error': f'PDF size report failed: {str(e)}'}), 500
+
 @pdf_bp.route('/preview/<paper_id>', methods=['GET'])
 def preview_pdf_info(paper_id):
     try:
@@ -146,27 +184,15 @@ def export_latex(paper_id):
         if not paper_content:
             return jsonify({'error': 'Paper not found'}), 404
         
-        # Generate LaTeX content
-        latex_content = latex_service.generate_latex_document(paper_content)
+        # Generate LaTeX content, or serve the cached render
+        key, path = export_service.latex_artifact(paper_content)
         
         # Generate filename
         title = paper_content.get('title', 'Research Paper')
         safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).rstrip()
         filename = f"{safe_title[:50]}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.tex"
         
-        # Create temporary file
-        temp_dir = tempfile.gettempdir()
-        temp_path = os.path.join(temp_dir, filename)
-        
-        with open(temp_path, 'w', encoding='utf-8') as f:
-            f.write(latex_content)
-        
-        return send_file(
-            temp_path,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='text/plain'
-        )
+        return _send_artifact(key, path, filename, 'text/plain')
         
     except Exception as e:
         return jsonify({'error': f'LaTeX export failed: {str(e)}'}), 500
@@ -185,57 +211,96 @@ def download_all_files(paper_id):
         if not paper_content:
             return jsonify({'error': 'Paper not found'}), 404
         
-        # Create ZIP file with all formats
-        import zipfile
-        from io import BytesIO
-        
-        zip_buffer = BytesIO()
-        
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            # Add main paper as PDF
-            pdf_buffer = pdf_service.generate_pdf(paper_content)
-            zip_file.writestr('research_paper.pdf', pdf_buffer.getvalue())
-            
-            # Add LaTeX file
-            latex_content = latex_service.generate_latex_document(paper_content)
-            zip_file.writestr('research_paper.tex', latex_content)
-            
-            # Add additional files if available
-            if 'additional_files' in paper_content:
-                files = paper_content['additional_files']
-                
-                if 'bibliography' in files:
-                    zip_file.writestr('bibliography.md', files['bibliography'])
-                
-                if 'research_notes' in files:
-                    zip_file.writestr('research_notes.md', files['research_notes'])
-                
-                if 'abstract_only' in files:
-                    zip_file.writestr('abstract.txt', files['abstract_only'])
-                
-                # Add real papers list
-                if 'real_papers' in paper_content:
-                    import json
-                    papers_json = json.dumps(paper_content['real_papers'], indent=2)
-                    zip_file.writestr('real_papers.json', papers_json)
-        
-        zip_buffer.seek(0)
-        
         # Generate filename
         title = paper_content.get('title', 'Research Paper')
         safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).rstrip()
         filename = f"{safe_title[:30]}_complete_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
         
-        return send_file(
-            BytesIO(zip_buffer.getvalue()),
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/zip'
-        )
+        # Serve the cached package, or render its files now and stream the ZIP entry by entry
+        key, path = export_service.cached_artifact(paper_content, 'zip', '.zip')
+        if path:
+            return _send_artifact(key, path, filename, 'application/zip')
         
+        # Render errors surface here as 503/504, before the response starts
+        chunks = export_service.stream_zip(paper_content)
+        return _stream_artifact(key, chunks, filename, 'application/zip')
+        
+    except RenderBusy as e:
+        return jsonify({'error': f'PDF renderer busy, try again shortly: {str(e)}'}), 503
+    except RenderTimeout as e:
+        return jsonify({'error': f'File download timed out: {str(e)}'}), 504
     except Exception as e:
         return jsonify({'error': f'File download failed: {str(e)}'}), 500
 
+@pdf_bp.route('/export-batch', methods=['POST'])
+def export_batch():
+    try:
+        data = request.get_json()
+        paper_ids = data.get('paper_ids', [])
+        formats = data.get('formats', ['pdf'])
+        
+        if not paper_ids:
+            return jsonify({'error': 'paper_ids is required'}), 400
+        if not isinstance(paper_ids, list) or not all(isinstance(p, str) and p for p in paper_ids):
+            return jsonify({'error': 'paper_ids must be a list of paper id strings'}), 400
+        if not isinstance(formats, list) or not all(isinstance(f, str) for f in formats):
+            return jsonify({'error': 'formats must be a list of format names'}), 400
+        if len(paper_ids) > MAX_BATCH_PAPERS:
+            return jsonify({'error': f'At most {MAX_BATCH_PAPERS} papers per batch'}), 400
+        unknown_formats = [f for f in formats if f not in BATCH_FORMATS]
+        if not formats or unknown_formats:
+            return jsonify({'error': f'Formats must be among {list(BATCH_FORMATS)}'}), 400
+        
+        # Missing papers are reported per item instead of failing the batch
+        papers = []
+        errors = []
+        for paper_id in dict.fromkeys(paper_ids):
+            paper_content = papers_storage.get(paper_id)
+            
+            if not paper_content:
+                paper_doc = db.get_paper(paper_id)
+                if paper_doc:
+                    paper_content = paper_doc.get('content')
+            
+            if paper_content:
+                papers.append({'paper_id': paper_id, 'content': paper_content})
+            else:
+                errors.extend({'paper_id': paper_id, 'format': f, 'error': 'Paper not found'} for f in formats)
+        
+        job_id = batch_export_manager.submit(papers, formats, errors)
+        
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status_url': f'/api/pdf/export-batch/{job_id}',
+            'result_url': f'/api/pdf/export-batch/{job_id}/result'
+        }), 202
+        
+    except Exception as e:
+        return jsonify({'error': f'Batch export failed: {str(e)}'}), 500
+
+@pdf_bp.route('/export-batch/<job_id>', methods=['GET'])
+def export_batch_status(job_id):
+    status = batch_export_manager.status(job_id)
+    if not status:
+        return jsonify({'error': 'Batch job not found'}), 404
+    return jsonify({'success': True, **status})
+
+@pdf_bp.route('/export-batch/<job_id>/result', methods=['GET'])
+def export_batch_result(job_id):
+    try:
+        status = batch_export_manager.status(job_id)
+        if not status:
+            return jsonify({'error': 'Batch job not found'}), 404
+        if status['status'] != 'completed':
+            return jsonify({'error': 'Batch job is still running', **status}), 409
+        
+        filename = f"papers_batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+        return _stream_artifact(job_id, batch_export_manager.stream_result(job_id), filename, 'application/zip')
+        
+    except Exception as e:
+        return jsonify({'error': f'Batch download failed: {str(e)}'}), 500
+
 @pdf_bp.route('/formats', methods=['GET'])
 def get_export_formats():
     return jsonify({
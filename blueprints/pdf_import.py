@@ -1,11 +1,16 @@
 from flask import Blueprint, request, jsonify
 from services.pdf_import_service import PDFImportService
+from services.citation_service import CitationService
+from services.text_store import full_text_store
+from services.pdf_extractors import available_extractors
+from services.plagiarism_service import plagiarism_service
 from blueprints.paper_generator import papers_storage
 import uuid
 from datetime import datetime
 
 pdf_import_bp = Blueprint('pdf_import', __name__)
 pdf_import_service = PDFImportService()
+citation_service = CitationService()
 
 @pdf_import_bp.route('/import-url', methods=['POST'])
 def import_pdf_from_url():
@@ -28,7 +33,15 @@ def import_pdf_from_url():
         
         # Generate unique ID and store
         paper_id = str(uuid.uuid4())
+        full_text = result.pop('full_text')
+        full_text_store.save(paper_id, full_text, result)
         papers_storage[paper_id] = result
+        try:
+            plagiarism_service.index_paper(paper_id, result, full_text.get_text())
+        except Exception as e:
+            # The import itself succeeded; the paper is indexed again on the next restart
+            print(f"Plagiarism indexing failed for {paper_id}: {e}")
+        citation_service.index_citations(result.get('citations_data', []))
         
         return jsonify({
             'success': True,
@@ -62,7 +75,15 @@ def import_pdf_from_file():
         
         # Generate unique ID and store
         paper_id = str(uuid.uuid4())
+        full_text = result.pop('full_text')
+        full_text_store.save(paper_id, full_text, result)
         papers_storage[paper_id] = result
+        try:
+            plagiarism_service.index_paper(paper_id, result, full_text.get_text())
+        except Exception as e:
+            # The import itself succeeded; the paper is indexed again on the next restart
+            print(f"Plagiarism indexing failed for {paper_id}: {e}")
+        citation_service.index_citations(result.get('citations_data', []))
         
         return jsonify({
             'success': True,
@@ -74,6 +95,38 @@ def import_pdf_from_file():
     except Exception as e:
         return jsonify({'error': f'File import failed: {str(e)}'}), 500
 
+@pdf_import_bp.route('/full-text/<paper_id>', methods=['GET'])
+def get_full_text(paper_id):
+    try:
+        full_text = full_text_store.get(paper_id)
+        
+        if not full_text:
+            return jsonify({'error': 'Full text not found'}), 404
+        
+        # Page range is [start, end), decompressed on demand
+        start = max(request.args.get('start', 0, type=int), 0)
+        end = request.args.get('end', full_text.page_count, type=int)
+        
+        return jsonify({
+            'success': True,
+            'paper_id': paper_id,
+            'start': start,
+            'end': min(end, full_text.page_count),
+            'total_pages': full_text.page_count,
+            'pages': full_text.get_pages(start, end)
+        })
+        
+    except Exception as e:
+        return jsonify({'error': f'Failed to get full text: {str(e)}'}), 500
+
+@pdf_import_bp.route('/extractors', methods=['GET'])
+def get_extractors():
+    return jsonify({
+        'success': True,
+        'active': pdf_import_service.extractor.name,
+        'available': available_extractors()
+    })
+
 @pdf_import_bp.route('/supported-sources', methods=['GET'])
 def get_supported_sources():
     return jsonify({
@@ -1,10 +1,15 @@
 from flask import Blueprint, request, jsonify
-from services.plagiarism_service import PlagiarismService
+from services.plagiarism_service import plagiarism_service, PROSE_SECTIONS
 from blueprints.paper_generator import papers_storage
 from models.database import db
 
 plagiarism_bp = Blueprint('plagiarism', __name__)
-plagiarism_service = PlagiarismService()
+
+# Check types /check accepts, as /settings advertises them; 'paraphrase' is also accepted
+CHECK_TYPES = {
+    'similarity': lambda text: plagiarism_service.check_plagiarism(text),
+    'paraphrasing': lambda text: plagiarism_service.check_paraphrase(text)
+}
 
 @plagiarism_bp.route('/check', methods=['POST'])
 def check_plagiarism():
@@ -19,7 +24,12 @@ def check_plagiarism():
             return jsonify({'error': 'Text too short for meaningful plagiarism check (minimum 50 characters)'}), 400
         
         # Perform plagiarism check
-        result = plagiarism_service.check_plagiarism(text)
+        check_type = data.get('check_type', 'similarity')
+        if check_type == 'paraphrase':
+            check_type = 'paraphrasing'
+        if check_type not in CHECK_TYPES:
+            return jsonify({'error': f'Unsupported check type: {check_type}'}), 400
+        result = CHECK_TYPES[check_type](text)
         
         return jsonify({
             'success': True,
@@ -43,23 +53,24 @@ def check_paper_plagiarism(paper_id):
         if not paper_content:
             return jsonify({'error': 'Paper not found'}), 404
         
-        # Combine all text sections
-        text_sections = []
-        for section, content in paper_content.items():
-            if isinstance(content, str) and section not in ['metadata', 'citations_data', 'references']:
-                text_sections.append(content)
-        
-        full_text = ' '.join(text_sections)
+        # Revised section drafts can be checked before they are saved
+        data = request.get_json(silent=True) or {}
+        revised = {section: content for section, content in (data.get('sections') or {}).items()
+                   if section in PROSE_SECTIONS and isinstance(content, str)}
+        checked_content = {**paper_content, **revised}
         
-        if len(full_text) < 50:
+        prose = ' '.join(checked_content[section] for section in PROSE_SECTIONS
+                         if isinstance(checked_content.get(section), str))
+        if len(prose.strip()) < 50:
             return jsonify({'error': 'Paper content too short for plagiarism check'}), 400
         
-        # Perform plagiarism check
-        result = plagiarism_service.check_plagiarism(full_text)
+        # Perform plagiarism check per section, leaving the paper's own index entry out
+        result = plagiarism_service.check_paper(paper_id, checked_content)
         
-        # Store result in paper
-        paper_content['plagiarism_check'] = result
-        papers_storage[paper_id] = paper_content
+        # Store result in paper, unless it describes unsaved drafts
+        if not revised:
+            paper_content['plagiarism_check'] = result
+            papers_storage[paper_id] = paper_content
         
         return jsonify({
             'success': True,
@@ -79,14 +90,18 @@ def batch_plagiarism_check():
         if not texts or not isinstance(texts, list):
             return jsonify({'error': 'Array of texts is required'}), 400
         
+        # Check every valid text in one pass; indexes below refer to the request's texts
+        valid = [i for i, text in enumerate(texts) if isinstance(text, str) and len(text.strip()) >= 50]
+        batch = plagiarism_service.check_batch([texts[i].strip() for i in valid])
+        checks = dict(zip(valid, batch['results']))
+        
         results = []
         for i, text in enumerate(texts):
-            if isinstance(text, str) and len(text.strip()) >= 50:
-                result = plagiarism_service.check_plagiarism(text.strip())
+            if i in checks:
                 results.append({
                     'index': i,
                     'text_preview': text[:100] + '...' if len(text) > 100 else text,
-                    'plagiarism_check': result
+                    'plagiarism_check': checks[i]
                 })
             else:
                 results.append({
@@ -94,10 +109,17 @@ def batch_plagiarism_check():
                     'error': 'Text too short or invalid format'
                 })
         
+        collusion_pairs = [
+            {**pair, 'first': valid[pair['first']], 'second': valid[pair['second']]}
+            for pair in batch['collusion_pairs']
+        ]
+        
         return jsonify({
             'success': True,
             'batch_results': results,
-            'total_checked': len([r for r in results if 'plagiarism_check' in r])
+            'collusion_pairs': collusion_pairs,
+            'total_checked': len(checks),
+            'elapsed_ms': batch['elapsed_ms']
         })
         
     except Exception as e:
@@ -145,7 +167,7 @@ def get_plagiarism_settings():
             'min_text_length': 50,
             'max_text_length': 10000,
             'supported_languages': ['en'],
-            'check_types': ['similarity', 'paraphrasing', 'citation_issues'],
+            'check_types': list(CHECK_TYPES),
             'thresholds': {
                 'low_risk': 10,
                 'medium_risk': 20,
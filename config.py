@@ -7,4 +7,31 @@ class Config:
     GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
     MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/research_papers')
-    SECRET_KEY = os.getenv('SECRET_KEY', 'hackathon-secret-key-2024')
\ No newline at end of file
+    SECRET_KEY = os.getenv('SECRET_KEY', 'hackathon-secret-key-2024')
+    
+    # Text extraction backend for imported PDFs: pypdf2, pypdf, pdfminer or pypdfium2
+    PDF_EXTRACTOR = os.getenv('PDF_EXTRACTOR', 'pypdf2')
+    
+    # Rendered PDF/LaTeX/ZIP exports cache (defaults to a folder in the system temp dir)
+    ARTIFACT_CACHE_DIR = os.getenv('ARTIFACT_CACHE_DIR')
+    ARTIFACT_CACHE_MAX_BYTES = int(os.getenv('ARTIFACT_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+    
+    # Local copy of chart PNGs referenced by id from stored papers; MongoDB GridFS holds the durable one
+    # (defaults to a folder in the system temp dir, so set it to a persistent volume when running without MongoDB)
+    CHART_STORE_DIR = os.getenv('CHART_STORE_DIR')
+    
+    # Plagiarism fingerprint index, kept across restarts (defaults to a folder in the system temp dir)
+    PLAGIARISM_INDEX_DIR = os.getenv('PLAGIARISM_INDEX_DIR')
+    # Processes fingerprinting large batch checks (0 or 1 keeps them in the request thread)
+    PLAGIARISM_WORKERS = int(os.getenv('PLAGIARISM_WORKERS', os.cpu_count() or 1))
+    
+    # PDF rendering worker processes (0 renders inside the request thread)
+    RENDER_WORKERS = int(os.getenv('RENDER_WORKERS', 2))
+    RENDER_MAX_CONCURRENT = int(os.getenv('RENDER_MAX_CONCURRENT', 0))
+    RENDER_TIMEOUT = float(os.getenv('RENDER_TIMEOUT', 60))
+    RENDER_QUEUE_TIMEOUT = float(os.getenv('RENDER_QUEUE_TIMEOUT', 30))
+    
+    # Local LaTeX compilation: auto picks tectonic, then pdflatex (the ReportLab PDF is served when neither exists)
+    LATEX_ENGINE = os.getenv('LATEX_ENGINE', 'auto')
+    LATEX_MAX_CONCURRENT = int(os.getenv('LATEX_MAX_CONCURRENT', 1))
+    LATEX_COMPILE_TIMEOUT = float(os.getenv('LATEX_COMPILE_TIMEOUT', 60))
@@ -48,6 +48,69 @@ class Database:
         except Exception as e:
             print(f"Error retrieving paper: {e}")
             return None
+    
+    def save_full_text(self, paper_id, full_text_doc):
+        if self._db is None:
+            return None
+        try:
+            self._db.full_texts.replace_one(
+                {'paper_id': paper_id},
+                {'paper_id': paper_id, **full_text_doc},
+                upsert=True
+            )
+            return paper_id
+        except Exception as e:
+            print(f"Error saving full text: {e}")
+            return None
+    
+    def get_full_text(self, paper_id):
+        if self._db is None:
+            return None
+        try:
+            return self._db.full_texts.find_one({'paper_id': paper_id})
+        except Exception as e:
+            print(f"Error retrieving full text: {e}")
+            return None
+
+    def save_chart(self, chart_id, image_bytes):
+        if self._db is None:
+            return None
+        try:
+            import gridfs
+            charts = gridfs.GridFS(self._db, collection='charts')
+            # Ids are content hashes, so an existing file already holds these bytes
+            if not charts.exists(chart_id):
+                charts.put(image_bytes, _id=chart_id, content_type='image/png')
+            return chart_id
+        except Exception as e:
+            print(f"Error saving chart: {e}")
+            return None
+    
+    def get_chart(self, chart_id):
+        if self._db is None:
+            return None
+        try:
+            import gridfs
+            return gridfs.GridFS(self._db, collection='charts').get(chart_id).read()
+        except Exception as e:
+            print(f"Error retrieving chart: {e}")
+            return None
+
+    def iter_papers(self):
+        if self._db is None:
+            return
+        try:
+            yield from self._db.papers.find({}, {'paper_id': 1, 'content': 1})
+        except Exception as e:
+            print(f"Error listing papers: {e}")
+    
+    def iter_full_texts(self):
+        if self._db is None:
+            return
+        try:
+            yield from self._db.full_texts.find({})
+        except Exception as e:
+            print(f"Error listing full texts: {e}")
 
 db = Database()
 
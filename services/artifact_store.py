@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Callable, Dict, Optional, Tuple
+from config import Config
+
+
+class ArtifactStore:
+    """Rendered exports on disk, addressed by a hash of paper content and template version"""
+
+    def __init__(self, root: str = None, max_bytes: int = None):
+        self.root = root or Config.ARTIFACT_CACHE_DIR or os.path.join(tempfile.gettempdir(), 'research_paper_artifacts')
+        self.max_bytes = max_bytes or Config.ARTIFACT_CACHE_MAX_BYTES
+        os.makedirs(self.root, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._total_bytes = None
+
+    def content_key(self, paper_content: Dict, kind: str, template_version: str) -> str:
+        """Stable key: same paper, format and template version give the same artifact"""
+        digest = hashlib.sha256()
+        digest.update(f"{kind}:{template_version}:".encode('utf-8'))
+        digest.update(json.dumps(paper_content, sort_keys=True, default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+    def path_for(self, key: str, extension: str) -> str:
+        return os.path.join(self.root, f"{key}{extension}")
+
+    def get(self, key: str, extension: str) -> Optional[str]:
+        path = self.path_for(key, extension)
+        try:
+            # Touch on read so garbage collection evicts least recently used first
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, extension: str, data: bytes) -> str:
+        temp_file, temp_path = self.open_temp()
+        with temp_file:
+            temp_file.write(data)
+        return self.commit(key, extension, temp_path)
+
+    def open_temp(self):
+        """Writable temporary file in the store; commit() publishes it under a key"""
+        fd, temp_path = tempfile.mkstemp(dir=self.root, suffix='.part')
+        return os.fdopen(fd, 'wb'), temp_path
+
+    def commit(self, key: str, extension: str, temp_path: str) -> str:
+        path = self.path_for(key, extension)
+        size = os.path.getsize(temp_path)
+
+        with self._lock:
+            try:
+                # Re-committing a key replaces its file, so only the size difference is new
+                size -= os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+            # Atomic so concurrent readers (other workers too) never see partial files
+            os.replace(temp_path, path)
+            if self._total_bytes is not None:
+                self._total_bytes += size
+        self.collect_garbage()
+        return path
+
+    def get_or_create(self, paper_content: Dict, kind: str, extension: str,
+                      template_version: str, render: Callable[[], bytes]) -> Tuple[str, str]:
+        """Return (key, path), rendering only on a cache miss"""
+        return self._get_or_produce(
+            paper_content, kind, extension, template_version,
+            lambda key: self.put(key, extension, render())
+        )
+
+    def get_or_create_file(self, paper_content: Dict, kind: str, extension: str,
+                           template_version: str, render_to: Callable[[str], None]) -> Tuple[str, str]:
+        """Like get_or_create, for renderers that write straight to a file path"""
+        def produce(key):
+            temp_file, temp_path = self.open_temp()
+            temp_file.close()
+            try:
+                render_to(temp_path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+            return self.commit(key, extension, temp_path)
+
+        return self._get_or_produce(paper_content, kind, extension, template_version, produce)
+
+    def _get_or_produce(self, paper_content: Dict, kind: str, extension: str,
+                        template_version: str, produce: Callable[[str], str]) -> Tuple[str, str]:
+        key = self.content_key(paper_content, kind, template_version)
+        path = self.get(key, extension)
+        if path:
+            return key, path
+
+        # One render per key even when the same export is requested concurrently
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            path = self.get(key, extension)
+            if not path:
+                path = produce(key)
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return key, path
+
+    def delete(self, key: str, extension: str):
+        try:
+            os.remove(self.path_for(key, extension))
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._total_bytes = None
+
+    def collect_garbage(self):
+        """Evict least recently used artifacts until the store fits in max_bytes"""
+        with self._lock:
+            if self._total_bytes is not None and self._total_bytes <= self.max_bytes:
+                return
+
+            entries = []
+            for entry in os.scandir(self.root):
+                if entry.is_file() and not entry.name.endswith('.part'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+            self._total_bytes = total
+
+
+artifact_store = ArtifactStore()
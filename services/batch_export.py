@@ -0,0 +1,160 @@
+import copy
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from services.export_service import export_service, stream_zip_entries
+
+MAX_BATCH_PAPERS = 100
+MAX_RETAINED_JOBS = 50
+# Finished jobs (and their status) are forgotten this long after they complete
+JOB_RETENTION_SECONDS = 3600
+BATCH_FORMATS = {'pdf': '.pdf', 'latex': '.tex', 'zip': '.zip'}
+
+
+class BatchExportManager:
+    """Exports many papers in one background job, rendered in parallel through the render pool"""
+
+    def __init__(self, exporter=None, workers: int = None):
+        self.exporter = exporter or export_service
+        # Enough threads to keep every render slot busy; the pool itself bounds the real work
+        self.workers = workers or max(self.exporter.pool.max_concurrent, 1) + 1
+        self._executor = None
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+
+    def submit(self, papers: List[Dict], formats: List[str], errors: List[Dict] = None) -> str:
+        """Queue exports for [{'paper_id', 'content'}]; errors are items that failed before rendering"""
+        job_id = str(uuid.uuid4())
+        items = [
+            {'paper_id': paper['paper_id'], 'format': export_format, 'status': 'queued', 'error': None}
+            for paper in papers for export_format in formats
+        ]
+        items.extend({**error, 'status': 'failed'} for error in errors or [])
+
+        job = {
+            'job_id': job_id,
+            'status': 'running',
+            'formats': list(formats),
+            'items': items,
+            'pending': sum(1 for item in items if item['status'] == 'queued'),
+            'created_at': datetime.utcnow().isoformat(),
+            'finished_at': None,
+            'finished_time': None
+        }
+        with self._lock:
+            self._evict_finished()
+            self._jobs[job_id] = job
+            executor = self._get_executor()
+
+        # Snapshot so edits made while the job runs don't mix versions inside one batch
+        contents = {paper['paper_id']: copy.deepcopy(paper['content']) for paper in papers}
+        for item in items:
+            if item['status'] == 'queued':
+                executor.submit(self._export_item, job, item, contents[item['paper_id']])
+        if not job['pending']:
+            self._finish(job)
+        return job_id
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            self._evict_finished()
+            job = self._jobs.get(job_id)
+            if not job:
+                return None
+            items = [
+                {key: item.get(key) for key in ('paper_id', 'format', 'status', 'error', 'filename')}
+                for item in job['items']
+            ]
+            return {
+                'job_id': job_id,
+                'status': job['status'],
+                'total': len(items),
+                'completed': sum(1 for item in items if item['status'] == 'completed'),
+                'failed': sum(1 for item in items if item['status'] == 'failed'),
+                'items': items,
+                'created_at': job['created_at'],
+                'finished_at': job['finished_at']
+            }
+
+    def stream_result(self, job_id: str) -> Iterator[bytes]:
+        """ZIP of every exported file plus errors.json listing the items that failed"""
+        with self._lock:
+            items = [dict(item) for item in self._jobs[job_id]['items']]
+
+        def entries():
+            for item in items:
+                if item['status'] == 'completed':
+                    if os.path.exists(item['path']):
+                        yield item['filename'], item['path']
+                    else:
+                        item['status'] = 'failed'
+                        item['error'] = 'Export was evicted from the artifact cache, resubmit the batch'
+            failures = [
+                {'paper_id': item['paper_id'], 'format': item['format'], 'error': item['error']}
+                for item in items if item['status'] == 'failed'
+            ]
+            if failures:
+                yield 'errors.json', json.dumps(failures, indent=2).encode('utf-8')
+
+        return stream_zip_entries(entries())
+
+    def _export_item(self, job: Dict, item: Dict, paper_content: Dict):
+        with self._lock:
+            item['status'] = 'rendering'
+        try:
+            # Background priority so interactive exports get free render slots first
+            if item['format'] == 'pdf':
+                _, path = self.exporter.pdf_artifact(paper_content, background=True)
+            elif item['format'] == 'latex':
+                _, path = self.exporter.latex_artifact(paper_content)
+            else:
+                _, path = self.exporter.zip_artifact(paper_content, background=True)
+
+            title = paper_content.get('title', 'Research Paper')
+            safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).rstrip()
+            with self._lock:
+                item['path'] = path
+                item['filename'] = f"{safe_title[:40]}_{item['paper_id'][:8]}{BATCH_FORMATS[item['format']]}"
+                item['status'] = 'completed'
+        except Exception as e:
+            print(f"Batch export failed for {item['paper_id']} ({item['format']}): {e}")
+            with self._lock:
+                item['status'] = 'failed'
+                item['error'] = str(e)
+        finally:
+            with self._lock:
+                job['pending'] -= 1
+                done = job['pending'] == 0
+            if done:
+                self._finish(job)
+
+    def _finish(self, job: Dict):
+        with self._lock:
+            job['status'] = 'completed'
+            job['finished_at'] = datetime.utcnow().isoformat()
+            job['finished_time'] = time.monotonic()
+
+    def _evict_finished(self):
+        """Drop expired finished jobs, then the oldest finished ones past MAX_RETAINED_JOBS"""
+        expiry = time.monotonic() - JOB_RETENTION_SECONDS
+        finished = [job_id for job_id, job in self._jobs.items() if job['status'] == 'completed']
+        for job_id in list(finished):
+            if self._jobs[job_id]['finished_time'] < expiry:
+                self._jobs.pop(job_id)
+                finished.remove(job_id)
+        while len(self._jobs) >= MAX_RETAINED_JOBS and finished:
+            self._jobs.pop(finished.pop(0))
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='batch-export')
+        return self._executor
+
+
+batch_export_manager = BatchExportManager()
@@ -0,0 +1,147 @@
+import base64
+import copy
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import Dict, List, Optional
+from PIL import Image as PILImage
+from reportlab.platypus import Image
+from config import Config
+from models.database import db
+
+# Charts are pre-scaled to this resolution at their printed size before layout
+CHART_RENDER_DPI = 150
+CHART_IMAGE_CACHE_SIZE = 64
+CHART_URL = '/api/images/charts/{chart_id}.png'
+CHART_ID = re.compile(r'^[0-9a-f]{64}$')
+
+# Decoded, pre-scaled chart images keyed by (chart id, width, height, dpi, colors), per process
+chart_image_cache = OrderedDict()
+chart_image_cache_lock = threading.Lock()
+
+
+class ChartStore:
+    """Chart PNGs stored once by SHA-256 and referenced from papers by id
+
+    MongoDB GridFS holds the durable copy; the directory is a local cache that render
+    workers read from and that is refilled from the database after restarts.
+    """
+
+    def __init__(self, root: str = None, database=None):
+        # On disk so render worker processes read the same charts as the web process
+        self.root = root or Config.CHART_STORE_DIR or os.path.join(tempfile.gettempdir(), 'research_paper_charts')
+        self.database = database or db
+        self._warned = False
+        os.makedirs(self.root, exist_ok=True)
+
+    def path_for(self, chart_id: str) -> Optional[str]:
+        if not CHART_ID.match(chart_id or ''):
+            return None
+        return os.path.join(self.root, f"{chart_id}.png")
+
+    def exists(self, chart_id: str) -> bool:
+        """True when the chart is on local disk, fetching it from the database first if needed"""
+        path = self.path_for(chart_id)
+        if not path:
+            return False
+        if os.path.exists(path):
+            return True
+        image_bytes = self.database.get_chart(chart_id)
+        if image_bytes is None or hashlib.sha256(image_bytes).hexdigest() != chart_id:
+            return False
+        self._write(path, image_bytes)
+        return True
+
+    def ensure_local(self, charts: List[Dict]) -> None:
+        """Fetch a paper's charts to disk before handing it to a render worker"""
+        for chart in charts or []:
+            if chart.get('id'):
+                self.exists(chart['id'])
+
+    def save(self, image_bytes: bytes) -> str:
+        """Store PNG bytes, returning their id; identical charts are stored once"""
+        chart_id = hashlib.sha256(image_bytes).hexdigest()
+        path = self.path_for(chart_id)
+        if not os.path.exists(path):
+            self._write(path, image_bytes)
+        if self.database.save_chart(chart_id, image_bytes) is None and not Config.CHART_STORE_DIR and not self._warned:
+            self._warned = True
+            print("Warning: charts are only in the temp directory; connect MongoDB or set CHART_STORE_DIR "
+                  "to a persistent volume so stored papers keep their figures")
+        return chart_id
+
+    def _write(self, path: str, image_bytes: bytes):
+        fd, temp_path = tempfile.mkstemp(dir=self.root, suffix='.part')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(image_bytes)
+        os.replace(temp_path, path)
+
+    def save_data_url(self, data_url: str) -> str:
+        if data_url.startswith('data:image'):
+            data_url = data_url.split(',', 1)[1]
+        return self.save(base64.b64decode(data_url))
+
+    def store_charts(self, charts: List[Dict]) -> List[Dict]:
+        """Replace inline base64 chart images with id and URL references"""
+        stored = []
+        for chart in charts or []:
+            chart = dict(chart)
+            image = chart.pop('image', None)
+            if image and not chart.get('id'):
+                try:
+                    chart['id'] = self.save_data_url(image)
+                except Exception as e:
+                    print(f"Error storing chart: {e}")
+                    chart['image'] = image
+            if chart.get('id'):
+                chart['url'] = CHART_URL.format(chart_id=chart['id'])
+            stored.append(chart)
+        return stored
+
+    def image_flowable(self, chart_id: str, width: float, height: float,
+                       dpi: int = CHART_RENDER_DPI, colors: int = None) -> Optional[Image]:
+        """ReportLab image drawn at width x height points, decoded and scaled once per process"""
+        key = (chart_id, width, height, dpi, colors)
+        with chart_image_cache_lock:
+            cached = chart_image_cache.get(key)
+            if cached is not None:
+                chart_image_cache.move_to_end(key)
+
+        if cached is None:
+            if not self.exists(chart_id):
+                return None
+            cached = self._load_scaled(self.path_for(chart_id), width, height, dpi, colors)
+            with chart_image_cache_lock:
+                chart_image_cache[key] = cached
+                while len(chart_image_cache) > CHART_IMAGE_CACHE_SIZE:
+                    chart_image_cache.popitem(last=False)
+
+        # Copies share the decoded ImageReader, so pixel data is decoded once
+        return copy.copy(cached)
+
+    def _load_scaled(self, path: str, width: float, height: float, dpi: int, colors: int = None) -> Image:
+        target = (round(width / 72 * dpi), round(height / 72 * dpi))
+        with PILImage.open(path) as source:
+            scaled = source.copy()
+        scaled.thumbnail(target, PILImage.LANCZOS)
+
+        if colors:
+            # Charts are flat colour; a small palette makes the embedded RGB stream compress far better
+            if scaled.mode in ('RGBA', 'LA', 'P'):
+                rgba = scaled.convert('RGBA')
+                background = PILImage.new('RGB', rgba.size, 'white')
+                background.paste(rgba, mask=rgba.split()[3])
+                scaled = background
+            scaled = scaled.convert('RGB').quantize(colors=colors).convert('RGB')
+
+        buffer = BytesIO()
+        scaled.save(buffer, format='PNG', optimize=True)
+        buffer.seek(0)
+        return Image(buffer, width=width, height=height)
+
+
+chart_store = ChartStore()
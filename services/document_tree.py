@@ -0,0 +1,108 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from services.markdown_flowables import markdown_converter
+
+DOCUMENT_CACHE_SIZE = 128
+
+# Body sections in reading order; every exporter walks this one list
+SECTION_KEYS = ('introduction', 'literature_review', 'methodology', 'results', 'discussion', 'conclusion')
+SECTION_TITLES = {
+    'introduction': 'Introduction',
+    'literature_review': 'Literature Review',
+    'methodology': 'Methodology',
+    'results': 'Results',
+    'discussion': 'Discussion',
+    'conclusion': 'Conclusion'
+}
+# Paper fields that change what any exporter emits
+DOCUMENT_FIELDS = ('title', 'abstract', 'summary', 'references', 'charts', 'metadata') + SECTION_KEYS
+
+# Parsed papers keyed by SHA-256 of their rendered fields, per process
+document_cache = OrderedDict()
+document_cache_lock = threading.Lock()
+
+
+class Section:
+    """One body section: its source text, text hash and ('heading'|'paragraph'|'bullet'|'number', text, marker) blocks"""
+
+    def __init__(self, key: str, text: str):
+        self.key = key
+        self.title = SECTION_TITLES[key]
+        self.text = text
+        self._digest = None
+        self._blocks = None
+
+    @property
+    def digest(self) -> str:
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.text.encode('utf-8')).hexdigest()
+        return self._digest
+
+    @property
+    def blocks(self) -> tuple:
+        # Hashed and tokenized on first use; low-memory PDF renders stream blocks from the text instead
+        if self._blocks is None:
+            self._blocks = tuple(markdown_converter.tokenize(self.text))
+        return self._blocks
+
+
+class DocumentTree:
+    """A paper parsed once into the structure shared by the PDF, LaTeX, Markdown and HTML exporters"""
+
+    def __init__(self, paper_content: Dict):
+        metadata = paper_content.get('metadata') or {}
+        self.title = paper_content.get('title')
+        self.abstract = paper_content.get('abstract')
+        self.keywords = metadata.get('keywords')
+        self.citation_style = metadata.get('citation_style', 'IEEE')
+        self.sections = OrderedDict(
+            (key, Section(key, str(paper_content[key] or ''))) for key in SECTION_KEYS if key in paper_content
+        )
+        self.summary = tuple(paper_content.get('summary') or ())
+        self.references = tuple(paper_content.get('references') or ())
+        self.charts = tuple(paper_content.get('charts') or ())
+
+    @property
+    def display_title(self) -> str:
+        return self.title if self.title is not None else 'Research Paper'
+
+    def section(self, key: str) -> Optional[Section]:
+        return self.sections.get(key)
+
+    def keywords_text(self, default: List[str] = None) -> Optional[str]:
+        keywords = self.keywords if self.keywords is not None else default
+        if keywords is None:
+            return None
+        return ', '.join(keywords) if isinstance(keywords, list) else str(keywords)
+
+    @property
+    def full_text(self) -> str:
+        """Abstract and section text, for keyword scans"""
+        parts = [self.abstract] if self.abstract else []
+        parts.extend(section.text for section in self.sections.values())
+        return ' '.join(parts)
+
+
+def document_key(paper_content: Dict) -> str:
+    fields = {key: paper_content[key] for key in DOCUMENT_FIELDS if key in paper_content}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def parse_document(paper_content: Dict) -> DocumentTree:
+    """Parsed tree for a paper, built once per content version and shared by every exporter"""
+    key = document_key(paper_content)
+    with document_cache_lock:
+        cached = document_cache.get(key)
+        if cached is not None:
+            document_cache.move_to_end(key)
+            return cached
+
+    tree = DocumentTree(paper_content)
+    with document_cache_lock:
+        document_cache[key] = tree
+        while len(document_cache) > DOCUMENT_CACHE_SIZE:
+            document_cache.popitem(last=False)
+    return tree
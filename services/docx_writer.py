@@ -0,0 +1,233 @@
+import base64
+import re
+from typing import Dict, Iterator, List, Tuple
+from xml.sax.saxutils import escape
+from services.chart_store import chart_store
+from services.document_tree import DocumentTree, parse_document
+
+# Characters XML 1.0 cannot carry; Word refuses files containing them
+INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+INLINE_MARKUP = re.compile(r'\*\*(.+?)\*\*|`([^`]+)`|(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?![\w*])')
+
+# Charts are placed at 6 x 3.6 inches; DOCX sizes are in EMU (914400 per inch)
+CHART_WIDTH_EMU = 5486400
+CHART_HEIGHT_EMU = 3291840
+# document.xml is flushed to the ZIP in chunks of about this many characters
+DOCUMENT_CHUNK_CHARS = 64 * 1024
+
+CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Default Extension="png" ContentType="image/png"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+<Override PartName="/word/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>
+<Override PartName="/word/numbering.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.numbering+xml"/>
+<Override PartName="/docProps/core.xml" ContentType="application/vnd.openxmlformats-package.core-properties+xml"/>
+</Types>"""
+
+PACKAGE_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties" Target="docProps/core.xml"/>
+</Relationships>"""
+
+CORE_PROPERTIES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" xmlns:dc="http://purl.org/dc/elements/1.1/">
+<dc:title>{title}</dc:title>
+<dc:creator>AI Research Paper Generator</dc:creator>
+</cp:coreProperties>"""
+
+STYLES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:styles xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">
+<w:docDefaults>
+<w:rPrDefault><w:rPr><w:rFonts w:ascii="Times New Roman" w:hAnsi="Times New Roman" w:cs="Times New Roman"/><w:sz w:val="22"/></w:rPr></w:rPrDefault>
+<w:pPrDefault><w:pPr><w:spacing w:after="120" w:line="264" w:lineRule="auto"/></w:pPr></w:pPrDefault>
+</w:docDefaults>
+<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/><w:pPr><w:jc w:val="both"/></w:pPr></w:style>
+<w:style w:type="paragraph" w:styleId="Title"><w:name w:val="Title"/><w:basedOn w:val="Normal"/><w:pPr><w:jc w:val="center"/><w:spacing w:after="240"/></w:pPr><w:rPr><w:b/><w:sz w:val="40"/></w:rPr></w:style>
+<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/><w:basedOn w:val="Normal"/><w:next w:val="Normal"/><w:pPr><w:keepNext/><w:spacing w:before="240" w:after="120"/><w:jc w:val="left"/><w:outlineLvl w:val="0"/></w:pPr><w:rPr><w:b/><w:sz w:val="28"/></w:rPr></w:style>
+<w:style w:type="paragraph" w:styleId="Heading2"><w:name w:val="heading 2"/><w:basedOn w:val="Normal"/><w:next w:val="Normal"/><w:pPr><w:keepNext/><w:spacing w:before="180" w:after="80"/><w:jc w:val="left"/><w:outlineLvl w:val="1"/></w:pPr><w:rPr><w:b/><w:i/><w:sz w:val="24"/></w:rPr></w:style>
+<w:style w:type="paragraph" w:styleId="Abstract"><w:name w:val="Abstract"/><w:basedOn w:val="Normal"/><w:pPr><w:ind w:left="567" w:right="567"/></w:pPr><w:rPr><w:i/></w:rPr></w:style>
+<w:style w:type="paragraph" w:styleId="ListParagraph"><w:name w:val="List Paragraph"/><w:basedOn w:val="Normal"/><w:pPr><w:spacing w:after="60"/><w:ind w:left="720"/></w:pPr></w:style>
+<w:style w:type="paragraph" w:styleId="Caption"><w:name w:val="caption"/><w:basedOn w:val="Normal"/><w:pPr><w:jc w:val="center"/></w:pPr><w:rPr><w:i/><w:sz w:val="18"/></w:rPr></w:style>
+<w:style w:type="paragraph" w:styleId="Reference"><w:name w:val="Reference"/><w:basedOn w:val="Normal"/><w:pPr><w:ind w:left="567" w:hanging="567"/><w:jc w:val="left"/></w:pPr><w:rPr><w:sz w:val="20"/></w:rPr></w:style>
+</w:styles>"""
+
+NUMBERING_HEAD = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:numbering xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">
+<w:abstractNum w:abstractNumId="0"><w:lvl w:ilvl="0"><w:start w:val="1"/><w:numFmt w:val="bullet"/><w:lvlText w:val="•"/><w:lvlJc w:val="left"/><w:pPr><w:ind w:left="720" w:hanging="360"/></w:pPr></w:lvl></w:abstractNum>
+<w:abstractNum w:abstractNumId="1"><w:lvl w:ilvl="0"><w:start w:val="1"/><w:numFmt w:val="decimal"/><w:lvlText w:val="%1."/><w:lvlJc w:val="left"/><w:pPr><w:ind w:left="720" w:hanging="360"/></w:pPr></w:lvl></w:abstractNum>
+"""
+
+DOCUMENT_HEAD = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships" xmlns:wp="http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing" xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" xmlns:pic="http://schemas.openxmlformats.org/drawingml/2006/picture">
+<w:body>
+"""
+
+DOCUMENT_TAIL = """<w:sectPr><w:pgSz w:w="11906" w:h="16838"/><w:pgMar w:top="1440" w:right="1440" w:bottom="1440" w:left="1440" w:header="708" w:footer="708" w:gutter="0"/></w:sectPr>
+</w:body>
+</w:document>"""
+
+INLINE_IMAGE = """<w:p><w:pPr><w:jc w:val="center"/></w:pPr><w:r><w:drawing><wp:inline distT="0" distB="0" distL="0" distR="0"><wp:extent cx="{cx}" cy="{cy}"/><wp:docPr id="{index}" name="Chart {index}"/><a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/picture"><pic:pic><pic:nvPicPr><pic:cNvPr id="{index}" name="chart{index}.png"/><pic:cNvPicPr/></pic:nvPicPr><pic:blipFill><a:blip r:embed="{rel_id}"/><a:stretch><a:fillRect/></a:stretch></pic:blipFill><pic:spPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm><a:prstGeom prst="rect"><a:avLst/></a:prstGeom></pic:spPr></pic:pic></a:graphicData></a:graphic></wp:inline></w:drawing></w:r></w:p>
+"""
+
+
+def _xml_text(text) -> str:
+    return escape(INVALID_XML_CHARS.sub('', str(text)))
+
+
+class DocxWriter:
+    """Writes WordprocessingML parts as text straight into a streamed ZIP, without a document object model"""
+    # Bump when output changes so cached exports are re-rendered
+    TEMPLATE_VERSION = '1'
+
+    def iter_entries(self, paper_content: Dict) -> Iterator[Tuple[str, object]]:
+        """(name, bytes, file path or byte-chunk iterator) per package part, for stream_zip_entries"""
+        tree = parse_document(paper_content)
+        charts = self._chart_images(tree)
+        # Filled while document.xml streams; one numbering instance per list so each restarts at 1
+        lists = []
+
+        yield '[Content_Types].xml', CONTENT_TYPES.encode('utf-8')
+        yield '_rels/.rels', PACKAGE_RELS.encode('utf-8')
+        yield 'docProps/core.xml', CORE_PROPERTIES.format(title=_xml_text(tree.display_title)).encode('utf-8')
+        yield 'word/styles.xml', STYLES.encode('utf-8')
+        yield 'word/document.xml', self._encode_chunks(self._iter_document(tree, charts, lists))
+        yield 'word/numbering.xml', self._numbering(lists).encode('utf-8')
+        yield 'word/_rels/document.xml.rels', self._document_rels(charts).encode('utf-8')
+        for rel_id, image in charts:
+            yield f'word/media/{rel_id}.png', image
+
+    def _iter_document(self, tree: DocumentTree, charts: List[Tuple[str, bytes]], lists: List[str]) -> Iterator[str]:
+        yield DOCUMENT_HEAD
+        yield self._paragraph(tree.display_title, 'Title')
+
+        if tree.abstract is not None:
+            yield self._paragraph('Abstract', 'Heading1')
+            yield self._paragraph(' '.join(tree.abstract.split()), 'Abstract')
+        if tree.keywords:
+            yield self._paragraph(f"*Keywords:* {tree.keywords_text()}", 'Abstract')
+
+        for section in tree.sections.values():
+            yield self._paragraph(section.title, 'Heading1')
+            previous = None
+            for kind, text, _ in section.blocks:
+                if kind == 'heading':
+                    yield self._paragraph(text, 'Heading2')
+                elif kind in ('bullet', 'number'):
+                    if kind != previous:
+                        lists.append(kind)
+                    yield self._paragraph(text, 'ListParagraph', num_id=len(lists))
+                else:
+                    yield self._paragraph(text, 'Normal')
+                previous = kind
+
+        if tree.charts:
+            yield self._paragraph('Figures', 'Heading1')
+            images = dict(charts)
+            for i, chart in enumerate(tree.charts, 1):
+                rel_id = f'chart{i}'
+                if rel_id in images:
+                    yield INLINE_IMAGE.format(cx=CHART_WIDTH_EMU, cy=CHART_HEIGHT_EMU, index=i, rel_id=rel_id)
+                caption = chart.get('caption', chart.get('title', 'Research Chart'))
+                yield self._paragraph(f"Figure {i}. {caption}", 'Caption')
+
+        if tree.summary:
+            yield self._paragraph('Key Insights', 'Heading1')
+            lists.append('bullet')
+            for point in tree.summary:
+                yield self._paragraph(point, 'ListParagraph', num_id=len(lists))
+
+        if tree.references:
+            yield self._paragraph('References', 'Heading1')
+            for i, reference in enumerate(tree.references, 1):
+                yield self._paragraph(f"[{i}] {reference}", 'Reference', markup=False)
+
+        yield DOCUMENT_TAIL
+
+    def _paragraph(self, text: str, style: str, num_id: int = None, markup: bool = True) -> str:
+        properties = f'<w:pStyle w:val="{style}"/>'
+        if num_id:
+            properties += f'<w:numPr><w:ilvl w:val="0"/><w:numId w:val="{num_id}"/></w:numPr>'
+        return f'<w:p><w:pPr>{properties}</w:pPr>{self._runs(text, markup)}</w:p>\n'
+
+    def _runs(self, text: str, markup: bool = True) -> str:
+        """**bold**, *italic* and `code` become formatted runs"""
+        text = str(text)
+        if not markup or not ('*' in text or '`' in text):
+            return self._run(text)
+
+        runs = []
+        position = 0
+        for match in INLINE_MARKUP.finditer(text):
+            if match.start() > position:
+                runs.append(self._run(text[position:match.start()]))
+            bold, code, italic = match.groups()
+            if bold is not None:
+                runs.append(self._run(bold, '<w:b/>'))
+            elif code is not None:
+                runs.append(self._run(code, '<w:rFonts w:ascii="Courier New" w:hAnsi="Courier New"/>'))
+            else:
+                runs.append(self._run(italic, '<w:i/>'))
+            position = match.end()
+        if position < len(text):
+            runs.append(self._run(text[position:]))
+        return ''.join(runs)
+
+    def _run(self, text: str, properties: str = '') -> str:
+        run_properties = f'<w:rPr>{properties}</w:rPr>' if properties else ''
+        return f'<w:r>{run_properties}<w:t xml:space="preserve">{_xml_text(text)}</w:t></w:r>'
+
+    def _numbering(self, lists: List[str]) -> str:
+        instances = ''.join(
+            f'<w:num w:numId="{num_id}"><w:abstractNumId w:val="{0 if kind == "bullet" else 1}"/>'
+            f'<w:lvlOverride w:ilvl="0"><w:startOverride w:val="1"/></w:lvlOverride></w:num>\n'
+            for num_id, kind in enumerate(lists, 1)
+        )
+        return NUMBERING_HEAD + instances + '</w:numbering>'
+
+    def _document_rels(self, charts: List[Tuple[str, bytes]]) -> str:
+        relationships = [
+            '<Relationship Id="rIdStyles" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>',
+            '<Relationship Id="rIdNumbering" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/numbering" Target="numbering.xml"/>'
+        ]
+        relationships += [
+            f'<Relationship Id="{rel_id}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/image" Target="media/{rel_id}.png"/>'
+            for rel_id, _ in charts
+        ]
+        return ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">\n'
+                + '\n'.join(relationships) + '\n</Relationships>')
+
+    def _chart_images(self, tree: DocumentTree) -> List[Tuple[str, bytes]]:
+        """(relationship id, PNG bytes) for each chart that has image data"""
+        images = []
+        for i, chart in enumerate(tree.charts, 1):
+            try:
+                path = chart_store.path_for(chart.get('id'))
+                if path and chart_store.exists(chart['id']):
+                    # Read now: the file could be evicted before the ZIP reaches the media parts
+                    with open(path, 'rb') as f:
+                        images.append((f'chart{i}', f.read()))
+                elif chart.get('image'):
+                    images.append((f'chart{i}', base64.b64decode(chart['image'].split(',', 1)[-1])))
+            except Exception as e:
+                print(f"Error adding chart to DOCX: {e}")
+        return images
+
+    def _encode_chunks(self, parts: Iterator[str]) -> Iterator[bytes]:
+        buffer = []
+        size = 0
+        for part in parts:
+            buffer.append(part)
+            size += len(part)
+            if size >= DOCUMENT_CHUNK_CHARS:
+                yield ''.join(buffer).encode('utf-8')
+                buffer.clear()
+                size = 0
+        if buffer:
+            yield ''.join(buffer).encode('utf-8')
+
+
+docx_writer = DocxWriter()
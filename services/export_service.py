@@ -0,0 +1,220 @@
+import json
+import os
+import zipfile
+from typing import Dict, Iterator, List, Optional, Tuple
+from services.pdf_service import PDFService, PDF_PROFILES
+from services.latex_service import LaTeXService
+from services.docx_writer import DocxWriter, docx_writer
+from services.artifact_store import artifact_store
+from services.chart_store import chart_store
+from services.render_pool import render_pool
+
+# Paper fields that no export renders; changing them must not invalidate cached exports
+NON_RENDERED_FIELDS = ('plagiarism_check',)
+ZIP_CHUNK_SIZE = 64 * 1024
+
+
+class _StreamSink:
+    """Write-only file for zipfile: collects output for the response, optionally teeing it to a cache file"""
+
+    def __init__(self, cache_file=None):
+        self.cache_file = cache_file
+        self.chunks = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        if self.cache_file:
+            self.cache_file.write(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def stream_zip_entries(entries: Iterator[Tuple[str, object]], cache_file=None) -> Iterator[bytes]:
+    """Write (name, path, open file, bytes or byte-chunk iterator) entries into a ZIP, yielding output as it is produced"""
+    sink = _StreamSink(cache_file)
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for arcname, source in entries:
+            with zip_file.open(arcname, 'w') as entry:
+                if isinstance(source, bytes):
+                    entry.write(source)
+                else:
+                    if isinstance(source, str) or hasattr(source, 'read'):
+                        f = open(source, 'rb') if isinstance(source, str) else source
+                        chunks = iter(lambda: f.read(ZIP_CHUNK_SIZE), b'')
+                    else:
+                        f, chunks = None, source
+                    try:
+                        for chunk in chunks:
+                            entry.write(chunk)
+                            data = sink.drain()
+                            if data:
+                                yield data
+                    finally:
+                        if f:
+                            f.close()
+            data = sink.drain()
+            if data:
+                yield data
+    # Central directory is written on close
+    yield sink.drain()
+
+
+class ExportService:
+    """Cached PDF, LaTeX and ZIP artifacts for a paper"""
+    ZIP_TEMPLATE_VERSION = f"{PDFService.TEMPLATE_VERSION}.{LaTeXService.TEMPLATE_VERSION}.2"
+
+    def __init__(self, store=None, pool=None):
+        self.store = store or artifact_store
+        self.pool = pool or render_pool
+        self.latex_service = LaTeXService()
+
+    def artifact_key(self, paper_content: Dict, kind: str) -> str:
+        versions = {
+            'pdf': PDFService.TEMPLATE_VERSION,
+            'latex': LaTeXService.TEMPLATE_VERSION,
+            'zip': self.ZIP_TEMPLATE_VERSION,
+            'docx': DocxWriter.TEMPLATE_VERSION
+        }
+        versions.update({f'pdf-{profile}': PDFService.TEMPLATE_VERSION for profile in PDF_PROFILES})
+        return self.store.content_key(self._rendered_content(paper_content), kind, versions[kind])
+
+    def pdf_artifact(self, paper_content: Dict, background: bool = False,
+                     profile: str = 'standard') -> Tuple[str, str]:
+        # Standard renders keep the plain 'pdf' kind so existing cache entries stay valid
+        kind = 'pdf' if profile == 'standard' else f'pdf-{profile}'
+        return self.store.get_or_create_file(
+            self._rendered_content(paper_content), kind, '.pdf', PDFService.TEMPLATE_VERSION,
+            lambda path: self._render_pdf_file(paper_content, path, background, profile)
+        )
+
+    def _render_pdf_file(self, paper_content: Dict, path: str, background: bool, profile: str) -> str:
+        # Workers read charts from local disk, so fetch any that only the database has
+        chart_store.ensure_local(paper_content.get('charts'))
+        return self.pool.render_pdf_file(paper_content, path, background=background, profile=profile)
+
+    def pdf_size_report(self, paper_content: Dict) -> Dict:
+        """Rendered size of the paper under every PDF profile, against the standard one"""
+        sizes = {profile: os.path.getsize(self.pdf_artifact(paper_content, profile=profile)[1])
+                 for profile in PDF_PROFILES}
+        standard = sizes['standard']
+        return {
+            'sizes': sizes,
+            'reduction_percent': {
+                profile: round(100 * (standard - size) / standard, 1) if standard else 0.0
+                for profile, size in sizes.items() if profile != 'standard'
+            }
+        }
+
+    def pdf_with_metadata_artifact(self, paper_content: Dict, metadata: Dict) -> Tuple[str, str]:
+        return self.store.get_or_create(
+            paper_content, 'pdf-metadata', '.pdf', PDFService.TEMPLATE_VERSION,
+            lambda: self._render_pdf(paper_content, metadata)
+        )
+
+    def _render_pdf(self, paper_content: Dict, metadata: Dict) -> bytes:
+        chart_store.ensure_local(paper_content.get('charts'))
+        return self.pool.render_pdf(paper_content, metadata)
+
+    def latex_artifact(self, paper_content: Dict) -> Tuple[str, str]:
+        return self.store.get_or_create_file(
+            self._rendered_content(paper_content), 'latex', '.tex', LaTeXService.TEMPLATE_VERSION,
+            self._write_latex(paper_content)
+        )
+
+    def _write_latex(self, paper_content: Dict):
+        def render_to(path):
+            # Written chunk by chunk, so the whole document is never held as one string
+            with open(path, 'w', encoding='utf-8') as f:
+                self.latex_service.write_latex_document(paper_content, f)
+        return render_to
+
+    def docx_artifact(self, paper_content: Dict) -> Tuple[str, str]:
+        return self.store.get_or_create_file(
+            self._rendered_content(paper_content), 'docx', '.docx', DocxWriter.TEMPLATE_VERSION,
+            lambda path: self._write_docx(paper_content, path)
+        )
+
+    def _write_docx(self, paper_content: Dict, path: str):
+        with open(path, 'wb') as f:
+            for data in stream_zip_entries(docx_writer.iter_entries(paper_content)):
+                f.write(data)
+
+    def cached_artifact(self, paper_content: Dict, kind: str, extension: str) -> Tuple[str, Optional[str]]:
+        """(key, path) of an already rendered artifact; path is None on a cache miss"""
+        key = self.artifact_key(paper_content, kind)
+        return key, self.store.get(key, extension)
+
+    def zip_artifact(self, paper_content: Dict, background: bool = False) -> Tuple[str, str]:
+        key, path = self.cached_artifact(paper_content, 'zip', '.zip')
+        if not path:
+            for _ in self.stream_zip(paper_content, background):
+                pass
+            path = self.store.path_for(key, '.zip')
+        return key, path
+
+    def stream_zip(self, paper_content: Dict, background: bool = False) -> Iterator[bytes]:
+        """Render every package file now, then return an iterator writing the ZIP and caching it once complete
+
+        Render errors (busy, timeout) raise here, before any response is started.
+        """
+        key = self.artifact_key(paper_content, 'zip')
+        return self._write_zip(key, self._zip_entries(paper_content, background))
+
+    def _write_zip(self, key: str, entries: List[Tuple[str, object]]) -> Iterator[bytes]:
+        cache_file, temp_path = self.store.open_temp()
+        try:
+            yield from stream_zip_entries(entries, cache_file)
+
+            cache_file.close()
+            self.store.commit(key, '.zip', temp_path)
+        finally:
+            # Client disconnects leave no partial package behind
+            if not cache_file.closed:
+                cache_file.close()
+                os.remove(temp_path)
+            for _, source in entries:
+                if hasattr(source, 'close'):
+                    source.close()
+
+    def _zip_entries(self, paper_content: Dict, background: bool) -> List[Tuple[str, object]]:
+        """(name, open file or bytes) per package file, with the LaTeX and PDF already rendered
+
+        Artifacts are opened up front, so garbage collection of the store can't remove them mid-stream.
+        """
+        latex_path = self.latex_artifact(paper_content)[1]
+        pdf_path = self.pdf_artifact(paper_content, background)[1]
+        entries = [('research_paper.tex', open(latex_path, 'rb'))]
+
+        # Add additional files if available
+        if 'additional_files' in paper_content:
+            files = paper_content['additional_files']
+
+            if 'bibliography' in files:
+                entries.append(('bibliography.md', files['bibliography'].encode('utf-8')))
+
+            if 'research_notes' in files:
+                entries.append(('research_notes.md', files['research_notes'].encode('utf-8')))
+
+            if 'abstract_only' in files:
+                entries.append(('abstract.txt', files['abstract_only'].encode('utf-8')))
+
+            # Add real papers list
+            if 'real_papers' in paper_content:
+                papers_json = json.dumps(paper_content['real_papers'], indent=2)
+                entries.append(('real_papers.json', papers_json.encode('utf-8')))
+
+        entries.append(('research_paper.pdf', open(pdf_path, 'rb')))
+        return entries
+
+    def _rendered_content(self, paper_content: Dict) -> Dict:
+        return {key: value for key, value in paper_content.items() if key not in NON_RENDERED_FIELDS}
+
+
+export_service = ExportService()
@@ -0,0 +1,476 @@
+import atexit
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.sparse import csr_matrix
+from config import Config
+from services.minhash_index import WORD, hash_words, kgram_hashes
+
+try:
+    import fcntl
+except ImportError:  # Windows: one writer process per index directory
+    fcntl = None
+
+# Word k-grams hashed per position, and the winnowing window in k-grams: every shared
+# run of KGRAM_SIZE + WINNOW_WINDOW - 1 words is guaranteed to share a fingerprint
+KGRAM_SIZE = 5
+WINNOW_WINDOW = 4
+
+# Open-addressing table on disk, grown (and compacted) past MAX_LOAD
+INITIAL_CAPACITY = 1 << 16
+MAX_LOAD = 0.5
+REBUILD_CHUNK = 1 << 20
+# Slot 0 of 'doc' marks an empty record, so a freshly created file is an empty table
+EMPTY_DOC = 0
+RECORD = np.dtype([('hash', '<u8'), ('doc', '<u4'), ('start', '<u4'), ('end', '<u4')])
+FIBONACCI_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+# Source fingerprints further apart than this many characters start a new passage
+PASSAGE_GAP = 200
+INDEX_FORMAT = 1
+
+# Winnowed hashes with the start and end character offsets of their k-grams
+Fingerprints = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def winnow(hashes: np.ndarray, window: int = WINNOW_WINDOW) -> np.ndarray:
+    """Positions picked by winnowing: the rightmost minimum of every window, each once"""
+    if len(hashes) <= window:
+        return np.array([len(hashes) - 1 - int(np.argmin(hashes[::-1]))]) if len(hashes) else np.empty(0, dtype=np.int64)
+    windows = sliding_window_view(hashes, window)
+    rightmost = window - 1 - np.argmin(windows[:, ::-1], axis=1)
+    return np.unique(np.arange(len(windows)) + rightmost)
+
+
+def text_fingerprints(text: str) -> Fingerprints:
+    """Winnowed word k-gram hashes of a text; pure, so worker processes can compute them"""
+    spans = [(match.start(), match.end(), match.group().lower()) for match in WORD.finditer(text)]
+    if not spans:
+        empty = np.empty(0, dtype=np.uint64)
+        return empty, empty.astype(np.uint32), empty.astype(np.uint32)
+
+    starts = np.fromiter((span[0] for span in spans), dtype=np.uint32, count=len(spans))
+    ends = np.fromiter((span[1] for span in spans), dtype=np.uint32, count=len(spans))
+    kgrams = kgram_hashes(hash_words([span[2] for span in spans]), KGRAM_SIZE)
+    last_word = min(KGRAM_SIZE, len(spans)) - 1
+
+    picked = winnow(kgrams)
+    return kgrams[picked], starts[picked], ends[picked + last_word]
+
+
+class FingerprintIndex:
+    """MOSS-style winnowed k-gram fingerprints in a memory-mapped hash table, for exact-passage lookup
+
+    Records are (hash, doc, start, end) with character offsets into the indexed text. Documents
+    live in an append-only journal next to the table; replacing or removing one only retires its
+    document number, and retired records are dropped when the table is next rebuilt. The indexed
+    texts are kept compressed under texts/, by digest, and read back only for span alignment.
+
+    Processes sharing the directory serialize writes with an flock on index.lock and replay the
+    journal entries the others appended before every operation.
+    """
+
+    def __init__(self, root: str = None):
+        self.root = root or Config.PLAGIARISM_INDEX_DIR or os.path.join(tempfile.gettempdir(), 'research_paper_fingerprints')
+        os.makedirs(self.root, exist_ok=True)
+        self.table_path = os.path.join(self.root, 'fingerprints.bin')
+        self.journal_path = os.path.join(self.root, 'documents.jsonl')
+        self.texts_dir = os.path.join(self.root, 'texts')
+        os.makedirs(self.texts_dir, exist_ok=True)
+        self._lock_file = open(os.path.join(self.root, 'index.lock'), 'a')
+
+        self._lock = threading.RLock()
+        self._documents = {}
+        self._doc_ids = {}
+        self._next_doc = EMPTY_DOC + 1
+        self._table = None
+        self._table_inode = None
+        # Held open so its inode can't be reused, and positioned after the last entry applied
+        self._journal_reader = None
+        # Bumped on every change, so callers can tell whether cached query results still hold
+        self.generation = 0
+        with self._locked():
+            self._load()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._documents)
+
+    def __contains__(self, doc_id: str) -> bool:
+        with self._lock:
+            return doc_id in self._documents
+
+    def fingerprints(self, text: str) -> Fingerprints:
+        return text_fingerprints(text)
+
+    def add(self, doc_id: str, text: str, metadata: Dict = None) -> bool:
+        """Index or re-index a document; unchanged text is skipped. False when it has no words"""
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        with self._lock:
+            current = self._documents.get(doc_id)
+            # Documents indexed before texts were stored get theirs written on the next add
+            if current and current['digest'] == digest and os.path.exists(self._text_path(digest)):
+                return True
+
+        hashes, starts, ends = self.fingerprints(text)
+        if not len(hashes):
+            self.remove(doc_id)
+            return False
+        compressed = zlib.compress(text.encode('utf-8'))
+
+        with self._locked():
+            self._sync()
+            self._write_text(digest, compressed)
+            # Reserve the number first so records left by a crash are never adopted by a later document
+            doc = self._next_doc
+            self._next_doc += 1
+            self._journal({'op': 'reserve', 'doc': doc, 'records': len(hashes)})
+
+            records = np.empty(len(hashes), dtype=RECORD)
+            records['hash'] = hashes
+            records['doc'] = doc
+            records['start'] = starts
+            records['end'] = ends
+            # Written pages live in the shared page cache; msync is left to rebuilds and exit
+            self._insert(records)
+
+            self._retire(doc_id)
+            self._documents[doc_id] = {
+                'doc': doc,
+                'digest': digest,
+                'fingerprints': len(records),
+                'metadata': dict(metadata or {})
+            }
+            self._doc_ids[doc] = doc_id
+            self.generation += 1
+            self._journal({'op': 'add', 'id': doc_id, **self._documents[doc_id]})
+        return True
+
+    def remove(self, doc_id: str):
+        with self._locked():
+            self._sync()
+            if self._retire(doc_id):
+                self._journal({'op': 'remove', 'id': doc_id})
+
+    def text(self, doc_id: str) -> Optional[str]:
+        """The text a document was indexed with, read from disk"""
+        with self._lock:
+            document = self._documents.get(doc_id)
+        if document is None:
+            return None
+        try:
+            with open(self._text_path(document['digest']), 'rb') as f:
+                return zlib.decompress(f.read()).decode('utf-8')
+        except FileNotFoundError:
+            return None
+
+    def refresh(self):
+        """Pick up documents other processes sharing the directory added or removed"""
+        with self._locked(shared=True):
+            self._sync()
+
+    def flush(self):
+        with self._lock:
+            self._table.flush()
+
+    def query(self, text: str, exclude: Optional[str] = None, limit: int = 10) -> Dict:
+        """Indexed documents sharing fingerprints with the text, with the matching passages"""
+        return self.query_batch([self.fingerprints(text)], exclude, limit)[0]
+
+    def query_batch(self, fingerprint_sets: List[Fingerprints], exclude: Optional[str] = None,
+                    limit: int = 10) -> List[Dict]:
+        """Look up many texts in one probe pass, counting shared fingerprints in a texts x documents sparse matrix"""
+        sizes = np.array([len(hashes) for hashes, _, _ in fingerprint_sets], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(sizes)))
+        results = [{'fingerprint_count': int(size), 'matched_fraction': 0.0, 'matches': []} for size in sizes]
+        if not offsets[-1]:
+            return results
+
+        with self._locked(shared=True):
+            self._sync()
+            positions, records = self._lookup(np.concatenate([hashes for hashes, _, _ in fingerprint_sets]))
+            live = np.fromiter(
+                (doc for doc, doc_id in self._doc_ids.items() if doc_id != exclude), dtype=np.uint32
+            )
+            keep = np.isin(records['doc'], live)
+            positions, records = positions[keep], records[keep]
+            documents = {doc: (self._doc_ids[doc], self._documents[self._doc_ids[doc]])
+                         for doc in np.unique(records['doc']).tolist()}
+        if not len(positions):
+            return results
+
+        # Positions index the concatenated hashes; each belongs to one text
+        texts = np.searchsorted(offsets, positions, side='right') - 1
+        doc_numbers, columns = np.unique(records['doc'], return_inverse=True)
+        # A k-gram repeated in the source counts once
+        hits = np.unique(np.stack([positions, columns]), axis=1)
+        hit_texts = np.searchsorted(offsets, hits[0], side='right') - 1
+        shared = csr_matrix(
+            (np.ones(hits.shape[1], dtype=np.int32), (hit_texts, hits[1])), shape=(len(sizes), len(doc_numbers))
+        )
+        matched_positions = np.unique(hits[0])
+        matched = np.bincount(np.searchsorted(offsets, matched_positions, side='right') - 1, minlength=len(sizes))
+
+        # Hits grouped by (text, document) in query then source order, for passage merging
+        order = np.lexsort((records['start'], positions, columns, texts))
+        positions, records, columns, texts = positions[order], records[order], columns[order], texts[order]
+        boundaries = np.flatnonzero(np.diff(texts) | np.diff(columns)) + 1
+        groups = {(int(texts[first]), int(columns[first])): (first, last)
+                  for first, last in zip(np.concatenate(([0], boundaries)), np.concatenate((boundaries, [len(order)])))}
+
+        for text, result in enumerate(results):
+            if not matched[text]:
+                continue
+            _, starts, ends = fingerprint_sets[text]
+            row = shared.getrow(text)
+            top = np.argsort(-row.data, kind='stable')[:limit]
+            result['matched_fraction'] = matched[text] / sizes[text]
+            for column, count in zip(row.indices[top].tolist(), row.data[top].tolist()):
+                first, last = groups[(text, column)]
+                doc_id, document = documents[int(doc_numbers[column])]
+                result['matches'].append({
+                    'doc_id': doc_id,
+                    'matched_fingerprints': count,
+                    'containment': count / sizes[text],
+                    'passages': self._passages(positions[first:last] - offsets[text], records[first:last], starts, ends),
+                    'metadata': document['metadata']
+                })
+        return results
+
+    def _passages(self, positions: np.ndarray, records: np.ndarray,
+                  query_starts: np.ndarray, query_ends: np.ndarray) -> List[Dict]:
+        """Merge fingerprint hits that advance together in both texts into passages"""
+        passages = []
+        current = None
+        last_position = None
+        for position, record in zip(positions.tolist(), records.tolist()):
+            source_start, source_end = record[2], record[3]
+            if (current is not None and position - last_position <= WINNOW_WINDOW
+                    and current['source_start'] <= source_start <= current['source_end'] + PASSAGE_GAP):
+                current['query_end'] = max(current['query_end'], int(query_ends[position]))
+                current['source_end'] = max(current['source_end'], source_end)
+            elif position == last_position:
+                # The same k-gram again elsewhere in the source
+                continue
+            else:
+                current = {
+                    'query_start': int(query_starts[position]),
+                    'query_end': int(query_ends[position]),
+                    'source_start': source_start,
+                    'source_end': source_end
+                }
+                passages.append(current)
+            last_position = position
+        return passages
+
+    def _slots(self, hashes: np.ndarray) -> np.ndarray:
+        # Winnowing keeps small hashes, so spread them with Fibonacci hashing before taking the top bits
+        shift = np.uint64(64 - (len(self._table) - 1).bit_length())
+        with np.errstate(over='ignore'):
+            return ((hashes * FIBONACCI_MULTIPLIER) >> shift).astype(np.int64)
+
+    def _lookup(self, hashes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Every record whose hash matches, with the query position it matched"""
+        table = self._table
+        mask = len(table) - 1
+        pending = np.arange(len(hashes))
+        slots = self._slots(hashes)
+        found_positions, found_records = [], []
+        while len(pending):
+            records = table[slots]
+            occupied = records['doc'] != EMPTY_DOC
+            hit = occupied & (records['hash'] == hashes[pending])
+            found_positions.append(pending[hit])
+            found_records.append(records[hit])
+            pending, slots = pending[occupied], (slots[occupied] + 1) & mask
+        return np.concatenate(found_positions), np.concatenate(found_records)
+
+    def _insert(self, records: np.ndarray):
+        """Linear-probing insert of a batch; records colliding on a free slot take turns"""
+        if self._used + len(records) > MAX_LOAD * len(self._table):
+            self._rebuild(len(records))
+
+        table = self._table
+        mask = len(table) - 1
+        pending = np.arange(len(records))
+        slots = self._slots(records['hash'])
+        while len(pending):
+            free = np.flatnonzero(table['doc'][slots] == EMPTY_DOC)
+            _, first = np.unique(slots[free], return_index=True)
+            winners = free[first]
+            table[slots[winners]] = records[pending[winners]]
+
+            placed = np.zeros(len(pending), dtype=bool)
+            placed[winners] = True
+            pending, slots = pending[~placed], (slots[~placed] + 1) & mask
+        self._used += len(records)
+
+    def _rebuild(self, incoming: int):
+        """Copy live records into a table sized for them plus the incoming batch, then swap it in"""
+        live_records = sum(document['fingerprints'] for document in self._documents.values())
+        capacity = INITIAL_CAPACITY
+        while (live_records + incoming) > MAX_LOAD * capacity:
+            capacity *= 2
+
+        old_table = self._table
+        live = np.fromiter(self._doc_ids, dtype=np.uint32)
+        part_path = self.table_path + '.part'
+        self._table = np.memmap(part_path, dtype=RECORD, mode='w+', shape=(capacity,))
+        self._used = 0
+        for start in range(0, len(old_table), REBUILD_CHUNK):
+            chunk = np.array(old_table[start:start + REBUILD_CHUNK])
+            chunk = chunk[np.isin(chunk['doc'], live)]
+            if len(chunk):
+                self._insert(chunk)
+        self._table.flush()
+
+        del old_table
+        os.replace(part_path, self.table_path)
+        self._table = np.memmap(self.table_path, dtype=RECORD, mode='r+', shape=(capacity,))
+        self._table_inode = os.stat(self.table_path).st_ino
+        self._compact_journal()
+        self._remove_unused_texts()
+        print(f"Fingerprint index rebuilt: {live_records} records, capacity {capacity}")
+
+    def _retire(self, doc_id: str) -> bool:
+        document = self._documents.pop(doc_id, None)
+        if document is None:
+            return False
+        self.generation += 1
+        self._doc_ids.pop(document['doc'], None)
+        return True
+
+    @contextmanager
+    def _locked(self, shared: bool = False):
+        """Thread lock plus an flock on the directory, so other processes' writes are excluded"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            fcntl.flock(self._lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _sync(self):
+        """Catch up with what other processes wrote; a replaced table or journal means a rebuild, so reload"""
+        replaced = (_inode(self.table_path) != self._table_inode
+                    or _inode(self.journal_path) != os.fstat(self._journal_reader.fileno()).st_ino)
+        if replaced:
+            self._load()
+            self.generation += 1
+        elif self._replay():
+            self.generation += 1
+
+    def _journal(self, entry: Dict):
+        with open(self.journal_path, 'a', encoding='utf-8') as journal:
+            journal.write(json.dumps(entry) + '\n')
+        # Our own entries are already applied
+        self._journal_reader.seek(0, os.SEEK_END)
+
+    def _compact_journal(self):
+        """Rewrite the journal as one entry per live document"""
+        part_path = self.journal_path + '.part'
+        with open(part_path, 'w', encoding='utf-8') as journal:
+            journal.write(json.dumps({'op': 'format', 'version': INDEX_FORMAT, 'next_doc': self._next_doc}) + '\n')
+            for doc_id, document in self._documents.items():
+                journal.write(json.dumps({'op': 'add', 'id': doc_id, **document}) + '\n')
+        os.replace(part_path, self.journal_path)
+        self._open_journal()
+        self._journal_reader.seek(0, os.SEEK_END)
+
+    def _text_path(self, digest: str) -> str:
+        return os.path.join(self.texts_dir, digest + '.z')
+
+    def _write_text(self, digest: str, compressed: bytes):
+        path = self._text_path(digest)
+        if os.path.exists(path):
+            return
+        with open(path + '.part', 'wb') as f:
+            f.write(compressed)
+        os.replace(path + '.part', path)
+
+    def _remove_unused_texts(self):
+        live = {document['digest'] + '.z' for document in self._documents.values()}
+        for name in os.listdir(self.texts_dir):
+            if name not in live:
+                try:
+                    os.remove(os.path.join(self.texts_dir, name))
+                except FileNotFoundError:
+                    pass
+
+    def _open_journal(self):
+        if self._journal_reader is not None:
+            self._journal_reader.close()
+        open(self.journal_path, 'ab').close()
+        self._journal_reader = open(self.journal_path, 'rb')
+
+    def _replay(self) -> int:
+        """Apply journal entries past the reader's position; returns how many were read"""
+        applied = 0
+        for line in self._journal_reader:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A torn last line from an interrupted write
+                continue
+            applied += 1
+            op = entry.pop('op')
+            if op == 'format':
+                self._next_doc = max(self._next_doc, entry['next_doc'])
+            elif op == 'reserve':
+                self._next_doc = max(self._next_doc, entry['doc'] + 1)
+                # Another process inserted into the shared table
+                self._used += entry.get('records', 0)
+            elif op == 'add':
+                doc_id = entry.pop('id')
+                self._retire(doc_id)
+                self._documents[doc_id] = entry
+                self._doc_ids[entry['doc']] = doc_id
+                self._next_doc = max(self._next_doc, entry['doc'] + 1)
+            elif op == 'remove':
+                self._retire(entry['id'])
+        return applied
+
+    def _load(self):
+        """Replace in-memory state with the journal and table on disk"""
+        self._documents.clear()
+        self._doc_ids.clear()
+        self._next_doc = EMPTY_DOC + 1
+        self._used = 0
+        self._open_journal()
+        self._replay()
+
+        # Capacity comes from the file itself, so an interrupted rebuild can't leave it mismatched
+        if os.path.exists(self.table_path) and os.path.getsize(self.table_path) >= RECORD.itemsize * INITIAL_CAPACITY:
+            capacity = os.path.getsize(self.table_path) // RECORD.itemsize
+            self._table = np.memmap(self.table_path, dtype=RECORD, mode='r+', shape=(capacity,))
+        else:
+            self._table = np.memmap(self.table_path, dtype=RECORD, mode='w+', shape=(INITIAL_CAPACITY,))
+            # Journal entries without a table have nothing to point at
+            self._documents.clear()
+            self._doc_ids.clear()
+        self._table_inode = os.stat(self.table_path).st_ino
+        self._used = sum(
+            int(np.count_nonzero(self._table['doc'][start:start + REBUILD_CHUNK] != EMPTY_DOC))
+            for start in range(0, len(self._table), REBUILD_CHUNK)
+        )
+
+
+def _inode(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_ino
+    except FileNotFoundError:
+        return None
+
+
+fingerprint_index = FingerprintIndex()
+atexit.register(fingerprint_index.flush)
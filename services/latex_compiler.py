@@ -0,0 +1,180 @@
+import hashlib
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+from config import Config
+from services.artifact_store import artifact_store
+from services.render_pool import RenderBusy, RenderTimeout
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Bump when engine flags change so cached compiles are redone
+COMPILER_VERSION = '1'
+SUPPORTED_ENGINES = ('tectonic', 'pdflatex')
+MAIN_FILE = 'main.tex'
+LOG_TAIL_CHARS = 2000
+MAX_OUTPUT_BYTES = 256 * 1024 * 1024
+
+# kpathsea settings: no \write18, and \openin/\openout restricted to the job directory
+SANDBOX_ENV = {
+    'shell_escape': 'f',
+    'openout_any': 'p',
+    'openin_any': 'p'
+}
+
+
+class LaTeXEngineUnavailable(Exception):
+    """No supported TeX engine is installed"""
+
+
+class LaTeXCompileError(Exception):
+    """The engine ran but produced no PDF; log holds the end of its output"""
+
+    def __init__(self, message: str, log: str = ''):
+        super().__init__(message)
+        self.log = log
+
+
+# Run by a fresh interpreter between fork and the engine: cap CPU time and output size, then exec.
+# Doing this in preexec_fn instead is unsafe in a threaded server (the child can deadlock on a lock).
+RLIMIT_WRAPPER = (
+    "import os, resource, sys\n"
+    "cpu, fsize = int(sys.argv[1]), int(sys.argv[2])\n"
+    "resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))\n"
+    "resource.setrlimit(resource.RLIMIT_FSIZE, (fsize, fsize))\n"
+    "os.execv(sys.argv[3], sys.argv[3:])\n"
+)
+
+
+def _with_resource_limits(command: List[str], cpu_seconds: int) -> List[str]:
+    """command wrapped so it runs with capped CPU time and output file size where rlimits exist"""
+    if resource is None:
+        return command
+    return [sys.executable, '-c', RLIMIT_WRAPPER, str(cpu_seconds), str(MAX_OUTPUT_BYTES), *command]
+
+
+class LaTeXCompiler:
+    """Compiles .tex sources with a local TeX engine in throwaway directories, cached by source hash"""
+
+    def __init__(self, store=None, engine: str = None, max_concurrent: int = None,
+                 timeout: float = None, queue_timeout: float = None):
+        self.store = store or artifact_store
+        self.engine, self.engine_path = self._find_engine(engine or Config.LATEX_ENGINE)
+        self.timeout = timeout or Config.LATEX_COMPILE_TIMEOUT
+        self.queue_timeout = queue_timeout or Config.RENDER_QUEUE_TIMEOUT
+        # Separate from the PDF render slots; compiles are slow and must not starve exports
+        self._slots = threading.BoundedSemaphore(max_concurrent or Config.LATEX_MAX_CONCURRENT)
+
+    @property
+    def available(self) -> bool:
+        return self.engine is not None
+
+    def compile(self, tex_source: str, assets: Dict[str, bytes] = None) -> Tuple[str, str]:
+        """(key, path) of the compiled PDF; unchanged sources and assets are served from the cache"""
+        if not self.available:
+            raise LaTeXEngineUnavailable(f"None of {', '.join(SUPPORTED_ENGINES)} is installed")
+
+        assets = assets or {}
+        for name in assets:
+            if os.path.basename(name) != name or name in ('', '.', '..', MAIN_FILE):
+                raise ValueError(f"Invalid asset name: {name}")
+
+        return self.store.get_or_create_file(
+            self._source_digest(tex_source, assets), 'latex-pdf', '.pdf', COMPILER_VERSION,
+            lambda path: self._compile_to(tex_source, assets, path)
+        )
+
+    def _source_digest(self, tex_source: str, assets: Dict[str, bytes]) -> Dict:
+        return {
+            'engine': self.engine,
+            'tex': hashlib.sha256(tex_source.encode('utf-8')).hexdigest(),
+            'assets': {name: hashlib.sha256(data).hexdigest() for name, data in assets.items()}
+        }
+
+    def _compile_to(self, tex_source: str, assets: Dict[str, bytes], output_path: str):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise RenderBusy(f"No LaTeX compile slot free after {self.queue_timeout}s")
+        try:
+            with tempfile.TemporaryDirectory(prefix='latex_compile_') as job_dir:
+                with open(os.path.join(job_dir, MAIN_FILE), 'w', encoding='utf-8') as f:
+                    f.write(tex_source)
+                for name, data in assets.items():
+                    with open(os.path.join(job_dir, name), 'wb') as f:
+                        f.write(data)
+
+                for command in self._commands(job_dir):
+                    self._run(command, job_dir)
+
+                pdf_path = os.path.join(job_dir, 'main.pdf')
+                if not os.path.exists(pdf_path):
+                    raise LaTeXCompileError('Compilation produced no PDF', self._read_log(job_dir))
+                shutil.move(pdf_path, output_path)
+        finally:
+            self._slots.release()
+
+    def _commands(self, job_dir: str) -> List[List[str]]:
+        if self.engine == 'tectonic':
+            # --untrusted disables shell escape and other insecure features; reruns are automatic
+            return [[self.engine_path, '--untrusted', '--chatter', 'minimal', '--outdir', job_dir, MAIN_FILE]]
+        # Second pass resolves \ref and bibliography numbers
+        command = [self.engine_path, '-no-shell-escape', '-interaction=nonstopmode', '-halt-on-error',
+                   '-output-directory', job_dir, MAIN_FILE]
+        return [command, command]
+
+    def _run(self, command: List[str], job_dir: str):
+        env = {'PATH': os.environ.get('PATH', ''), 'HOME': job_dir, 'TMPDIR': job_dir, **SANDBOX_ENV}
+        # Own session so a timeout can kill the engine and anything it started
+        process = subprocess.Popen(
+            _with_resource_limits(command, int(self.timeout) + 1), cwd=job_dir, env=env,
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            start_new_session=os.name == 'posix'
+        )
+        try:
+            output, _ = process.communicate(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            self._kill(process)
+            raise RenderTimeout(f"LaTeX compile exceeded {self.timeout}s")
+
+        if process.returncode != 0:
+            log = self._read_log(job_dir) or output.decode('utf-8', 'replace')[-LOG_TAIL_CHARS:]
+            raise LaTeXCompileError(f"{self.engine} exited with status {process.returncode}", log)
+
+    def _kill(self, process: subprocess.Popen):
+        """Stop the engine and anything it started"""
+        try:
+            if os.name == 'posix':
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except ProcessLookupError:
+            pass
+        process.communicate()
+
+    def _read_log(self, job_dir: str) -> str:
+        log_path = os.path.join(job_dir, 'main.log')
+        if not os.path.exists(log_path):
+            return ''
+        with open(log_path, 'r', encoding='utf-8', errors='replace') as f:
+            return f.read()[-LOG_TAIL_CHARS:]
+
+    def _find_engine(self, preferred: str) -> Tuple[Optional[str], Optional[str]]:
+        candidates = SUPPORTED_ENGINES if preferred in (None, '', 'auto') else (preferred,)
+        for engine in candidates:
+            if engine not in SUPPORTED_ENGINES:
+                print(f"Unsupported LaTeX engine '{engine}', expected one of {SUPPORTED_ENGINES}")
+                continue
+            path = shutil.which(engine)
+            if path:
+                return engine, path
+        return None, None
+
+
+latex_compiler = LaTeXCompiler()
@@ -1,231 +1,80 @@
-from typing import Dict, List
+import re
+from functools import lru_cache
+from typing import Dict, Iterator
+from services.document_tree import Section, parse_document
 
-class LaTeXService:
-    def __init__(self):
-        self.document_classes = {
-            'article': 'article',
-            'report': 'report',
-            'book': 'book',
-            'ieee': 'IEEEtran',
-            'acm': 'acmart'
-        }
-        
-        self.packages = [
-            'inputenc',
-            'fontenc', 
-            'babel',
-            'amsmath',
-            'amsfonts',
-            'amssymb',
-            'graphicx',
-            'cite',
-            'url',
-            'hyperref'
-        ]
-    
-    def generate_latex_document(self, paper_content: Dict, template_type: str = 'ieee') -> str:
-        """Generate IEEE-formatted LaTeX document from paper content"""
-        # Always generate IEEE format for consistency
-        return self.generate_ieee_template(paper_content)
-    
-    def _generate_preamble(self, template_type: str, citation_style: str = 'APA') -> str:
-        """Generate LaTeX document preamble"""
-        doc_class = self.document_classes.get(template_type, 'article')
-        
-        if citation_style.upper() == 'APA':
-            preamble = f"\\documentclass[12pt,a4paper]{{{doc_class}}}\n\n"
-            preamble += "% APA Style packages\n"
-            preamble += "\\usepackage[utf8]{inputenc}\n"
-            preamble += "\\usepackage[T1]{fontenc}\n"
-            preamble += "\\usepackage[english]{babel}\n"
-            preamble += "\\usepackage{amsmath,amsfonts,amssymb}\n"
-            preamble += "\\usepackage{graphicx}\n"
-            preamble += "\\usepackage{apacite}\n"
-            preamble += "\\usepackage{url}\n"
-            preamble += "\\usepackage[colorlinks=true,linkcolor=blue,citecolor=blue,urlcolor=blue]{hyperref}\n\n"
-            preamble += "% APA formatting\n"
-            preamble += "\\setlength{\\parindent}{0.5in}\n"
-            preamble += "\\setlength{\\parskip}{0pt}\n"
-            preamble += "\\linespread{2.0}\n\n"
-        elif citation_style.upper() == 'MLA':
-            preamble = f"\\documentclass[12pt,letterpaper]{{{doc_class}}}\n\n"
-            preamble += "% MLA Style packages\n"
-            preamble += "\\usepackage[utf8]{inputenc}\n"
-            preamble += "\\usepackage[T1]{fontenc}\n"
-            preamble += "\\usepackage[english]{babel}\n"
-            preamble += "\\usepackage{amsmath,amsfonts,amssymb}\n"
-            preamble += "\\usepackage{graphicx}\n"
-            preamble += "\\usepackage{mla13}\n"
-            preamble += "\\usepackage{url}\n"
-            preamble += "\\usepackage[colorlinks=true,linkcolor=blue,citecolor=blue,urlcolor=blue]{hyperref}\n\n"
-            preamble += "% MLA formatting\n"
-            preamble += "\\setlength{\\parindent}{0.5in}\n"
-            preamble += "\\setlength{\\parskip}{0pt}\n"
-            preamble += "\\linespread{2.0}\n\n"
-        else:
-            preamble = f"\\documentclass[12pt,a4paper]{{{doc_class}}}\n\n"
-            preamble += "% Standard packages\n"
-            preamble += "\\usepackage[utf8]{inputenc}\n"
-            preamble += "\\usepackage[T1]{fontenc}\n"
-            preamble += "\\usepackage[english]{babel}\n"
-            preamble += "\\usepackage{amsmath,amsfonts,amssymb}\n"
-            preamble += "\\usepackage{graphicx}\n"
-            preamble += "\\usepackage{cite}\n"
-            preamble += "\\usepackage{url}\n"
-            preamble += "\\usepackage[colorlinks=true,linkcolor=blue,citecolor=blue,urlcolor=blue]{hyperref}\n\n"
-            preamble += "% Document settings\n"
-            preamble += "\\setlength{\\parindent}{0pt}\n"
-            preamble += "\\setlength{\\parskip}{6pt}\n"
-            preamble += "\\linespread{1.5}\n\n"
-        
-        return preamble
-    
-    def _generate_title_page(self, paper_content: Dict, citation_style: str = 'APA') -> str:
-        """Generate LaTeX title page"""
-        title = self._escape_latex(paper_content.get('title', 'Research Paper'))
-        
-        if citation_style.upper() == 'MLA':
-            # MLA format - no title page, header format
-            title_page = "\\begin{document}\n"
-            title_page += "\\firstname{Student}\n"
-            title_page += "\\lastname{Name}\n"
-            title_page += "\\professor{Professor Name}\n"
-            title_page += "\\class{Course Name}\n"
-            title_page += "\\title{" + title + "}\n"
-            title_page += "\\date{\\today}\n"
-            title_page += "\\makeheader\n\n"
-        else:
-            # APA format - centered title page
-            title_page = "\\begin{document}\n"
-            title_page += "\\begin{titlepage}\n"
-            title_page += "\\centering\n"
-            title_page += "\\vspace*{2in}\n"
-            title_page += f"\\textbf{{\\Large {title}}}\\\\[0.5in]\n"
-            title_page += "\\textbf{Generated by AI Research Paper Generator}\\\\[0.2in]\n"
-            title_page += "\\textbf{Hackathon Project 2024}\\\\[0.5in]\n"
-            title_page += "\\today\n"
-            title_page += "\\end{titlepage}\n"
-            title_page += "\\newpage\n\n"
-        
-        return title_page
-    
-    def _generate_document_body(self, paper_content: Dict) -> str:
-        """Generate main document body"""
-        body = ""
-        
-        # Abstract
-        if 'abstract' in paper_content:
-            body += "\\begin{abstract}\n"
-            body += self._escape_latex(paper_content['abstract'])
-            body += "\n\\end{abstract}\n\n"
-        
-        # Table of contents (optional)
-        body += "\\tableofcontents\n"
-        body += "\\newpage\n\n"
-        
-        # Introduction
-        if 'introduction' in paper_content:
-            body += "\\section{Introduction}\n"
-            body += self._escape_latex(paper_content['introduction'])
-            body += "\n\n"
-        
-        # Literature Review
-        if 'literature_review' in paper_content:
-            body += "\\section{Literature Review}\n"
-            body += self._escape_latex(paper_content['literature_review'])
-            body += "\n\n"
-        
-        # Methodology
-        if 'methodology' in paper_content:
-            body += "\\section{Methodology}\n"
-            body += self._escape_latex(paper_content['methodology'])
-            body += "\n\n"
-        
-        # Results
-        if 'results' in paper_content:
-            body += "\\section{Results}\n"
-            body += self._escape_latex(paper_content['results'])
-            body += "\n\n"
-        
-        # Discussion
-        if 'discussion' in paper_content:
-            body += "\\section{Discussion}\n"
-            body += self._escape_latex(paper_content['discussion'])
-            body += "\n\n"
-        
-        # Conclusion
-        if 'conclusion' in paper_content:
-            body += "\\section{Conclusion}\n"
-            body += self._escape_latex(paper_content['conclusion'])
-            body += "\n\n"
-        
-        # Key Insights
-        if 'summary' in paper_content and paper_content['summary']:
-            body += "\\section{Key Insights}\n"
-            body += "\\begin{itemize}\n"
-            for point in paper_content['summary']:
-                body += f"\\item {self._escape_latex(point)}\n"
-            body += "\\end{itemize}\n\n"
-        
-        return body
-    
-    def _generate_bibliography(self, paper_content: Dict, citation_style: str = 'APA') -> str:
-        """Generate LaTeX bibliography"""
-        if not paper_content.get('references'):
-            return ""
-        
-        if citation_style.upper() == 'MLA':
-            bibliography = "\\begin{workscited}\n"
-            for reference in paper_content['references']:
-                clean_ref = self._escape_latex(reference)
-                bibliography += f"\\bibent {clean_ref}\n\n"
-            bibliography += "\\end{workscited}\n\n"
-        elif citation_style.upper() == 'APA':
-            bibliography = "\\bibliographystyle{apacite}\n"
-            bibliography += "\\section*{References}\n"
-            bibliography += "\\begin{thebibliography}{99}\n"
-            for i, reference in enumerate(paper_content['references'], 1):
-                clean_ref = self._escape_latex(reference)
-                bibliography += f"\\bibitem{{ref{i}}} {clean_ref}\n\n"
-            bibliography += "\\end{thebibliography}\n\n"
-        else:
-            # IEEE and others
-            bibliography = "\\begin{thebibliography}{99}\n"
-            for i, reference in enumerate(paper_content['references'], 1):
-                clean_ref = self._escape_latex(reference)
-                bibliography += f"\\bibitem{{ref{i}}} {clean_ref}\n\n"
-            bibliography += "\\end{thebibliography}\n\n"
-        
-        return bibliography
-    
-    def _escape_latex(self, text: str) -> str:
-        """Escape special LaTeX characters"""
-        if not text:
-            return ""
-        
-        # LaTeX special characters that need escaping
-        latex_chars = {
-            '&': '\\&',
-            '%': '\\%',
-            '$': '\\$',
-            '#': '\\#',
-            '^': '\\textasciicircum{}',
-            '_': '\\_',
-            '{': '\\{',
-            '}': '\\}',
-            '~': '\\textasciitilde{}',
-            '\\': '\\textbackslash{}'
-        }
-        
-        escaped_text = text
-        for char, replacement in latex_chars.items():
-            escaped_text = escaped_text.replace(char, replacement)
-        
-        return escaped_text
-    
-    def generate_ieee_template(self, paper_content: Dict) -> str:
-        """Generate IEEE conference paper template ready for two-column PDF"""
-        latex_content = """% IEEE Conference Paper Template
+# LaTeX special characters in replacement order: braces before the escapes that insert braces
+LATEX_ESCAPES = {
+    '{': '\\{',
+    '}': '\\}',
+    '&': '\\&',
+    '%': '\\%',
+    '$': '\\$',
+    '#': '\\#',
+    '^': '\\textasciicircum{}',
+    '_': '\\_',
+    '~': '\\textasciitilde{}'
+}
+# Backslashes are set aside before the other escapes run, so no inserted escape is escaped again
+LATEX_BACKSLASH = '\\textbackslash{}'
+BACKSLASH_PLACEHOLDER = '\x00'
+LATEX_BOLD = re.compile(r'\*\*(.+?)\*\*')
+LATEX_ITALIC = re.compile(r'(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?![\w*])')
+LATEX_CODE = re.compile(r'`([^`]+)`')
+LIST_ENVIRONMENTS = {'bullet': 'itemize', 'number': 'enumerate'}
+FIGURE_REF = re.compile(r'Fig\. 1(?!\d)')
+TABLE_REF = re.compile(r'Table I(?!\w)')
+
+PREAMBLE_STYLES = {
+    'APA': ('a4paper', 'APA Style packages', 'apacite', 'APA formatting', '0.5in', '0pt', '2.0'),
+    'MLA': ('letterpaper', 'MLA Style packages', 'mla13', 'MLA formatting', '0.5in', '0pt', '2.0'),
+    'DEFAULT': ('a4paper', 'Standard packages', 'cite', 'Document settings', '0pt', '6pt', '1.5')
+}
+
+PREAMBLE_TEMPLATE = """\\documentclass[12pt,{paper}]{{{doc_class}}}
+
+% {packages_comment}
+\\usepackage[utf8]{{inputenc}}
+\\usepackage[T1]{{fontenc}}
+\\usepackage[english]{{babel}}
+\\usepackage{{amsmath,amsfonts,amssymb}}
+\\usepackage{{graphicx}}
+\\usepackage{{{citation_package}}}
+\\usepackage{{url}}
+\\usepackage[colorlinks=true,linkcolor=blue,citecolor=blue,urlcolor=blue]{{hyperref}}
+
+% {settings_comment}
+\\setlength{{\\parindent}}{{{parindent}}}
+\\setlength{{\\parskip}}{{{parskip}}}
+\\linespread{{{linespread}}}
+
+"""
+
+MLA_TITLE_PAGE = """\\begin{{document}}
+\\firstname{{Student}}
+\\lastname{{Name}}
+\\professor{{Professor Name}}
+\\class{{Course Name}}
+\\title{{{title}}}
+\\date{{\\today}}
+\\makeheader
+
+"""
+
+APA_TITLE_PAGE = """\\begin{{document}}
+\\begin{{titlepage}}
+\\centering
+\\vspace*{{2in}}
+\\textbf{{\\Large {title}}}\\\\[0.5in]
+\\textbf{{Generated by AI Research Paper Generator}}\\\\[0.2in]
+\\textbf{{Hackathon Project 2024}}\\\\[0.5in]
+\\today
+\\end{{titlepage}}
+\\newpage
+
+"""
+
+IEEE_PREAMBLE = """% IEEE Conference Paper Template
 % Ready for two-column PDF generation
 % Times New Roman font, 10pt text, single-spaced
 
@@ -247,13 +96,8 @@ class LaTeXService:
 \\begin{document}
 
 """
-        
-        # Title (Centered, Bold, Times New Roman, 24pt equivalent)
-        title = self._escape_latex(paper_content.get('title', 'Research Paper'))
-        latex_content += f"\\title{{{title}}}\n\n"
-        
-        # Authors & Affiliations with emails
-        latex_content += """\\author{
+
+IEEE_AUTHORS = """\\author{
 \\IEEEauthorblockN{John Smith\\IEEEauthorrefmark{1}, Jane Doe\\IEEEauthorrefmark{2}, Michael Johnson\\IEEEauthorrefmark{1}}
 \\IEEEauthorblockA{\\IEEEauthorrefmark{1}Department of Computer Science, University of Technology\\\\
 Email: john.smith@university.edu, michael.johnson@university.edu}
@@ -264,45 +108,19 @@ Email: jane.doe@techuni.edu}
 \\maketitle
 
 """
-        
-        # Abstract (Maximum 250 words)
-        if 'abstract' in paper_content:
-            abstract_text = self._escape_latex(paper_content['abstract'])
-            latex_content += "\\begin{abstract}\n"
-            latex_content += abstract_text
-            latex_content += "\n\\end{abstract}\n\n"
-        
-        # Keywords (5-7 keywords)
-        keywords = paper_content.get('metadata', {}).get('keywords', ['artificial intelligence', 'machine learning', 'research', 'methodology', 'analysis'])
-        if isinstance(keywords, list):
-            keywords_text = ', '.join(keywords[:7])
-        else:
-            keywords_text = str(keywords)
-        latex_content += f"\\begin{{IEEEkeywords}}\n{self._escape_latex(keywords_text)}\n\\end{{IEEEkeywords}}\n\n"
-        
-        # IEEE Sections with proper numbering (I, II, III, etc.)
-        sections = [
-            ('introduction', 'INTRODUCTION'),
-            ('literature_review', 'RELATED WORK'),
-            ('methodology', 'METHODOLOGY'),
-            ('results', 'RESULTS'),
-            ('discussion', 'DISCUSSION'),
-            ('conclusion', 'CONCLUSION')
-        ]
-        
-        for section_key, section_title in sections:
-            if section_key in paper_content:
-                latex_content += f"\\section{{{section_title}}}\n"
-                section_content = self._escape_latex(paper_content[section_key])
-                # Add figure and table references
-                section_content = section_content.replace('Fig. 1', '\\ref{fig:1}')
-                section_content = section_content.replace('Table I', '\\ref{tab:1}')
-                latex_content += section_content
-                latex_content += "\n\n"
-        
-        # Sample figure (if charts exist)
-        if paper_content.get('charts'):
-            latex_content += """% Sample Figure
+
+IEEE_SECTION_TITLES = {
+    'introduction': 'INTRODUCTION',
+    'literature_review': 'RELATED WORK',
+    'methodology': 'METHODOLOGY',
+    'results': 'RESULTS',
+    'discussion': 'DISCUSSION',
+    'conclusion': 'CONCLUSION'
+}
+
+IEEE_DEFAULT_KEYWORDS = ['artificial intelligence', 'machine learning', 'research', 'methodology', 'analysis']
+
+IEEE_SAMPLE_FIGURE = """% Sample Figure
 \\begin{figure}[htbp]
 \\centerline{\\includegraphics[width=\\columnwidth]{figure1.png}}
 \\caption{Research visualization showing key findings.}
@@ -310,9 +128,8 @@ Email: jane.doe@techuni.edu}
 \\end{figure}
 
 """
-        
-        # Sample table
-        latex_content += """% Sample Table
+
+IEEE_SAMPLE_TABLE = """% Sample Table
 \\begin{table}[htbp]
 \\caption{Performance Comparison Results}
 \\begin{center}
@@ -330,36 +147,16 @@ Proposed & 89.7 & 120 \\\\
 \\end{table}
 
 """
-        
-        # References in IEEE format [1], [2], etc.
-        latex_content += "\\begin{thebibliography}{99}\n\n"
-        
-        if paper_content.get('references'):
-            for i, reference in enumerate(paper_content['references'], 1):
-                clean_ref = self._escape_latex(reference)
-                latex_content += f"\\bibitem{{ref{i}}}\n{clean_ref}\n\n"
-        else:
-            # Sample IEEE references
-            sample_refs = [
-                'J. Smith and A. Johnson, "Machine Learning Applications in Healthcare," IEEE Trans. Biomed. Eng., vol. 68, no. 3, pp. 123-135, Mar. 2021.',
-                'M. Brown et al., "Deep Learning for Medical Diagnosis," in Proc. IEEE Conf. Computer Vision, 2022, pp. 45-52.',
-                'K. Wilson, "Advanced AI Techniques," IEEE Computer Society, 2023.',
-                'L. Davis and R. Miller, "Data Analysis Methods," Journal of AI Research, vol. 15, pp. 78-92, 2023.',
-                'S. Taylor, "Future Directions in Machine Learning," IEEE Intelligent Systems, vol. 38, no. 2, pp. 15-28, 2023.'
-            ]
-            for i, ref in enumerate(sample_refs, 1):
-                latex_content += f"\\bibitem{{ref{i}}}\n{self._escape_latex(ref)}\n\n"
-        
-        latex_content += "\\end{thebibliography}\n\n"
-        
-        # End document
-        latex_content += "\\end{document}\n"
-        
-        return latex_content
-    
-    def generate_acm_template(self, paper_content: Dict) -> str:
-        """Generate ACM article template"""
-        latex_content = """\\documentclass[sigconf]{acmart}
+
+IEEE_SAMPLE_REFERENCES = (
+    'J. Smith and A. Johnson, "Machine Learning Applications in Healthcare," IEEE Trans. Biomed. Eng., vol. 68, no. 3, pp. 123-135, Mar. 2021.',
+    'M. Brown et al., "Deep Learning for Medical Diagnosis," in Proc. IEEE Conf. Computer Vision, 2022, pp. 45-52.',
+    'K. Wilson, "Advanced AI Techniques," IEEE Computer Society, 2023.',
+    'L. Davis and R. Miller, "Data Analysis Methods," Journal of AI Research, vol. 15, pp. 78-92, 2023.',
+    'S. Taylor, "Future Directions in Machine Learning," IEEE Intelligent Systems, vol. 38, no. 2, pp. 15-28, 2023.'
+)
+
+ACM_PREAMBLE = """\\documentclass[sigconf]{acmart}
 
 \\usepackage{booktabs}
 \\usepackage{ccicons}
@@ -367,12 +164,8 @@ Proposed & 89.7 & 120 \\\\
 \\begin{document}
 
 """
-        
-        # Title and authors
-        title = self._escape_latex(paper_content.get('title', 'Research Paper'))
-        latex_content += f"\\title{{{title}}}\n\n"
-        
-        latex_content += """\\author{AI Research Paper Generator}
+
+ACM_AUTHORS = """\\author{AI Research Paper Generator}
 \\affiliation{%
   \\institution{Hackathon Project 2024}
   \\city{Generated}
@@ -382,15 +175,8 @@ Proposed & 89.7 & 120 \\\\
 
 \\begin{abstract}
 """
-        
-        # Abstract
-        if 'abstract' in paper_content:
-            latex_content += self._escape_latex(paper_content['abstract'])
-        
-        latex_content += "\n\\end{abstract}\n\n"
-        
-        # CCS concepts and keywords
-        latex_content += """\\begin{CCSXML}
+
+ACM_CCS = """\\begin{CCSXML}
 <ccs2012>
 <concept>
 <concept_id>10010147.10010178.10010179</concept_id>
@@ -403,36 +189,249 @@ Proposed & 89.7 & 120 \\\\
 \\ccsdesc[500]{Computing methodologies~Artificial intelligence}
 
 """
-        
-        if paper_content.get('metadata', {}).get('keywords'):
-            keywords = ', '.join(paper_content['metadata']['keywords'])
-            latex_content += f"\\keywords{{{self._escape_latex(keywords)}}}\n\n"
-        
-        latex_content += "\\maketitle\n\n"
-        
-        # Sections
-        sections = [
-            ('introduction', 'Introduction'),
-            ('literature_review', 'Related Work'),
-            ('methodology', 'Methodology'),
-            ('results', 'Results and Discussion'),
-            ('conclusion', 'Conclusion')
+
+# ACM folds discussion into its results section title and leaves it out
+ACM_SECTION_TITLES = {
+    'introduction': 'Introduction',
+    'literature_review': 'Related Work',
+    'methodology': 'Methodology',
+    'results': 'Results and Discussion',
+    'conclusion': 'Conclusion'
+}
+
+
+def _escape_fragment(text: str) -> str:
+    for char, replacement in LATEX_ESCAPES.items():
+        if char in text:
+            text = text.replace(char, replacement)
+    return text
+
+
+@lru_cache(maxsize=None)
+def _compile_preamble(doc_class: str, style: str) -> str:
+    paper, packages_comment, citation_package, settings_comment, parindent, parskip, linespread = \
+        PREAMBLE_STYLES[style]
+    return PREAMBLE_TEMPLATE.format(
+        paper=paper, doc_class=doc_class, packages_comment=packages_comment,
+        citation_package=citation_package, settings_comment=settings_comment,
+        parindent=parindent, parskip=parskip, linespread=linespread
+    )
+
+
+class LaTeXService:
+    # Bump when template output changes so cached exports are re-rendered
+    TEMPLATE_VERSION = '3'
+
+    def __init__(self):
+        self.document_classes = {
+            'article': 'article',
+            'report': 'report',
+            'book': 'book',
+            'ieee': 'IEEEtran',
+            'acm': 'acmart'
+        }
+
+        self.packages = [
+            'inputenc',
+            'fontenc',
+            'babel',
+            'amsmath',
+            'amsfonts',
+            'amssymb',
+            'graphicx',
+            'cite',
+            'url',
+            'hyperref'
         ]
-        
-        for section_key, section_title in sections:
-            if section_key in paper_content:
-                latex_content += f"\\section{{{section_title}}}\n"
-                latex_content += self._escape_latex(paper_content[section_key])
-                latex_content += "\n\n"
-        
-        # References
-        if paper_content.get('references'):
-            latex_content += "\\begin{thebibliography}{99}\n"
-            for i, reference in enumerate(paper_content['references'], 1):
-                clean_ref = self._escape_latex(reference)
-                latex_content += f"\\bibitem{{ref{i}}} {clean_ref}\n\n"
-            latex_content += "\\end{thebibliography}\n"
-        
-        latex_content += "\\end{document}\n"
-        
-        return latex_content
\ No newline at end of file
+
+    def generate_latex_document(self, paper_content: Dict, template_type: str = 'ieee') -> str:
+        """Generate IEEE-formatted LaTeX document from paper content"""
+        # Always generate IEEE format for consistency
+        return self.generate_ieee_template(paper_content)
+
+    def write_latex_document(self, paper_content: Dict, output) -> int:
+        """Stream the IEEE document into a text file object, returning characters written"""
+        written = 0
+        for chunk in self.iter_ieee_template(paper_content):
+            written += output.write(chunk)
+        return written
+
+    def _generate_preamble(self, template_type: str, citation_style: str = 'APA') -> str:
+        """Generate LaTeX document preamble"""
+        doc_class = self.document_classes.get(template_type, 'article')
+        style = citation_style.upper()
+        return _compile_preamble(doc_class, style if style in PREAMBLE_STYLES else 'DEFAULT')
+
+    def _generate_title_page(self, paper_content: Dict, citation_style: str = 'APA') -> str:
+        """Generate LaTeX title page"""
+        title = self._escape_latex(parse_document(paper_content).display_title)
+        # MLA has no title page, only a header; everything else gets the centered APA page
+        template = MLA_TITLE_PAGE if citation_style.upper() == 'MLA' else APA_TITLE_PAGE
+        return template.format(title=title)
+
+    def _generate_document_body(self, paper_content: Dict) -> str:
+        """Generate main document body"""
+        tree = parse_document(paper_content)
+        parts = []
+
+        if tree.abstract is not None:
+            parts += ["\\begin{abstract}\n", self._escape_latex(tree.abstract), "\n\\end{abstract}\n\n"]
+
+        # Table of contents (optional)
+        parts.append("\\tableofcontents\n\\newpage\n\n")
+
+        for section in tree.sections.values():
+            parts += [f"\\section{{{section.title}}}\n", self._section_latex(section), "\n\n"]
+
+        if tree.summary:
+            parts.append("\\section{Key Insights}\n\\begin{itemize}\n")
+            parts += [f"\\item {self._escape_latex(point)}\n" for point in tree.summary]
+            parts.append("\\end{itemize}\n\n")
+
+        return ''.join(parts)
+
+    def _generate_bibliography(self, paper_content: Dict, citation_style: str = 'APA') -> str:
+        """Generate LaTeX bibliography"""
+        tree = parse_document(paper_content)
+        if not tree.references:
+            return ""
+
+        references = [self._escape_latex(reference) for reference in tree.references]
+        if citation_style.upper() == 'MLA':
+            parts = ["\\begin{workscited}\n"]
+            parts += [f"\\bibent {reference}\n\n" for reference in references]
+            parts.append("\\end{workscited}\n\n")
+        else:
+            # APA adds its bibliography style; IEEE and others use the plain list
+            parts = ["\\bibliographystyle{apacite}\n\\section*{References}\n"] if citation_style.upper() == 'APA' else []
+            parts.append("\\begin{thebibliography}{99}\n")
+            parts += [f"\\bibitem{{ref{i}}} {reference}\n\n" for i, reference in enumerate(references, 1)]
+            parts.append("\\end{thebibliography}\n\n")
+
+        return ''.join(parts)
+
+    def _escape_latex(self, text: str) -> str:
+        """Escape special LaTeX characters"""
+        if not text:
+            return ""
+        text = str(text)
+        if '\\' not in text:
+            return _escape_fragment(text)
+        if BACKSLASH_PLACEHOLDER not in text:
+            # Park backslashes on a placeholder so the inserted escapes are never escaped again
+            escaped = _escape_fragment(text.replace('\\', BACKSLASH_PLACEHOLDER))
+            return escaped.replace(BACKSLASH_PLACEHOLDER, LATEX_BACKSLASH)
+        return LATEX_BACKSLASH.join(_escape_fragment(part) for part in text.split('\\'))
+
+    def _inline_latex(self, text: str) -> str:
+        """Escape text and map **bold**, *italic* and `code` markdown"""
+        latex = self._escape_latex(text)
+        if '`' in latex:
+            latex = LATEX_CODE.sub(r'\\texttt{\1}', latex)
+        if '*' in latex:
+            latex = LATEX_BOLD.sub(r'\\textbf{\1}', latex)
+            latex = LATEX_ITALIC.sub(r'\\emph{\1}', latex)
+        return latex
+
+    def _section_latex(self, section: Section) -> str:
+        """Section blocks as LaTeX: subsections, paragraphs and itemize/enumerate lists"""
+        parts = []
+        open_list = None
+        for kind, text, _ in section.blocks:
+            list_env = LIST_ENVIRONMENTS.get(kind)
+            if list_env != open_list:
+                if open_list:
+                    parts.append(f"\\end{{{open_list}}}")
+                if list_env:
+                    parts.append(f"\\begin{{{list_env}}}")
+                open_list = list_env
+
+            if kind == 'heading':
+                parts.append(f"\\subsection{{{self._inline_latex(text)}}}")
+            elif list_env:
+                parts.append(f"\\item {self._inline_latex(text)}")
+            else:
+                parts.append(self._inline_latex(text))
+        if open_list:
+            parts.append(f"\\end{{{open_list}}}")
+
+        # Items stay on consecutive lines; everything else is separated by a blank line
+        latex = []
+        for part in parts:
+            if latex:
+                latex.append('\n' if part.startswith(('\\item', '\\end{itemize', '\\end{enumerate')) else '\n\n')
+            latex.append(part)
+        return ''.join(latex)
+
+    def generate_ieee_template(self, paper_content: Dict) -> str:
+        """Generate IEEE conference paper template ready for two-column PDF"""
+        return ''.join(self.iter_ieee_template(paper_content))
+
+    def iter_ieee_template(self, paper_content: Dict) -> Iterator[str]:
+        """IEEE document as a sequence of string chunks"""
+        tree = parse_document(paper_content)
+        yield IEEE_PREAMBLE
+
+        # Title (Centered, Bold, Times New Roman, 24pt equivalent)
+        yield f"\\title{{{self._escape_latex(tree.display_title)}}}\n\n"
+        yield IEEE_AUTHORS
+
+        # Abstract (Maximum 250 words)
+        if tree.abstract is not None:
+            yield f"\\begin{{abstract}}\n{self._escape_latex(tree.abstract)}\n\\end{{abstract}}\n\n"
+
+        # Keywords (5-7 keywords)
+        keywords = tree.keywords if tree.keywords is not None else IEEE_DEFAULT_KEYWORDS
+        keywords_text = ', '.join(keywords[:7]) if isinstance(keywords, list) else str(keywords)
+        yield f"\\begin{{IEEEkeywords}}\n{self._escape_latex(keywords_text)}\n\\end{{IEEEkeywords}}\n\n"
+
+        # IEEE Sections with proper numbering (I, II, III, etc.)
+        for section in tree.sections.values():
+            section_content = self._section_latex(section)
+            # Add figure and table references
+            if 'Fig. 1' in section_content:
+                section_content = FIGURE_REF.sub(r'\\ref{fig:1}', section_content)
+            if 'Table I' in section_content:
+                section_content = TABLE_REF.sub(r'\\ref{tab:1}', section_content)
+            yield f"\\section{{{IEEE_SECTION_TITLES[section.key]}}}\n{section_content}\n\n"
+
+        if tree.charts:
+            yield IEEE_SAMPLE_FIGURE
+        yield IEEE_SAMPLE_TABLE
+
+        # References in IEEE format [1], [2], etc.
+        yield "\\begin{thebibliography}{99}\n\n"
+        for i, reference in enumerate(tree.references or IEEE_SAMPLE_REFERENCES, 1):
+            yield f"\\bibitem{{ref{i}}}\n{self._escape_latex(reference)}\n\n"
+        yield "\\end{thebibliography}\n\n\\end{document}\n"
+
+    def generate_acm_template(self, paper_content: Dict) -> str:
+        """Generate ACM article template"""
+        tree = parse_document(paper_content)
+        parts = [
+            ACM_PREAMBLE,
+            f"\\title{{{self._escape_latex(tree.display_title)}}}\n\n",
+            ACM_AUTHORS
+        ]
+
+        if tree.abstract is not None:
+            parts.append(self._escape_latex(tree.abstract))
+        parts += ["\n\\end{abstract}\n\n", ACM_CCS]
+
+        if tree.keywords:
+            parts.append(f"\\keywords{{{self._escape_latex(tree.keywords_text())}}}\n\n")
+
+        parts.append("\\maketitle\n\n")
+
+        for section in tree.sections.values():
+            if section.key in ACM_SECTION_TITLES:
+                parts += [f"\\section{{{ACM_SECTION_TITLES[section.key]}}}\n", self._section_latex(section), "\n\n"]
+
+        if tree.references:
+            parts.append("\\begin{thebibliography}{99}\n")
+            parts += [f"\\bibitem{{ref{i}}} {self._escape_latex(reference)}\n\n"
+                      for i, reference in enumerate(tree.references, 1)]
+            parts.append("\\end{thebibliography}\n")
+
+        parts.append("\\end{document}\n")
+        return ''.join(parts)
@@ -0,0 +1,132 @@
+import copy
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Iterator, List
+from reportlab.platypus import Paragraph, Spacer
+from services.pdf_templates import PDFTemplate
+
+FLOWABLE_CACHE_SIZE = 256
+
+# Converted section flowables keyed by template and section text SHA-256
+flowable_cache = OrderedDict()
+flowable_cache_lock = threading.Lock()
+
+HEADING_LINE = re.compile(r'^(#{1,6})\s+(.+?)\s*#*$')
+BULLET_LINE = re.compile(r'^\s*[-*+•]\s+(.+)$')
+NUMBERED_LINE = re.compile(r'^\s*(\d{1,3})[.)]\s+(.+)$')
+BOLD = re.compile(r'\*\*(.+?)\*\*|(?<!\w)__(.+?)__(?!\w)')
+ITALIC = re.compile(r'(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?![\w*])|(?<!\w)_(?!\s)(.+?)(?<!\s)_(?!\w)')
+CODE = re.compile(r'`([^`]+)`')
+# The line boundaries str.splitlines() recognises
+LINE_BREAK = re.compile(r'\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]')
+MARKUP_CHARS = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;'})
+
+
+def iter_lines(text: str) -> Iterator[str]:
+    """str.splitlines() without materializing every line at once"""
+    position = 0
+    for line_break in LINE_BREAK.finditer(text):
+        yield text[position:line_break.start()]
+        position = line_break.end()
+    if position < len(text):
+        yield text[position:]
+
+
+class MarkdownConverter:
+    """Turns LLM markdown section text into escaped ReportLab paragraph, heading and list flowables"""
+
+    def convert(self, text: str, template: PDFTemplate) -> List:
+        return self.convert_blocks(hashlib.sha256(text.encode('utf-8')).hexdigest(),
+                                   lambda: self.tokenize(text), template)
+
+    def convert_blocks(self, digest: str, blocks, template: PDFTemplate) -> List:
+        """Cached flowables for already tokenized text; blocks may be a callable producing them on a miss"""
+        key = f"{template.name}:{digest}"
+        with flowable_cache_lock:
+            cached = flowable_cache.get(key)
+            if cached is not None:
+                flowable_cache.move_to_end(key)
+
+        if cached is None:
+            cached = list(self.iter_block_flowables(blocks() if callable(blocks) else blocks, template))
+            with flowable_cache_lock:
+                flowable_cache[key] = cached
+                while len(flowable_cache) > FLOWABLE_CACHE_SIZE:
+                    flowable_cache.popitem(last=False)
+
+        # Layout stores wrap state on the flowable; copies keep the parsed fragments shared
+        return [copy.copy(flowable) for flowable in cached]
+
+    def inline(self, text: str) -> str:
+        """Escape ReportLab markup characters and map **bold**, *italic* and `code`"""
+        markup = str(text).translate(MARKUP_CHARS)
+        if '`' in markup:
+            markup = CODE.sub(r'<font face="Courier">\1</font>', markup)
+        if '*' in markup or '_' in markup:
+            markup = BOLD.sub(lambda m: f"<b>{m.group(1) or m.group(2)}</b>", markup)
+            markup = ITALIC.sub(lambda m: f"<i>{m.group(1) or m.group(2)}</i>", markup)
+        return markup
+
+    def tokenize(self, text: str) -> List[tuple]:
+        """Single pass over the lines: ('heading'|'paragraph'|'bullet'|'number', text, marker)"""
+        return list(self.iter_blocks(text))
+
+    def iter_blocks(self, text: str) -> Iterator[tuple]:
+        """tokenize() one block at a time, for low-memory renders"""
+        paragraph = []
+        for raw_line in iter_lines(text):
+            line = raw_line.strip()
+            if not line:
+                if paragraph:
+                    yield ('paragraph', ' '.join(paragraph), None)
+                    paragraph.clear()
+                continue
+
+            block = None
+            heading = HEADING_LINE.match(line)
+            if heading:
+                block = ('heading', heading.group(2), None)
+            else:
+                bullet = BULLET_LINE.match(line)
+                if bullet:
+                    block = ('bullet', bullet.group(1), None)
+                else:
+                    numbered = NUMBERED_LINE.match(line)
+                    if numbered:
+                        block = ('number', numbered.group(2), f"{numbered.group(1)}.")
+
+            if block is None:
+                paragraph.append(line)
+                continue
+            if paragraph:
+                yield ('paragraph', ' '.join(paragraph), None)
+                paragraph.clear()
+            yield block
+        if paragraph:
+            yield ('paragraph', ' '.join(paragraph), None)
+
+    def iter_flowables(self, text: str, template: PDFTemplate) -> Iterator:
+        """Uncached conversion, one flowable at a time, for low-memory renders"""
+        return self.iter_block_flowables(self.iter_blocks(text), template)
+
+    def iter_block_flowables(self, blocks, template: PDFTemplate) -> Iterator:
+        styles = template.styles
+        produced = False
+        for kind, content, marker in blocks:
+            produced = True
+            markup = self.inline(content)
+            if kind == 'heading':
+                yield Paragraph(markup, styles['SubSection'])
+            elif kind == 'bullet':
+                yield Paragraph(markup, styles['ListItem'], bulletText='•')
+            elif kind == 'number':
+                yield Paragraph(markup, styles['ListItem'], bulletText=marker)
+            else:
+                yield Paragraph(markup, styles['Body'])
+        if not produced:
+            yield Spacer(1, 0)
+
+
+markdown_converter = MarkdownConverter()
@@ -0,0 +1,123 @@
+import html
+from typing import Dict, Iterator
+from services.document_tree import DocumentTree, Section, parse_document
+from services.markdown_flowables import BOLD, ITALIC, CODE
+
+HTML_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>{title}</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px; }}
+        h1 {{ color: #333; text-align: center; }}
+        h2 {{ color: #666; border-bottom: 2px solid #eee; }}
+        .abstract {{ background: #f9f9f9; padding: 15px; border-left: 4px solid #007bff; }}
+    </style>
+</head>
+<body>
+    <h1>{title}</h1>
+"""
+HTML_LISTS = {'bullet': 'ul', 'number': 'ol'}
+
+
+class MarkupExporter:
+    """Markdown and HTML emitters over the shared document tree"""
+
+    def to_markdown(self, paper_content: Dict) -> str:
+        return ''.join(self.iter_markdown(parse_document(paper_content)))
+
+    def to_html(self, paper_content: Dict) -> str:
+        return ''.join(self.iter_html(parse_document(paper_content)))
+
+    def iter_markdown(self, tree: DocumentTree) -> Iterator[str]:
+        yield f"# {tree.display_title}\n\n"
+
+        if tree.abstract is not None:
+            yield f"## Abstract\n\n{tree.abstract}\n\n"
+
+        for section in tree.sections.values():
+            yield f"## {section.title}\n\n{self._section_markdown(section)}\n\n"
+
+        if tree.summary:
+            yield "## Key Insights\n\n"
+            yield ''.join(f"- {point}\n" for point in tree.summary) + "\n"
+
+        if tree.references:
+            yield "## References\n\n"
+            yield ''.join(f"{i}. {ref}\n" for i, ref in enumerate(tree.references, 1))
+
+    def iter_html(self, tree: DocumentTree) -> Iterator[str]:
+        yield HTML_HEAD.format(title=html.escape(tree.display_title))
+
+        if tree.abstract is not None:
+            yield f'    <div class="abstract"><h2>Abstract</h2><p>{self.inline(tree.abstract)}</p></div>\n'
+
+        for section in tree.sections.values():
+            yield f'    <h2>{section.title}</h2>\n'
+            yield self._section_html(section)
+
+        if tree.summary:
+            yield '    <h2>Key Insights</h2><ul>\n'
+            yield ''.join(f'        <li>{self.inline(point)}</li>\n' for point in tree.summary)
+            yield '    </ul>\n'
+
+        if tree.references:
+            yield '    <h2>References</h2><ol>\n'
+            yield ''.join(f'        <li>{self.inline(ref)}</li>\n' for ref in tree.references)
+            yield '    </ol>\n'
+
+        yield '</body></html>'
+
+    def inline(self, text: str) -> str:
+        """Escape HTML and map **bold**, *italic* and `code`"""
+        markup = html.escape(str(text), quote=False)
+        if '`' in markup:
+            markup = CODE.sub(r'<code>\1</code>', markup)
+        if '*' in markup or '_' in markup:
+            markup = BOLD.sub(lambda m: f"<strong>{m.group(1) or m.group(2)}</strong>", markup)
+            markup = ITALIC.sub(lambda m: f"<em>{m.group(1) or m.group(2)}</em>", markup)
+        return markup
+
+    def _section_markdown(self, section: Section) -> str:
+        """Blocks back to markdown, with headings nested one level under the section title"""
+        lines = []
+        previous = None
+        for kind, text, marker in section.blocks:
+            if lines and not (kind == previous and kind in HTML_LISTS):
+                lines.append('')
+            if kind == 'heading':
+                lines.append(f"### {text}")
+            elif kind == 'bullet':
+                lines.append(f"- {text}")
+            elif kind == 'number':
+                lines.append(f"{marker} {text}")
+            else:
+                lines.append(text)
+            previous = kind
+        return '\n'.join(lines)
+
+    def _section_html(self, section: Section) -> str:
+        parts = []
+        open_list = None
+        for kind, text, _ in section.blocks:
+            list_tag = HTML_LISTS.get(kind)
+            if list_tag != open_list:
+                if open_list:
+                    parts.append(f'    </{open_list}>\n')
+                if list_tag:
+                    parts.append(f'    <{list_tag}>\n')
+                open_list = list_tag
+
+            if kind == 'heading':
+                parts.append(f'    <h3>{self.inline(text)}</h3>\n')
+            elif list_tag:
+                parts.append(f'        <li>{self.inline(text)}</li>\n')
+            else:
+                parts.append(f'    <p>{self.inline(text)}</p>\n')
+        if open_list:
+            parts.append(f'    </{open_list}>\n')
+        return ''.join(parts)
+
+
+markup_exporter = MarkupExporter()
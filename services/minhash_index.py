@@ -0,0 +1,176 @@
+import hashlib
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional
+import numpy as np
+
+# Word n-grams compared between documents
+SHINGLE_SIZE = 5
+# MinHash permutations, split into LSH bands of NUM_PERM // LSH_BANDS rows.
+# 64 bands of 2 rows make pairs with Jaccard 0.2 candidates 93% of the time, 0.3 over 99%
+NUM_PERM = 128
+LSH_BANDS = 64
+# Shingles hashed per permutation batch; bounds the temporary matrix to NUM_PERM x this
+SIGNATURE_CHUNK = 4096
+MINHASH_SEED = 1
+
+WORD = re.compile(r'\w+')
+ROLLING_PRIME = np.uint64(1099511628211)
+WORD_HASH_CACHE_SIZE = 500000
+
+# Lowercased word -> 64-bit hash, shared by every index in the process
+word_hash_cache = {}
+
+
+def _word_hash(word: str) -> int:
+    return int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def hash_words(words: List[str]) -> np.ndarray:
+    cache = word_hash_cache
+    if len(cache) > WORD_HASH_CACHE_SIZE:
+        cache.clear()
+    return np.fromiter(
+        (cache[w] if w in cache else cache.setdefault(w, _word_hash(w)) for w in words),
+        dtype=np.uint64, count=len(words)
+    )
+
+
+def kgram_hashes(hashes: np.ndarray, k: int) -> np.ndarray:
+    """Polynomial rolling hash of every run of k consecutive word hashes (wraps mod 2^64)"""
+    n = min(k, len(hashes))
+    count = len(hashes) - n + 1
+    kgrams = hashes[:count].copy()
+    with np.errstate(over='ignore'):
+        for offset in range(1, n):
+            kgrams = kgrams * ROLLING_PRIME + hashes[offset:offset + count]
+    return kgrams
+
+
+class MinHashIndex:
+    """Shingled documents with MinHash signatures in an LSH table, for near-duplicate source lookup"""
+
+    def __init__(self, num_perm: int = NUM_PERM, bands: int = LSH_BANDS, shingle_size: int = SHINGLE_SIZE):
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        # Multiply-shift hash family: odd 64-bit multipliers, top 32 bits of a*x + b
+        rng = np.random.default_rng(MINHASH_SEED)
+        self._a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+        self._lock = threading.RLock()
+        self._documents = {}
+        self._buckets = [defaultdict(set) for _ in range(bands)]
+        # Bumped on every change, so callers can tell whether cached query results still hold
+        self.generation = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._documents)
+
+    def __contains__(self, doc_id: str) -> bool:
+        with self._lock:
+            return doc_id in self._documents
+
+    def shingles(self, text: str) -> np.ndarray:
+        """Sorted unique 64-bit hashes of the text's word n-grams"""
+        words = WORD.findall(text.lower())
+        if not words:
+            return np.empty(0, dtype=np.uint64)
+
+        shingles = kgram_hashes(hash_words(words), self.shingle_size)
+        return np.unique(shingles)
+
+    def signature(self, shingles: np.ndarray) -> np.ndarray:
+        signature = np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        with np.errstate(over='ignore'):
+            for start in range(0, len(shingles), SIGNATURE_CHUNK):
+                chunk = shingles[start:start + SIGNATURE_CHUNK]
+                hashed = (np.outer(self._a, chunk) + self._b[:, None]) >> np.uint64(32)
+                np.minimum(signature, hashed.min(axis=1).astype(np.uint32), out=signature)
+        return signature
+
+    def add(self, doc_id: str, text: str, metadata: Dict = None) -> bool:
+        """Index or re-index a document; False when it has no words"""
+        shingles = self.shingles(text)
+        if not len(shingles):
+            self.remove(doc_id)
+            return False
+        signature = self.signature(shingles)
+
+        with self._lock:
+            self._remove_locked(doc_id)
+            self._documents[doc_id] = {
+                'shingles': shingles,
+                'signature': signature,
+                'metadata': dict(metadata or {})
+            }
+            for band, key in enumerate(self._band_keys(signature)):
+                self._buckets[band][key].add(doc_id)
+            self.generation += 1
+        return True
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._remove_locked(doc_id)
+
+    def query(self, text: str, exclude: Optional[str] = None, limit: int = 10) -> Dict:
+        """Candidate sources sharing an LSH band, with estimated Jaccard and exact containment"""
+        return self.query_shingles(self.shingles(text), exclude, limit)
+
+    def query_shingles(self, shingles: np.ndarray, exclude: Optional[str] = None, limit: int = 10) -> Dict:
+        result = {'shingle_count': len(shingles), 'matched_fraction': 0.0, 'matches': []}
+        if not len(shingles):
+            return result
+        signature = self.signature(shingles)
+
+        with self._lock:
+            candidate_ids = set()
+            for band, key in enumerate(self._band_keys(signature)):
+                candidate_ids.update(self._buckets[band].get(key, ()))
+            candidate_ids.discard(exclude)
+            candidates = [(doc_id, self._documents[doc_id]) for doc_id in candidate_ids]
+
+        matches = []
+        matched = np.zeros(len(shingles), dtype=bool)
+        for doc_id, document in candidates:
+            shared = np.isin(shingles, document['shingles'], assume_unique=True)
+            shared_count = int(shared.sum())
+            if not shared_count:
+                continue
+            matched |= shared
+            matches.append({
+                'doc_id': doc_id,
+                'jaccard_estimate': float(np.mean(signature == document['signature'])),
+                'containment': shared_count / len(shingles),
+                'shared_shingles': shared_count,
+                'metadata': document['metadata']
+            })
+
+        matches.sort(key=lambda match: match['containment'], reverse=True)
+        result['matched_fraction'] = float(matched.mean())
+        result['matches'] = matches[:limit]
+        return result
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        rows = self.rows
+        return [signature[band * rows:(band + 1) * rows].tobytes() for band in range(self.bands)]
+
+    def _remove_locked(self, doc_id: str):
+        document = self._documents.pop(doc_id, None)
+        if document is None:
+            return
+        self.generation += 1
+        for band, key in enumerate(self._band_keys(document['signature'])):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(doc_id)
+                if not bucket:
+                    del self._buckets[band][key]
+
+
+minhash_index = MinHashIndex()
@@ -0,0 +1,289 @@
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from scipy.sparse import csr_matrix, diags, vstack
+from services.minhash_index import WORD, hash_words
+
+# Hashed feature space; no vocabulary is kept, collisions only blur rare words together
+HASH_FEATURES = 1 << 20
+# Windows are this many consecutive units (sentences, long ones cut into UNIT_MAX_WORDS pieces)
+WINDOW_UNITS = 2
+UNIT_MAX_WORDS = 40
+# Corpus windows scored per block; bounds the dense block to query windows x QUERY_BLOCK_ROWS
+QUERY_BLOCK_ROWS = 16384
+TOP_K = 3
+MIN_SIMILARITY = 0.5
+# The corpus matrix is rebuilt in full once the window count has moved this far from the one its
+# IDF was computed at, or this share of its rows belongs to removed documents; otherwise added
+# documents are appended to the last block and removed ones masked out
+IDF_DRIFT = 0.1
+MAX_DEAD_FRACTION = 0.2
+
+SENTENCE = re.compile(r'[^.!?]+[.!?]*')
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have having
+he her here hers him his how i if in into is it its itself just more most my no nor not now of off on once
+only or other our ours out over own same she should so some such than that the their theirs them then there
+these they this those through to too under until up very was we were what when where which while who whom
+why will with would you your yours we've it's
+""".split())
+
+
+def text_windows(text: str) -> Tuple[List[Tuple[int, int]], List[List[str]]]:
+    """Character spans and content words of each unit (sentence or sentence piece)"""
+    spans, units = [], []
+    for sentence in SENTENCE.finditer(text):
+        words = list(WORD.finditer(sentence.group()))
+        for first in range(0, len(words), UNIT_MAX_WORDS):
+            piece = words[first:first + UNIT_MAX_WORDS]
+            spans.append((sentence.start() + piece[0].start(), sentence.start() + piece[-1].end()))
+            units.append([word.group().lower() for word in piece if word.group().lower() not in STOPWORDS])
+    return spans, units
+
+
+class ParaphraseIndex:
+    """Hashed TF-IDF vectors of sentence windows, searched by blocked sparse cosine top-k
+
+    Term frequencies are kept per document; IDF comes from per-feature window counts. The corpus
+    matrix keeps the IDF it was built with while documents are appended to it or masked out of
+    it, and is rebuilt lazily once the corpus has drifted past IDF_DRIFT or MAX_DEAD_FRACTION.
+    """
+
+    def __init__(self, features: int = HASH_FEATURES):
+        self.features = features
+        self._lock = threading.RLock()
+        self._documents = {}
+        self._document_frequency = np.zeros(features, dtype=np.int32)
+        self._window_count = 0
+        self.generation = 0
+        self._matrix = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._documents)
+
+    def __contains__(self, doc_id: str) -> bool:
+        with self._lock:
+            return doc_id in self._documents
+
+    def vectorize(self, text: str) -> Tuple[csr_matrix, np.ndarray, np.ndarray]:
+        """Sublinear term-frequency rows, one per window, with each window's start and end offsets"""
+        spans, units = text_windows(text)
+        if not spans:
+            return csr_matrix((0, self.features), dtype=np.float32), np.empty(0, np.int64), np.empty(0, np.int64)
+
+        windows = max(len(units) - WINDOW_UNITS + 1, 1)
+        # Each unit's tokens count towards every window that covers it
+        unit_ids = np.repeat(np.arange(len(units)), [len(unit) for unit in units])
+        columns = (hash_words([word for unit in units for word in unit]) % np.uint64(self.features)).astype(np.int64)
+        rows = [unit_ids - offset for offset in range(WINDOW_UNITS)]
+        keep = [(window >= 0) & (window < windows) for window in rows]
+        tf = csr_matrix(
+            (np.ones(sum(int(k.sum()) for k in keep), dtype=np.float32),
+             (np.concatenate([window[k] for window, k in zip(rows, keep)]),
+              np.concatenate([columns[k] for k in keep]))),
+            shape=(windows, self.features)
+        )
+        tf.sum_duplicates()
+        tf.data = 1 + np.log(tf.data)
+
+        starts = np.array([start for start, _ in spans], dtype=np.int64)
+        ends = np.array([end for _, end in spans], dtype=np.int64)
+        last = np.minimum(np.arange(windows) + WINDOW_UNITS - 1, len(spans) - 1)
+        return tf, starts[:windows], ends[last]
+
+    def add(self, doc_id: str, text: str, metadata: Dict = None) -> bool:
+        tf, starts, ends = self.vectorize(text)
+        if not tf.nnz:
+            self.remove(doc_id)
+            return False
+        with self._lock:
+            self._remove_locked(doc_id)
+            self._documents[doc_id] = {'tf': tf, 'starts': starts, 'ends': ends, 'metadata': dict(metadata or {})}
+            self._document_frequency += np.bincount(tf.indices, minlength=self.features).astype(np.int32)
+            self._window_count += tf.shape[0]
+            self.generation += 1
+            if self._matrix is not None and not self._drifted():
+                self._append_rows(doc_id, self._documents[doc_id])
+            else:
+                self._matrix = None
+        return True
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._remove_locked(doc_id)
+
+    def query(self, text: str, exclude: Optional[str] = None, limit: int = 10,
+              top_k: int = TOP_K, min_similarity: float = MIN_SIMILARITY) -> Dict:
+        """Indexed documents whose windows are among each query window's top-k cosine matches"""
+        tf, starts, ends = self.vectorize(text)
+        result = {'window_count': tf.shape[0], 'matched_fraction': 0.0, 'matches': []}
+        if not tf.nnz:
+            return result
+
+        with self._lock:
+            matrix = self._corpus_matrix()
+            if matrix is None:
+                return result
+            queries = self._normalize(tf.multiply(matrix['idf']).tocsr())
+            owners = matrix['owners']
+            excluded = matrix['owner_of'].get(exclude, -1)
+
+            best_scores = np.full((tf.shape[0], top_k), -1.0, dtype=np.float32)
+            best_rows = np.full((tf.shape[0], top_k), -1, dtype=np.int64)
+            for block_start, block in zip(range(0, len(owners), QUERY_BLOCK_ROWS), matrix['blocks']):
+                scores = (queries @ block).toarray()
+                block_owners = owners[block_start:block_start + block.shape[1]]
+                masked = matrix['dead'][block_owners] | (block_owners == excluded)
+                if masked.any():
+                    scores[:, masked] = 0
+                k = min(top_k, scores.shape[1])
+                candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                merged_scores = np.hstack([best_scores, np.take_along_axis(scores, candidates, axis=1)])
+                merged_rows = np.hstack([best_rows, candidates + block_start])
+                keep = np.argsort(-merged_scores, axis=1, kind='stable')[:, :top_k]
+                best_scores = np.take_along_axis(merged_scores, keep, axis=1)
+                best_rows = np.take_along_axis(merged_rows, keep, axis=1)
+
+            hits = np.argwhere(best_scores >= min_similarity)
+            found = [(int(window), int(best_rows[window, rank]), float(best_scores[window, rank])) for window, rank in hits]
+            sources = {row: (matrix['doc_ids'][owners[row]], int(matrix['starts'][row]), int(matrix['ends'][row]))
+                       for _, row, _ in found}
+            metadata = {doc_id: self._documents[doc_id]['metadata'] for doc_id, _, _ in sources.values()}
+
+        # Windows overlap, so score by the share of the text's span that matched windows cover
+        text_length = max(int(ends.max() - starts.min()), 1)
+        by_document = {}
+        for window, row, similarity in found:
+            doc_id, source_start, source_end = sources[row]
+            document = by_document.setdefault(doc_id, {'windows': set(), 'passages': [], 'best': 0.0})
+            document['windows'].add(window)
+            document['best'] = max(document['best'], similarity)
+            document['passages'].append({
+                'query_start': int(starts[window]),
+                'query_end': int(ends[window]),
+                'source_start': source_start,
+                'source_end': source_end,
+                'similarity': round(similarity, 3)
+            })
+
+        result['matched_fraction'] = self._covered(starts, ends, {window for window, _, _ in found}) / text_length
+        matches = [
+            {
+                'doc_id': doc_id,
+                'containment': self._covered(starts, ends, document['windows']) / text_length,
+                'best_similarity': document['best'],
+                'passages': self._merge_passages(document['passages']),
+                'metadata': metadata[doc_id]
+            }
+            for doc_id, document in by_document.items()
+        ]
+        matches.sort(key=lambda match: match['containment'], reverse=True)
+        result['matches'] = matches[:limit]
+        return result
+
+    def _merge_passages(self, passages: List[Dict]) -> List[Dict]:
+        """Join hits whose windows overlap in both texts"""
+        merged = []
+        for passage in sorted(passages, key=lambda passage: (passage['query_start'], passage['source_start'])):
+            previous = merged[-1] if merged else None
+            if (previous and passage['query_start'] <= previous['query_end']
+                    and previous['source_start'] <= passage['source_start'] <= previous['source_end']):
+                previous['query_end'] = max(previous['query_end'], passage['query_end'])
+                previous['source_end'] = max(previous['source_end'], passage['source_end'])
+                previous['similarity'] = max(previous['similarity'], passage['similarity'])
+            else:
+                merged.append(dict(passage))
+        return merged
+
+    def _covered(self, starts: np.ndarray, ends: np.ndarray, windows) -> int:
+        """Characters inside the union of the given windows' spans"""
+        covered, reach = 0, 0
+        for window in sorted(windows):
+            start, end = int(starts[window]), int(ends[window])
+            covered += max(end - max(start, reach), 0)
+            reach = max(reach, end)
+        return covered
+
+    def _corpus_matrix(self) -> Optional[Dict]:
+        """IDF-weighted, L2-normalized rows of every indexed window, rebuilt in full only after drift"""
+        if self._matrix is None and self._documents:
+            self._matrix = self._build_matrix()
+        return self._matrix
+
+    def _build_matrix(self) -> Dict:
+        doc_ids = list(self._documents)
+        documents = [self._documents[doc_id] for doc_id in doc_ids]
+        idf = (np.log((1 + self._window_count) / (1 + self._document_frequency)) + 1).astype(np.float32)
+        weights = self._normalize(vstack([document['tf'] for document in documents], format='csr').multiply(idf).tocsr())
+        last_block = (weights.shape[0] - 1) // QUERY_BLOCK_ROWS * QUERY_BLOCK_ROWS
+        return {
+            'idf': idf,
+            'window_count': self._window_count,
+            # Stored transposed (features x windows) so each query block is a single CSR product
+            'blocks': [weights[start:start + QUERY_BLOCK_ROWS].T.tocsr()
+                       for start in range(0, weights.shape[0], QUERY_BLOCK_ROWS)],
+            # Row-major copy of the last block, which appended documents fill up
+            'tail': weights[last_block:],
+            'doc_ids': doc_ids,
+            'owner_of': {doc_id: owner for owner, doc_id in enumerate(doc_ids)},
+            'dead': np.zeros(len(doc_ids), dtype=bool),
+            'dead_windows': 0,
+            'owners': np.repeat(np.arange(len(documents)), [document['tf'].shape[0] for document in documents]),
+            'starts': np.concatenate([document['starts'] for document in documents]),
+            'ends': np.concatenate([document['ends'] for document in documents])
+        }
+
+    def _append_rows(self, doc_id: str, document: Dict):
+        """Weight a new document with the matrix's IDF and add its rows, re-transposing only the last block"""
+        matrix = self._matrix
+        weights = self._normalize(document['tf'].multiply(matrix['idf']).tocsr())
+        owner = len(matrix['doc_ids'])
+        matrix['doc_ids'].append(doc_id)
+        matrix['owner_of'][doc_id] = owner
+        matrix['dead'] = np.append(matrix['dead'], False)
+        matrix['owners'] = np.concatenate((matrix['owners'], np.full(weights.shape[0], owner)))
+        matrix['starts'] = np.concatenate((matrix['starts'], document['starts']))
+        matrix['ends'] = np.concatenate((matrix['ends'], document['ends']))
+
+        tail = matrix['tail']
+        while weights.shape[0]:
+            if tail.shape[0] == QUERY_BLOCK_ROWS:
+                tail = weights[:0]
+                matrix['blocks'].append(None)
+            room = QUERY_BLOCK_ROWS - tail.shape[0]
+            tail = vstack([tail, weights[:room]], format='csr')
+            weights = weights[room:]
+            matrix['blocks'][-1] = tail.T.tocsr()
+        matrix['tail'] = tail
+
+    def _drifted(self) -> bool:
+        matrix = self._matrix
+        return (abs(self._window_count - matrix['window_count']) > IDF_DRIFT * matrix['window_count']
+                or matrix['dead_windows'] > MAX_DEAD_FRACTION * len(matrix['owners']))
+
+    def _normalize(self, matrix: csr_matrix) -> csr_matrix:
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return (diags(1 / norms) @ matrix).tocsr()
+
+    def _remove_locked(self, doc_id: str):
+        document = self._documents.pop(doc_id, None)
+        if document is None:
+            return
+        tf = document['tf']
+        self._document_frequency -= np.bincount(tf.indices, minlength=self.features).astype(np.int32)
+        self._window_count -= tf.shape[0]
+        self.generation += 1
+
+        if self._matrix is not None:
+            owner = self._matrix['owner_of'].pop(doc_id)
+            self._matrix['dead'][owner] = True
+            self._matrix['dead_windows'] += tf.shape[0]
+            if not self._documents or self._drifted():
+                self._matrix = None
+
+
+paraphrase_index = ParaphraseIndex()
@@ -0,0 +1,107 @@
+import gc
+from typing import BinaryIO, Dict, List
+from PyPDF2 import PdfReader
+from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject, StreamObject
+
+# Output object numbers reserved for the document-level objects written last
+CATALOG_ID, PAGES_ID, INFO_ID = 1, 2, 3
+
+
+def concatenate_pdfs(paths: List[str], output: BinaryIO) -> int:
+    """Append the pages of each PDF to output, one input at a time; returns the page count
+
+    Objects are copied as they are read and written straight out with renumbered references,
+    so memory is bounded by the largest input rather than the combined document.
+    """
+    base = output.tell()
+    output.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    offsets = [None, None, None]
+    page_ids = []
+    info = None
+
+    for path in paths:
+        reader = PdfReader(path)
+        copier = _ObjectCopier(output, base, offsets)
+        for page in reader.pages:
+            page_ids.append(copier.write_page(page))
+        if info is None and '/Info' in reader.trailer:
+            info = copier.remap(reader.trailer['/Info'].get_object())
+        # Parsed objects point back at their reader, so each input is only freed by the cycle collector
+        del reader, copier
+        gc.collect()
+
+    documents = {
+        CATALOG_ID: DictionaryObject({NameObject('/Type'): NameObject('/Catalog'),
+                                      NameObject('/Pages'): IndirectObject(PAGES_ID, 0, None)}),
+        PAGES_ID: DictionaryObject({NameObject('/Type'): NameObject('/Pages'),
+                                    NameObject('/Count'): NumberObject(len(page_ids)),
+                                    NameObject('/Kids'): ArrayObject(IndirectObject(i, 0, None) for i in page_ids)}),
+        INFO_ID: info if info is not None else DictionaryObject()
+    }
+    for object_id, obj in documents.items():
+        offsets[object_id - 1] = _write_object(output, base, object_id, obj)
+
+    xref = output.tell() - base
+    output.write(f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n".encode('ascii'))
+    for offset in offsets:
+        output.write(f"{offset:010d} 00000 n \n".encode('ascii'))
+    output.write(f"trailer\n<< /Size {len(offsets) + 1} /Root {CATALOG_ID} 0 R /Info {INFO_ID} 0 R >>\n"
+                 f"startxref\n{xref}\n%%EOF\n".encode('ascii'))
+    return len(page_ids)
+
+
+def _write_object(output: BinaryIO, base: int, object_id: int, obj) -> int:
+    offset = output.tell() - base
+    output.write(f"{object_id} 0 obj\n".encode('ascii'))
+    obj.write_to_stream(output, None)
+    output.write(b"\nendobj\n")
+    return offset
+
+
+class _ObjectCopier:
+    """Copies the objects reachable from one input's pages, numbering them after those already written"""
+
+    def __init__(self, output: BinaryIO, base: int, offsets: List):
+        self.output = output
+        self.base = base
+        self.offsets = offsets
+        self.ids: Dict[int, int] = {}
+        self.pending: List[IndirectObject] = []
+
+    def write_page(self, page) -> int:
+        page_id = self._reserve(page.indirect_reference)
+        page_object = self.remap(page)
+        page_object[NameObject('/Parent')] = IndirectObject(PAGES_ID, 0, None)
+        self.offsets[page_id - 1] = _write_object(self.output, self.base, page_id, page_object)
+        self.pending.remove(page.indirect_reference)
+
+        # Resources, content streams and images referenced by the page
+        while self.pending:
+            reference = self.pending.pop()
+            object_id = self.ids[reference.idnum]
+            self.offsets[object_id - 1] = _write_object(self.output, self.base, object_id,
+                                                        self.remap(reference.get_object()))
+        return page_id
+
+    def remap(self, obj):
+        """Shallow copy of obj with every indirect reference renumbered for the output"""
+        if isinstance(obj, IndirectObject):
+            return IndirectObject(self._reserve(obj), 0, None)
+        if isinstance(obj, StreamObject):
+            copy = obj.__class__()
+            copy._data = obj._data
+            copy.update({key: self.remap(value) for key, value in obj.items()})
+            return copy
+        if isinstance(obj, DictionaryObject):
+            # Page parents are rewritten to the single output page tree
+            return DictionaryObject({key: self.remap(value) for key, value in obj.items() if key != '/Parent'})
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(self.remap(value) for value in obj)
+        return obj
+
+    def _reserve(self, reference: IndirectObject) -> int:
+        if reference.idnum not in self.ids:
+            self.offsets.append(None)
+            self.ids[reference.idnum] = len(self.offsets)
+            self.pending.append(reference)
+        return self.ids[reference.idnum]
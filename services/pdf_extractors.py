@@ -0,0 +1,97 @@
+import importlib.util
+from io import BytesIO
+from typing import Dict, List
+from config import Config
+
+
+class PDFExtractor:
+    """Text extraction backend; subclasses wrap one PDF library"""
+    name = None
+    module = None
+
+    def is_available(self) -> bool:
+        return importlib.util.find_spec(self.module) is not None
+
+    def extract_pages(self, pdf_file) -> List[str]:
+        """Return the text of each page in order"""
+        raise NotImplementedError
+
+    def _read_bytes(self, pdf_file) -> bytes:
+        if isinstance(pdf_file, (bytes, bytearray)):
+            return bytes(pdf_file)
+        return pdf_file.read()
+
+
+class PyPDF2Extractor(PDFExtractor):
+    name = 'pypdf2'
+    module = 'PyPDF2'
+
+    def extract_pages(self, pdf_file) -> List[str]:
+        import PyPDF2
+        reader = PyPDF2.PdfReader(BytesIO(self._read_bytes(pdf_file)))
+        return [page.extract_text() or '' for page in reader.pages]
+
+
+class PypdfExtractor(PDFExtractor):
+    name = 'pypdf'
+    module = 'pypdf'
+
+    def extract_pages(self, pdf_file) -> List[str]:
+        import pypdf
+        reader = pypdf.PdfReader(BytesIO(self._read_bytes(pdf_file)))
+        return [page.extract_text() or '' for page in reader.pages]
+
+
+class PdfminerExtractor(PDFExtractor):
+    name = 'pdfminer'
+    module = 'pdfminer'
+
+    def extract_pages(self, pdf_file) -> List[str]:
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LTTextContainer
+
+        pages = []
+        for layout in extract_pages(BytesIO(self._read_bytes(pdf_file))):
+            pages.append(''.join(element.get_text() for element in layout if isinstance(element, LTTextContainer)))
+        return pages
+
+
+class Pypdfium2Extractor(PDFExtractor):
+    name = 'pypdfium2'
+    module = 'pypdfium2'
+
+    def extract_pages(self, pdf_file) -> List[str]:
+        import pypdfium2
+
+        document = pypdfium2.PdfDocument(self._read_bytes(pdf_file))
+        try:
+            pages = []
+            for page in document:
+                text_page = page.get_textpage()
+                pages.append(text_page.get_text_range().replace('\r\n', '\n'))
+                text_page.close()
+                page.close()
+            return pages
+        finally:
+            document.close()
+
+
+EXTRACTORS = {
+    extractor.name: extractor
+    for extractor in (PyPDF2Extractor(), PypdfExtractor(), PdfminerExtractor(), Pypdfium2Extractor())
+}
+DEFAULT_EXTRACTOR = 'pypdf2'
+
+
+def available_extractors() -> Dict[str, bool]:
+    return {name: extractor.is_available() for name, extractor in EXTRACTORS.items()}
+
+
+def get_extractor(name: str = None) -> PDFExtractor:
+    """Configured backend, falling back to PyPDF2 when it is unknown or not installed"""
+    name = (name or Config.PDF_EXTRACTOR or DEFAULT_EXTRACTOR).lower()
+    extractor = EXTRACTORS.get(name)
+    if extractor is None or not extractor.is_available():
+        print(f"PDF extractor '{name}' unavailable, using {DEFAULT_EXTRACTOR}")
+        extractor = EXTRACTORS[DEFAULT_EXTRACTOR]
+    return extractor
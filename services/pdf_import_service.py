@@ -1,9 +1,69 @@
-import PyPDF2
 import requests
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 import os
 import google.generativeai as genai
+from services.reference_parser import ReferenceParser
+from services.text_store import CompressedText
+from services.pdf_extractors import get_extractor
+
+# Map-reduce AI extraction settings
+CHUNK_TOKEN_BUDGET = 3000
+CHARS_PER_TOKEN = 4
+MAX_EXTRACTION_WORKERS = 4
+CHUNK_CACHE_SIZE = 512
+
+# Per-chunk AI extraction results keyed by chunk SHA-256, shared across imports
+chunk_cache = OrderedDict()
+chunk_cache_lock = threading.Lock()
+
+# Canonical section keys for the heading names found in published papers
+SECTION_ALIASES = {
+    'abstract': 'abstract',
+    'summary': 'abstract',
+    'introduction': 'introduction',
+    'related work': 'literature_review',
+    'related works': 'literature_review',
+    'literature review': 'literature_review',
+    'background': 'literature_review',
+    'background and related work': 'literature_review',
+    'method': 'methodology',
+    'methods': 'methodology',
+    'methodology': 'methodology',
+    'materials and methods': 'methodology',
+    'proposed method': 'methodology',
+    'proposed approach': 'methodology',
+    'approach': 'methodology',
+    'results': 'results',
+    'experiments': 'results',
+    'experimental results': 'results',
+    'evaluation': 'results',
+    'results and discussion': 'results',
+    'discussion': 'discussion',
+    'conclusion': 'conclusion',
+    'conclusions': 'conclusion',
+    'conclusion and future work': 'conclusion',
+    'conclusions and future work': 'conclusion',
+    'concluding remarks': 'conclusion',
+    'references': 'references',
+    'bibliography': 'references',
+    'works cited': 'references',
+}
+
+# "1. Introduction", "2 RELATED WORK", "IV. RESULTS" (subsections like "2.1" are body text)
+NUMBERED_HEADING = re.compile(r'^(?:\d{1,2}|[IVX]{1,6})\.?\s+([A-Za-z][A-Za-z &,/\-]{2,80})$')
+# "ABSTRACT", "REFERENCES", "ACKNOWLEDGMENTS"
+UPPERCASE_HEADING = re.compile(r'^[A-Z][A-Z &,/\-]{3,60}$')
+# "Abstract—This paper ...", "Keywords: ..."
+INLINE_HEADING = re.compile(r'^(abstract|index terms|keywords)\s*[\u2014\u2013:.\-]\s*(.+)$', re.IGNORECASE)
+HEADING_NOISE = re.compile(r'[^a-z &]+')
+# A line ending in one of these is wrapped body text, not a heading
+SENTENCE_END = '.!?,;'
 
 class PDFImportService:
     def __init__(self):
@@ -17,6 +77,9 @@ class PDFImportService:
                 self.gemini_model = None
         else:
             self.gemini_model = None
+        
+        self.reference_parser = ReferenceParser()
+        self.extractor = get_extractor()
     
     def import_pdf_from_url(self, pdf_url: str) -> Dict:
         """Import PDF from academic database URL"""
@@ -24,8 +87,8 @@ class PDFImportService:
             response = requests.get(pdf_url, timeout=30)
             response.raise_for_status()
             
-            pdf_content = self.extract_text_from_pdf(BytesIO(response.content))
-            return self.analyze_imported_pdf(pdf_content, pdf_url)
+            pages = self.extract_pages_from_pdf(BytesIO(response.content))
+            return self.analyze_imported_pdf('\n'.join(pages).strip(), pdf_url, pages)
             
         except Exception as e:
             return {'error': f'Failed to import PDF: {str(e)}'}
@@ -33,27 +96,25 @@ class PDFImportService:
     def import_pdf_from_file(self, pdf_file) -> Dict:
         """Import PDF from uploaded file"""
         try:
-            pdf_content = self.extract_text_from_pdf(pdf_file)
-            return self.analyze_imported_pdf(pdf_content, 'uploaded_file')
+            pages = self.extract_pages_from_pdf(pdf_file)
+            return self.analyze_imported_pdf('\n'.join(pages).strip(), 'uploaded_file', pages)
             
         except Exception as e:
             return {'error': f'Failed to process PDF file: {str(e)}'}
     
     def extract_text_from_pdf(self, pdf_file) -> str:
         """Extract text content from PDF"""
+        return '\n'.join(self.extract_pages_from_pdf(pdf_file)).strip()
+    
+    def extract_pages_from_pdf(self, pdf_file) -> List[str]:
+        """Extract text content from PDF, one string per page"""
         try:
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            text = ""
-            
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            
-            return text.strip()
+            return self.extractor.extract_pages(pdf_file)
             
         except Exception as e:
             raise Exception(f"PDF text extraction failed: {str(e)}")
     
-    def analyze_imported_pdf(self, content: str, source: str) -> Dict:
+    def analyze_imported_pdf(self, content: str, source: str, pages: List[str] = None) -> Dict:
         """Analyze imported PDF content using Gemini"""
         
         if not content or len(content) < 100:
@@ -62,6 +123,9 @@ class PDFImportService:
         # Extract sections using AI
         sections = self.extract_sections_with_ai(content)
         
+        # Structure the bibliography locally, no citation API calls needed
+        citations_data = self.reference_parser.parse_references(sections.get('references', ''))
+        
         # Classify domain
         from services.domain_classifier import DomainClassifier
         domain_classifier = DomainClassifier()
@@ -70,6 +134,9 @@ class PDFImportService:
             sections.get('title', 'Imported Paper')
         )
         
+        # Whole text is kept compressed per page; full_content stays a short preview
+        full_text = CompressedText.from_pages(pages or [content])
+        
         return {
             'success': True,
             'source': source,
@@ -77,53 +144,136 @@ class PDFImportService:
             'abstract': sections.get('abstract', ''),
             'introduction': sections.get('introduction', ''),
             'conclusion': sections.get('conclusion', ''),
-            'references': sections.get('references', []),
-            'full_content': content[:5000],  # First 5000 chars
+            'references': [citation['raw'] for citation in citations_data],
+            'citations_data': citations_data,
+            'full_content': content[:5000],  # Preview, see 'full_text' for the rest
+            'full_text': full_text,
             'word_count': len(content.split()),
             'domain': domain_info['domain'],
             'domain_confidence': domain_info['confidence'],
             'metadata': {
                 'imported_from': source,
                 'content_length': len(content),
+                'references_count': len(citations_data),
+                'full_text': full_text.get_info(),
                 'research_domain': domain_info['domain']
             }
         }
     
     def extract_sections_with_ai(self, content: str) -> Dict:
-        """Extract paper sections using Gemini AI"""
+        """Extract paper sections from the whole document using chunked Gemini calls"""
         
-        if not self.gemini_model:
-            return self.extract_sections_basic(content)
+        basic_sections = self.extract_sections_basic(content)
+        if not self.gemini_model or self._has_core_sections(basic_sections):
+            return basic_sections
         
-        try:
-            prompt = f"""
-            Analyze this research paper and extract the following sections:
+        chunks = self._split_into_chunks(content)
+        workers = min(len(chunks), MAX_EXTRACTION_WORKERS)
+        
+        # Map: extract whatever sections each chunk contains, concurrently
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            chunk_sections = list(executor.map(self._extract_chunk_sections, chunks))
+        
+        # Reduce: merge chunk results in document order
+        ai_sections = self._merge_chunk_sections(chunk_sections)
+        if not ai_sections:
+            return basic_sections
+        
+        # Verbatim structural references parse better than the model's summary of them
+        if basic_sections.get('references'):
+            ai_sections['references'] = basic_sections['references']
+        
+        return {**basic_sections, **ai_sections}
+    
+    def _split_into_chunks(self, content: str) -> List[str]:
+        """Split content on paragraph boundaries into token-budgeted chunks"""
+        budget = CHUNK_TOKEN_BUDGET * CHARS_PER_TOKEN
+        chunks = []
+        current = []
+        current_size = 0
+        
+        for paragraph in content.split('\n\n'):
+            # Hard-split paragraphs that alone exceed the budget
+            pieces = [paragraph[i:i + budget] for i in range(0, len(paragraph), budget)] or ['']
+            for piece in pieces:
+                if current and current_size + len(piece) > budget:
+                    chunks.append('\n\n'.join(current))
+                    current = []
+                    current_size = 0
+                current.append(piece)
+                current_size += len(piece) + 2
+        
+        if current:
+            chunks.append('\n\n'.join(current))
+        
+        return [chunk for chunk in chunks if chunk.strip()]
+    
+    def _extract_chunk_sections(self, chunk: str) -> Dict:
+        """Extract sections from one chunk, reusing cached results for identical chunks"""
+        chunk_hash = hashlib.sha256(chunk.encode('utf-8')).hexdigest()
+        with chunk_cache_lock:
+            if chunk_hash in chunk_cache:
+                chunk_cache.move_to_end(chunk_hash)
+                return chunk_cache[chunk_hash]
+        
+        # The prompt does not depend on chunk position so results are reusable across documents
+        prompt = f"""
+            The following text is one part of a research paper. It may be the beginning,
+            the middle or the end of the paper.
             
-            Content: {content[:3000]}
+            Content: {chunk}
             
-            Extract and return:
+            Extract only the sections that appear in this part:
             1. Title (exact title of the paper)
-            2. Abstract (complete abstract section)
-            3. Introduction (first few sentences of introduction)
-            4. Conclusion (main conclusion points)
-            5. References (list of key references)
+            2. Abstract (complete abstract text)
+            3. Introduction (introduction text)
+            4. Conclusion (conclusion text)
+            5. References (reference entries copied verbatim, one per line)
             
-            Format as:
+            Format as follows and write NONE for sections not present in this part:
             TITLE: [title here]
             ABSTRACT: [abstract here]
             INTRODUCTION: [introduction here]
             CONCLUSION: [conclusion here]
             REFERENCES: [references here]
             """
-            
+        
+        try:
             response = self.gemini_model.generate_content(prompt)
-            if response and response.text:
-                return self.parse_ai_sections(response.text)
-                
+            if not response or not response.text:
+                return {}
+            sections = {
+                key: value for key, value in self.parse_ai_sections(response.text).items()
+                if value and value.strip().upper() not in ('NONE', 'N/A', '[NONE]')
+            }
         except Exception as e:
             print(f"AI section extraction error: {e}")
+            return {}
         
-        return self.extract_sections_basic(content)
+        with chunk_cache_lock:
+            chunk_cache[chunk_hash] = sections
+            while len(chunk_cache) > CHUNK_CACHE_SIZE:
+                chunk_cache.popitem(last=False)
+        
+        return sections
+    
+    def _merge_chunk_sections(self, chunk_sections: List[Dict]) -> Dict:
+        """Combine per-chunk extractions into one set of sections"""
+        merged = {}
+        for sections in chunk_sections:
+            for key, value in sections.items():
+                if key == 'title':
+                    merged.setdefault('title', value)
+                elif key in merged:
+                    # Sections split across chunk boundaries continue in the next chunk
+                    merged[key] += '\n' + value
+                else:
+                    merged[key] = value
+        return merged
+    
+    def _has_core_sections(self, sections: Dict) -> bool:
+        """Structural parse is good enough when the main sections were all found"""
+        return all(sections.get(key) for key in ('title', 'abstract', 'introduction', 'conclusion'))
     
     def parse_ai_sections(self, ai_response: str) -> Dict:
         """Parse AI response into sections"""
@@ -167,32 +317,75 @@ class PDFImportService:
         return sections
     
     def extract_sections_basic(self, content: str) -> Dict:
-        """Basic keyword-based section extraction"""
+        """Single-pass structural section extraction from heading lines"""
         sections = {}
+        spans = []  # (section key or None, body start, heading start)
+        offset = 0
+        
+        for line in content.split('\n'):
+            line_start = offset
+            offset += len(line) + 1
+            stripped = line.strip()
+            heading = self._match_heading(stripped) if stripped else None
+            
+            if heading is None:
+                # Title is the first meaningful line before any heading
+                if not spans and 'title' not in sections and 10 < len(stripped) <= 200:
+                    sections['title'] = stripped
+                continue
+            
+            key, inline_text = heading
+            body_start = offset
+            if inline_text:
+                body_start = line_start + line.index(inline_text)
+            spans.append((key, body_start, line_start))
+        
+        # Each section runs from its heading to the next top-level heading
+        for i, (key, body_start, _) in enumerate(spans):
+            if key is None or key in sections:
+                continue
+            end = spans[i + 1][2] if i + 1 < len(spans) else len(content)
+            text = content[body_start:end].strip()
+            if text:
+                sections[key] = text
+        
+        return sections
+    
+    def _match_heading(self, line: str) -> Optional[tuple]:
+        """Return (section key, inline text) for a heading line, None for body text"""
+        inline = INLINE_HEADING.match(line)
+        if inline:
+            name = inline.group(1).lower()
+            return (SECTION_ALIASES.get(name), inline.group(2))
+        
+        if len(line) > 90:
+            return None
+        
+        numbered = NUMBERED_HEADING.match(line)
+        if numbered:
+            name = self._normalize_heading(numbered.group(1))
+            if name in SECTION_ALIASES:
+                return (SECTION_ALIASES[name], None)
+            # Unknown numbered headings still end the previous section when they look like titles
+            words = numbered.group(1).split()
+            if len(words) <= 8 and all(word[0].isupper() or len(word) <= 3 for word in words):
+                return (None, None)
+            return None
         
-        # Extract title (first meaningful line)
-        lines = content.split('\n')
-        for line in lines[:10]:
-            if len(line.strip()) > 10 and not line.strip().lower().startswith(('abstract', 'introduction')):
-                sections['title'] = line.strip()
-                break
-        
-        # Extract abstract
-        abstract_start = content.lower().find('abstract')
-        if abstract_start != -1:
-            abstract_end = content.lower().find('introduction', abstract_start)
-            if abstract_end == -1:
-                abstract_end = abstract_start + 1000
-            sections['abstract'] = content[abstract_start:abstract_end].replace('abstract', '').strip()[:500]
-        
-        # Extract introduction
-        intro_start = content.lower().find('introduction')
-        if intro_start != -1:
-            sections['introduction'] = content[intro_start:intro_start+500].replace('introduction', '').strip()
-        
-        # Extract conclusion
-        conclusion_start = content.lower().find('conclusion')
-        if conclusion_start != -1:
-            sections['conclusion'] = content[conclusion_start:conclusion_start+500].replace('conclusion', '').strip()
-        
-        return sections
\ No newline at end of file
+        # Unnumbered headings must look like one: a wrapped body line such as "approach." is not
+        name = self._normalize_heading(line)
+        if name in SECTION_ALIASES and self._looks_like_heading(line):
+            return (SECTION_ALIASES[name], None)
+        if UPPERCASE_HEADING.match(line) and len(line.split()) <= 6:
+            return (None, None)
+        return None
+    
+    def _looks_like_heading(self, line: str) -> bool:
+        """Title Case or UPPER case, with no sentence-ending punctuation"""
+        if line.rstrip()[-1:] in SENTENCE_END:
+            return False
+        words = [word for word in line.split() if word[0].isalpha()]
+        return line.isupper() or bool(words) and all(word[0].isupper() or len(word) <= 3 for word in words)
+    
+    def _normalize_heading(self, heading: str) -> str:
+        return ' '.join(HEADING_NOISE.sub(' ', heading.lower()).split())
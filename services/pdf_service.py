@@ -1,194 +1,275 @@
-from reportlab.lib.pagesizes import letter, A4
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT
 from io import BytesIO
-from typing import Dict, List
 import os
-import base64
+import re
+import shutil
 import tempfile
+from typing import Dict, Iterator, List
+from services.pdf_templates import PDFTemplate, get_template
+from services.markdown_flowables import markdown_converter
+from services.chart_store import chart_store, CHART_RENDER_DPI
+from services.document_tree import DocumentTree, parse_document
+from services.pdf_concat import concatenate_pdfs
+
+AUTHORS_TEXT = (
+    "John Smith¹, Jane Doe², Michael Johnson¹<br/>"
+    "¹Department of Computer Science, University of Technology<br/>"
+    "²Institute of Advanced Research, Tech University<br/>"
+    "john.smith@university.edu, jane.doe@techuni.edu, michael.johnson@university.edu"
+)
+
+# Flowables produced ahead of layout; enough for keep-with-next lookups
+STORY_LOOKAHEAD = 8
+# Pages laid out per temporary PDF in low-memory renders; ReportLab holds a chunk's pages until it is saved
+CHUNK_PAGES = 20
+
+OBJECTIVE_WORDS = re.compile(r'objective|aim', re.IGNORECASE)
+
+# Export profiles: chart resolution at printed size, palette size (None keeps full colour) and
+# page stream compression (None keeps ReportLab's default). 'standard' is the output from before profiles.
+PDF_PROFILES = {
+    'standard': {'image_dpi': CHART_RENDER_DPI, 'image_colors': None, 'page_compression': None},
+    'optimized': {'image_dpi': 96, 'image_colors': 64, 'page_compression': 1}
+}
+
+
+class LazyStory:
+    """List-like story that builds flowables only as ReportLab's layout loop consumes them"""
+
+    def __init__(self, flowables: Iterator):
+        self._source = iter(flowables)
+        self._buffer = []
+
+    def _fill(self, count: int):
+        while len(self._buffer) < count:
+            try:
+                self._buffer.append(next(self._source))
+            except StopIteration:
+                return
+
+    def __len__(self) -> int:
+        # Layout only loops while this is non-zero and looks ahead a few items
+        self._fill(STORY_LOOKAHEAD)
+        return len(self._buffer)
+
+    def _fill_for(self, index):
+        # keepWithNext handling slices (flowables[:i], del flowables[:i]); open or negative bounds need everything
+        if isinstance(index, slice):
+            bound = index.stop
+        else:
+            bound = index + 1 if index >= 0 else None
+        if bound is None or bound < 0:
+            self._buffer.extend(self._source)
+        else:
+            self._fill(bound)
+
+    def __getitem__(self, index):
+        self._fill_for(index)
+        return self._buffer[index]
+
+    def __setitem__(self, index, value):
+        # Split flowables are pushed back with flowables[0:0] = parts
+        self._buffer[index] = value
+
+    def __delitem__(self, index):
+        self._fill_for(index)
+        del self._buffer[index]
+
+    def insert(self, index: int, flowable):
+        self._buffer.insert(index, flowable)
+
+
+class ChunkedDocTemplate(SimpleDocTemplate):
+    """Lays out one document but saves every CHUNK_PAGES pages to their own PDF file
+
+    ReportLab keeps each finished page until its canvas is saved, so swapping in a fresh
+    canvas per chunk bounds that to one chunk. Page numbers continue across chunks.
+    """
+
+    def __init__(self, directory: str, chunk_pages: int = None, **kwargs):
+        self.directory = directory
+        self.chunk_pages = chunk_pages or CHUNK_PAGES
+        self.chunk_paths = [self._chunk_path(0)]
+        self.chunk_page_counts = [0]
+        super().__init__(self.chunk_paths[0], **kwargs)
+
+    def _chunk_path(self, index: int) -> str:
+        return os.path.join(self.directory, f"chunk_{index:05d}.pdf")
+
+    def handle_pageBegin(self):
+        self.chunk_page_counts[-1] += 1
+        super().handle_pageBegin()
+
+    def handle_pageEnd(self):
+        super().handle_pageEnd()
+        # After showPage the canvas is numbering the next page
+        if self.canv.getPageNumber() > self.chunk_pages:
+            self.canv.save()
+            self.chunk_paths.append(self._chunk_path(len(self.chunk_paths)))
+            self.chunk_page_counts.append(0)
+            sequencer = self.seq
+            self.canv = self._makeCanvas(self.chunk_paths[-1])
+            self.canv._doctemplate = self
+            self.seq = sequencer
+
 
 class PDFService:
-    def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self._setup_custom_styles()
-    
-    def _setup_custom_styles(self):
-        # IEEE-style custom styles
-        self.styles.add(ParagraphStyle(
-            name='IEEETitle',
-            parent=self.styles['Title'],
-            fontSize=24,
-            spaceAfter=20,
-            alignment=TA_CENTER,
-            fontName='Times-Bold'
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='IEEEAuthors',
-            parent=self.styles['Normal'],
-            fontSize=12,
-            spaceAfter=15,
-            alignment=TA_CENTER,
-            fontName='Times-Roman'
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='IEEESection',
-            parent=self.styles['Heading1'],
-            fontSize=10,
-            spaceAfter=6,
-            spaceBefore=12,
-            fontName='Times-Bold',
-            alignment=TA_LEFT
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='IEEEBody',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            spaceAfter=6,
-            alignment=TA_JUSTIFY,
-            fontName='Times-Roman',
-            leading=10
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='IEEEReference',
-            parent=self.styles['Normal'],
-            fontSize=9,
-            spaceAfter=3,
-            leftIndent=15,
-            fontName='Times-Roman'
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='IEEESubSection',
-            parent=self.styles['Heading2'],
-            fontSize=9,
-            spaceAfter=4,
-            spaceBefore=8,
-            fontName='Times-Bold',
-            alignment=TA_LEFT
-        ))
+    # Bump when layout changes so cached exports are re-rendered
+    TEMPLATE_VERSION = '4'
     
+    def __init__(self):
+        # Templates are compiled once per process and shared by every render
+        self.template = get_template('IEEE')
+        self.styles = self.template.styles
+
     def generate_pdf(self, paper_data: Dict, filename: str = None) -> BytesIO:
-        buffer = BytesIO()
-        
-        if filename:
-            doc = SimpleDocTemplate(filename, pagesize=A4, 
-                                  rightMargin=72, leftMargin=72,
-                                  topMargin=72, bottomMargin=18)
+        template = self._template_for(paper_data)
+        return self._build(self._build_story(paper_data, template), template, filename)
+
+    def generate_pdf_streaming(self, paper_data: Dict, output, profile: str = 'standard') -> object:
+        """Bounded-memory render to a path or file
+
+        Flowables are built as pages are laid out, every CHUNK_PAGES pages go to a temporary
+        PDF, and the chunks are then concatenated into output one at a time.
+        """
+        template = self._template_for(paper_data)
+        story = LazyStory(self._iter_story(paper_data, template, cached=False, profile=profile))
+        directory = tempfile.mkdtemp(dir=os.path.dirname(output) if isinstance(output, str) else None)
+        try:
+            doc = ChunkedDocTemplate(directory, pagesize=template.pagesize,
+                                     pageCompression=PDF_PROFILES[profile]['page_compression'], **template.margins)
+            if template.on_page:
+                doc.build(story, onFirstPage=template.on_page, onLaterPages=template.on_page)
+            else:
+                doc.build(story)
+
+            # A canvas swapped in after the last page has nothing on it
+            chunks = [path for path, pages in zip(doc.chunk_paths, doc.chunk_page_counts) if pages] or doc.chunk_paths[:1]
+            if isinstance(output, str):
+                with open(output, 'wb') as f:
+                    self._write_chunks(chunks, f)
+            else:
+                self._write_chunks(chunks, output)
+            return output
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def _write_chunks(self, chunks: List[str], output):
+        if len(chunks) == 1:
+            with open(chunks[0], 'rb') as f:
+                shutil.copyfileobj(f, output)
         else:
-            doc = SimpleDocTemplate(buffer, pagesize=A4,
-                                  rightMargin=72, leftMargin=72,
-                                  topMargin=72, bottomMargin=18)
-        
+            concatenate_pdfs(chunks, output)
+
+    def create_with_metadata(self, paper_data: Dict, metadata: Dict = None) -> BytesIO:
+        """Create PDF with additional metadata like plagiarism score"""
+        template = self._template_for(paper_data)
         story = []
-        
+
+        # Add metadata header if provided
+        if metadata:
+            story.append(Paragraph("Document Information", template.styles['Section']))
+            if 'plagiarism_score' in metadata:
+                story.append(Paragraph(
+                    f"Plagiarism Score: {metadata['plagiarism_score']}% ({metadata.get('status', 'Unknown')})",
+                    template.styles['Body']
+                ))
+            if 'word_count' in metadata:
+                story.append(Paragraph(f"Word Count: {metadata['word_count']}", template.styles['Body']))
+            story.append(Spacer(1, 20))
+
+        # Metadata and paper share one layout pass
+        story.extend(self._build_story(paper_data, template))
+        return self._build(story, template)
+
+    def _template_for(self, paper_data: Dict) -> PDFTemplate:
+        return get_template(paper_data.get('metadata', {}).get('citation_style', 'IEEE'))
+
+    def _build(self, story: List, template: PDFTemplate, filename: str = None):
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(filename or buffer, pagesize=template.pagesize, **template.margins)
+        if template.on_page:
+            doc.build(story, onFirstPage=template.on_page, onLaterPages=template.on_page)
+        else:
+            doc.build(story)
+
+        if filename:
+            return filename
+        buffer.seek(0)
+        return buffer
+
+    def _build_story(self, paper_data: Dict, template: PDFTemplate) -> List:
+        return list(self._iter_story(paper_data, template))
+
+    def _iter_story(self, paper_data: Dict, template: PDFTemplate, cached: bool = True,
+                    profile: str = 'standard') -> Iterator:
+        # Low-memory renders parse without keeping the tree in the per-process cache
+        tree = parse_document(paper_data) if cached else DocumentTree(paper_data)
+        if template.name == 'IEEE':
+            return self._iter_ieee_story(tree, template, cached, profile)
+        return self._iter_author_date_story(tree, template, cached, profile)
+
+    def _iter_ieee_story(self, tree: DocumentTree, template: PDFTemplate, cached: bool, profile: str) -> Iterator:
+        styles = template.styles
+
         # IEEE Paper Title (Centered, Bold, Times New Roman, 24pt)
-        if 'title' in paper_data:
-            story.append(Paragraph(paper_data['title'], self.styles['IEEETitle']))
-        
+        if tree.title is not None:
+            yield Paragraph(markdown_converter.inline(tree.title), styles['Title'])
+
         # Authors & Affiliations
-        authors_text = "John Smith¹, Jane Doe², Michael Johnson¹<br/>"
-        authors_text += "¹Department of Computer Science, University of Technology<br/>"
-        authors_text += "²Institute of Advanced Research, Tech University<br/>"
-        authors_text += "john.smith@university.edu, jane.doe@techuni.edu, michael.johnson@university.edu"
-        story.append(Paragraph(authors_text, self.styles['IEEEAuthors']))
-        story.append(Spacer(1, 20))
-        
+        yield Paragraph(AUTHORS_TEXT, styles['Authors'])
+        yield Spacer(1, 20)
+
         # Abstract (No section number for abstract)
-        if 'abstract' in paper_data:
-            story.append(Paragraph("<b>Abstract</b>—" + paper_data['abstract'], self.styles['IEEEBody']))
-            story.append(Spacer(1, 12))
-        
+        if tree.abstract is not None:
+            abstract = markdown_converter.inline(' '.join(tree.abstract.split()))
+            yield Paragraph("<b>Abstract</b>—" + abstract, styles['Body'])
+            yield Spacer(1, 12)
+
         # 3. Index Terms / Keywords
-        story.append(Paragraph("3. Index Terms / Keywords", self.styles['IEEESection']))
-        keywords = paper_data.get('metadata', {}).get('keywords', ['artificial intelligence', 'machine learning', 'research methodology'])
-        if isinstance(keywords, list):
-            keywords_text = ', '.join(keywords)
-        else:
-            keywords_text = str(keywords)
-        story.append(Paragraph(f"<i>{keywords_text}</i>", self.styles['IEEEBody']))
-        story.append(Spacer(1, 15))
-        
+        yield Paragraph("3. Index Terms / Keywords", styles['Section'])
+        keywords_text = tree.keywords_text(['artificial intelligence', 'machine learning', 'research methodology'])
+        yield Paragraph(f"<i>{markdown_converter.inline(keywords_text)}</i>", styles['Body'])
+        yield Spacer(1, 15)
+
         # 4. Abbreviations / Acronyms
-        story.append(Paragraph("4. Abbreviations / Acronyms", self.styles['IEEESection']))
-        abbreviations = self._extract_abbreviations(paper_data)
+        yield Paragraph("4. Abbreviations / Acronyms", styles['Section'])
+        abbreviations = self._extract_abbreviations(tree)
         if abbreviations:
             for abbr, expansion in abbreviations.items():
-                story.append(Paragraph(f"<b>{abbr}:</b> {expansion}", self.styles['IEEEBody']))
+                yield Paragraph(f"<b>{abbr}:</b> {expansion}", styles['Body'])
         else:
-            story.append(Paragraph("[No abbreviations found in text]", self.styles['IEEEBody']))
-        story.append(Spacer(1, 15))
-        
+            yield Paragraph("[No abbreviations found in text]", styles['Body'])
+        yield Spacer(1, 15)
+
         # I. INTRODUCTION
-        if 'introduction' in paper_data:
-            story.append(Paragraph("I. INTRODUCTION", self.styles['IEEESection']))
-            story.append(Paragraph(paper_data['introduction'], self.styles['IEEEBody']))
-            story.append(Spacer(1, 12))
-        
+        yield from self._section_flowables(tree, 'introduction', template, cached)
+
         # 6. Research Questions / Objectives
-        story.append(Paragraph("6. Research Questions / Objectives", self.styles['IEEESection']))
-        objectives = self._extract_objectives(paper_data)
-        for obj in objectives:
-            story.append(Paragraph(f"• {obj}", self.styles['IEEEBody']))
-        story.append(Spacer(1, 15))
-        
+        yield Paragraph("6. Research Questions / Objectives", styles['Section'])
+        for obj in self._extract_objectives(tree):
+            yield Paragraph(f"• {obj}", styles['Body'])
+        yield Spacer(1, 15)
+
         # 7. Sections & Subsections
-        story.append(Paragraph("7. Sections & Subsections", self.styles['IEEESection']))
-        
-        # II. RELATED WORK
-        if 'literature_review' in paper_data:
-            story.append(Paragraph("II. RELATED WORK", self.styles['IEEESection']))
-            story.append(Paragraph(paper_data['literature_review'], self.styles['IEEEBody']))
-            story.append(Spacer(1, 12))
-        
-        # III. METHODOLOGY
-        if 'methodology' in paper_data:
-            story.append(Paragraph("III. METHODOLOGY", self.styles['IEEESection']))
-            story.append(Paragraph(paper_data['methodology'], self.styles['IEEEBody']))
-            story.append(Spacer(1, 12))
-        
-        # IV. RESULTS
-        if 'results' in paper_data:
-            story.append(Paragraph("IV. RESULTS", self.styles['IEEESection']))
-            story.append(Paragraph(paper_data['results'], self.styles['IEEEBody']))
-            story.append(Spacer(1, 12))
-        
+        yield Paragraph("7. Sections & Subsections", styles['Section'])
+        for section in ('literature_review', 'methodology', 'results'):
+            yield from self._section_flowables(tree, section, template, cached)
+
         # Add Charts and Figures
-        if 'charts' in paper_data and paper_data['charts']:
-            story.append(Paragraph("7.4 Figures and Analysis", self.styles['IEEESubSection']))
-            for i, chart in enumerate(paper_data['charts'], 1):
-                # Add chart image
-                chart_img = self._add_chart_to_pdf(chart['image'])
-                if chart_img:
-                    story.append(chart_img)
-                    story.append(Spacer(1, 10))
-                else:
-                    story.append(Paragraph("[Figure not provided]", self.styles['IEEEReference']))
-                
-                # Add caption in IEEE format
-                caption_text = f"Fig. {i}. {chart.get('caption', chart.get('title', 'Research Chart'))}"
-                story.append(Paragraph(caption_text, self.styles['IEEEReference']))
-                story.append(Spacer(1, 15))
-        
+        if tree.charts:
+            yield Paragraph("7.4 Figures and Analysis", styles['SubSection'])
+            yield from self._figure_flowables(tree.charts, template, "Fig. {index}. {caption}", profile)
+
         # V. CONCLUSION
-        if 'conclusion' in paper_data:
-            story.append(Paragraph("V. CONCLUSION", self.styles['IEEESection']))
-            story.append(Paragraph(paper_data['conclusion'], self.styles['IEEEBody']))
-            story.append(Spacer(1, 12))
-        
+        yield from self._section_flowables(tree, 'conclusion', template, cached)
+
         # REFERENCES
-        story.append(Paragraph("REFERENCES", self.styles['IEEESection']))
-        
-        # References list in IEEE format
-        if 'references' in paper_data and paper_data['references']:
-            for i, ref in enumerate(paper_data['references'], 1):
-                formatted_ref = f"[{i}] {ref}"
-                story.append(Paragraph(formatted_ref, self.styles['IEEEReference']))
+        yield Paragraph(template.reference_header, styles['Section'])
+        if tree.references:
+            for i, ref in enumerate(tree.references, 1):
+                yield Paragraph(template.format_reference(markdown_converter.inline(ref), i), styles['Reference'])
         else:
             # Sample IEEE references
             sample_refs = [
@@ -196,109 +277,86 @@ class PDFService:
                 "[2] M. Brown et al., \"Deep Learning for Medical Diagnosis,\" in Proc. IEEE Conf. Computer Vision, 2022, pp. 45-52."
             ]
             for ref in sample_refs:
-                story.append(Paragraph(ref, self.styles['IEEEReference']))
-        
-        # Build PDF
-        doc.build(story)
-        
-        if filename:
-            return filename
-        else:
-            buffer.seek(0)
-            return buffer
-    
-    def create_with_metadata(self, paper_data: Dict, metadata: Dict = None) -> BytesIO:
-        """Create PDF with additional metadata like plagiarism score"""
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4,
-                              rightMargin=72, leftMargin=72,
-                              topMargin=72, bottomMargin=18)
-        
-        story = []
-        
-        # Add metadata header if provided
-        if metadata:
-            story.append(Paragraph("Document Information", self.styles['IEEESection']))
-            if 'plagiarism_score' in metadata:
-                score_color = metadata.get('color', 'black')
-                story.append(Paragraph(
-                    f"Plagiarism Score: {metadata['plagiarism_score']}% ({metadata.get('status', 'Unknown')})",
-                    self.styles['IEEEBody']
-                ))
-            if 'word_count' in metadata:
-                story.append(Paragraph(f"Word Count: {metadata['word_count']}", self.styles['IEEEBody']))
-            story.append(Spacer(1, 20))
-        
-        # Generate main content
-        main_buffer = self.generate_pdf(paper_data)
-        
-        # For simplicity, return the main PDF
-        # In production, you might want to merge PDFs or add headers/footers
-        return self.generate_pdf(paper_data)
-    
+                yield Paragraph(ref, styles['Reference'])
+
+    def _iter_author_date_story(self, tree: DocumentTree, template: PDFTemplate, cached: bool, profile: str) -> Iterator:
+        """APA and MLA layout: plain section headings, unnumbered hanging-indent references"""
+        styles = template.styles
+
+        if tree.title is not None:
+            yield Paragraph(markdown_converter.inline(tree.title), styles['Title'])
+        yield Paragraph(AUTHORS_TEXT, styles['Authors'])
+
+        if tree.abstract is not None:
+            yield Paragraph("Abstract", styles['Section'])
+            yield Paragraph(markdown_converter.inline(' '.join(tree.abstract.split())), styles['Abstract'])
+            if tree.keywords:
+                yield Paragraph(f"<i>Keywords:</i> {markdown_converter.inline(tree.keywords_text())}", styles['Abstract'])
+
+        for section in ('introduction', 'literature_review', 'methodology', 'results'):
+            yield from self._section_flowables(tree, section, template, cached)
+
+        if tree.charts:
+            yield from self._figure_flowables(tree.charts, template, "Figure {index}. {caption}", profile)
+
+        yield from self._section_flowables(tree, 'conclusion', template, cached)
+
+        if tree.references:
+            yield Paragraph(template.reference_header, styles['Section'])
+            for i, ref in enumerate(tree.references, 1):
+                yield Paragraph(template.format_reference(markdown_converter.inline(ref), i), styles['Reference'])
+
+    def _section_flowables(self, tree: DocumentTree, key: str, template: PDFTemplate, cached: bool) -> Iterator:
+        section = tree.section(key)
+        if section:
+            yield Paragraph(template.section_titles[key], template.styles['Section'])
+            if cached:
+                yield from markdown_converter.convert_blocks(section.digest, section.blocks, template)
+            else:
+                yield from markdown_converter.iter_flowables(section.text, template)
+            yield Spacer(1, 12)
+
+    def _figure_flowables(self, charts: List[Dict], template: PDFTemplate, caption_format: str,
+                          profile: str = 'standard') -> Iterator:
+        for i, chart in enumerate(charts, 1):
+            chart_img = self._add_chart_to_pdf(chart, profile)
+            if chart_img:
+                yield chart_img
+                yield Spacer(1, 10)
+            else:
+                yield Paragraph("[Figure not provided]", template.styles['Caption'])
+
+            caption = markdown_converter.inline(chart.get('caption', chart.get('title', 'Research Chart')))
+            yield Paragraph(caption_format.format(index=i, caption=caption), template.styles['Caption'])
+            yield Spacer(1, 15)
+
     def _get_title_style(self, citation_style: str):
         """Get title formatting based on citation style"""
-        if citation_style.upper() == 'APA':
-            return self.styles['PaperTitle']  # Centered, bold
-        elif citation_style.upper() == 'MLA':
-            # MLA: Left-aligned, no bold
-            return ParagraphStyle(
-                name='MLATitle',
-                parent=self.styles['Normal'],
-                fontSize=12,
-                spaceAfter=12,
-                alignment=TA_LEFT,
-                fontName='Helvetica'
-            )
-        elif citation_style.upper() == 'IEEE':
-            return self.styles['PaperTitle']  # Centered, bold
-        return self.styles['PaperTitle']
-    
+        return get_template(citation_style).styles['Title']
+
     def _get_reference_header(self, citation_style: str) -> str:
         """Get reference section header based on citation style"""
-        if citation_style.upper() == 'APA':
-            return "References"
-        elif citation_style.upper() == 'MLA':
-            return "Works Cited"
-        elif citation_style.upper() == 'IEEE':
-            return "References"
-        return "References"
-    
+        return get_template(citation_style).reference_header
+
     def _format_reference_by_style(self, reference: str, index: int, citation_style: str) -> str:
         """Format reference according to citation style"""
-        if citation_style.upper() == 'APA':
-            # APA: No numbers, hanging indent
-            return reference
-        elif citation_style.upper() == 'MLA':
-            # MLA: No numbers, hanging indent
-            return reference
-        elif citation_style.upper() == 'IEEE':
-            # IEEE: Numbered in brackets
-            return f"[{index}] {reference}"
-        return f"[{index}] {reference}"
-    
-    def _add_chart_to_pdf(self, base64_image: str) -> Image:
-        """Convert base64 image to ReportLab Image object"""
+        return get_template(citation_style).format_reference(reference, index)
+
+    def _add_chart_to_pdf(self, chart: Dict, profile: str = 'standard') -> Image:
+        """ReportLab Image for a stored chart, or an inline base64 one stored on first use"""
         try:
-            # Remove data URL prefix if present
-            if base64_image.startswith('data:image'):
-                base64_image = base64_image.split(',')[1]
-            
-            # Decode base64 image
-            image_data = base64.b64decode(base64_image)
-            
-            # Use BytesIO instead of temporary file
-            image_buffer = BytesIO(image_data)
-            
-            # Create ReportLab Image from BytesIO
-            img = Image(image_buffer, width=5*inch, height=3*inch)
-            
-            return img
+            chart_id = chart.get('id')
+            if not chart_id and chart.get('image'):
+                chart_id = chart_store.save_data_url(chart['image'])
+            if not chart_id:
+                return None
+            settings = PDF_PROFILES[profile]
+            return chart_store.image_flowable(chart_id, 5*inch, 3*inch, settings['image_dpi'], settings['image_colors'])
         except Exception as e:
             print(f"Error adding chart to PDF: {e}")
             return None
     
-    def _extract_abbreviations(self, paper_data: Dict) -> Dict[str, str]:
+    def _extract_abbreviations(self, tree: DocumentTree) -> Dict[str, str]:
         """Extract abbreviations from paper text"""
         abbreviations = {
             'AI': 'Artificial Intelligence',
@@ -313,21 +371,18 @@ class PDFService:
             'NLP': 'Natural Language Processing'
         }
         
-        # Extract text from all sections
-        full_text = ''
-        for section in ['abstract', 'introduction', 'literature_review', 'methodology', 'results', 'conclusion']:
-            if section in paper_data:
-                full_text += paper_data[section] + ' '
+        # Text of the abstract and every section, scanned in place rather than joined into one copy
+        texts = ([tree.abstract] if tree.abstract else []) + [section.text for section in tree.sections.values()]
         
         # Find abbreviations that appear in the text
         found_abbreviations = {}
         for abbr, expansion in abbreviations.items():
-            if abbr in full_text:
+            if any(abbr in text for text in texts):
                 found_abbreviations[abbr] = expansion
         
         return found_abbreviations
     
-    def _extract_objectives(self, paper_data: Dict) -> List[str]:
+    def _extract_objectives(self, tree: DocumentTree) -> List[str]:
         """Extract research objectives from paper content"""
         objectives = [
             'Analyze current methodologies and identify research gaps',
@@ -338,11 +393,11 @@ class PDFService:
         ]
         
         # Try to extract from introduction if available
-        if 'introduction' in paper_data:
-            intro_text = paper_data['introduction'].lower()
-            if 'objective' in intro_text or 'aim' in intro_text:
+        introduction = tree.section('introduction')
+        if introduction:
+            if OBJECTIVE_WORDS.search(introduction.text):
                 # Custom objectives based on content
-                topic = paper_data.get('title', '').lower()
+                topic = (tree.title or '').lower()
                 if 'ai' in topic or 'artificial intelligence' in topic:
                     objectives = [
                         'Investigate AI applications in the specified domain',
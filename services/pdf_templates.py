@@ -0,0 +1,192 @@
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Callable, Dict
+from reportlab.lib.pagesizes import letter, A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT
+
+SUPPORTED_STYLES = ('IEEE', 'APA', 'MLA')
+
+
+class PDFTemplate:
+    """Compiled, read-only paragraph styles and page layout for one citation style"""
+
+    def __init__(self, name: str, styles: Dict[str, ParagraphStyle], pagesize, margins: Dict,
+                 section_titles: Dict[str, str], reference_header: str, on_page: Callable = None):
+        self.name = name
+        self.styles = MappingProxyType(styles)
+        self.pagesize = pagesize
+        self.margins = MappingProxyType(margins)
+        self.section_titles = MappingProxyType(section_titles)
+        self.reference_header = reference_header
+        self.on_page = on_page
+
+    def __setattr__(self, name, value):
+        if hasattr(self, 'on_page'):
+            raise AttributeError('PDFTemplate is immutable')
+        super().__setattr__(name, value)
+
+    def format_reference(self, reference: str, index: int) -> str:
+        # IEEE numbers entries in brackets; APA and MLA rely on a hanging indent
+        if self.name == 'IEEE':
+            return f"[{index}] {reference}"
+        return reference
+
+
+def get_template(citation_style: str = 'IEEE') -> PDFTemplate:
+    """Template for a citation style, compiled once per process; unknown styles fall back to IEEE"""
+    style = (citation_style or 'IEEE').upper()
+    return _compile(style if style in SUPPORTED_STYLES else 'IEEE')
+
+
+@lru_cache(maxsize=None)
+def _compile(style: str) -> PDFTemplate:
+    builders = {'IEEE': _build_ieee, 'APA': _build_apa, 'MLA': _build_mla}
+    return builders[style]()
+
+
+def _build_ieee() -> PDFTemplate:
+    base = getSampleStyleSheet()
+    styles = {
+        'Title': ParagraphStyle(
+            name='IEEETitle', parent=base['Title'], fontSize=24, spaceAfter=20,
+            alignment=TA_CENTER, fontName='Times-Bold'
+        ),
+        'Authors': ParagraphStyle(
+            name='IEEEAuthors', parent=base['Normal'], fontSize=12, spaceAfter=15,
+            alignment=TA_CENTER, fontName='Times-Roman'
+        ),
+        'Section': ParagraphStyle(
+            name='IEEESection', parent=base['Heading1'], fontSize=10, spaceAfter=6,
+            spaceBefore=12, fontName='Times-Bold', alignment=TA_LEFT
+        ),
+        'Body': ParagraphStyle(
+            name='IEEEBody', parent=base['Normal'], fontSize=10, spaceAfter=6,
+            alignment=TA_JUSTIFY, fontName='Times-Roman', leading=10
+        ),
+        'Reference': ParagraphStyle(
+            name='IEEEReference', parent=base['Normal'], fontSize=9, spaceAfter=3,
+            leftIndent=15, fontName='Times-Roman'
+        ),
+        'SubSection': ParagraphStyle(
+            name='IEEESubSection', parent=base['Heading2'], fontSize=9, spaceAfter=4,
+            spaceBefore=8, fontName='Times-Bold', alignment=TA_LEFT
+        )
+    }
+    styles['Caption'] = styles['Reference']
+    styles['ListItem'] = ParagraphStyle(
+        name='IEEEListItem', parent=styles['Body'], leftIndent=15, bulletIndent=5
+    )
+    return PDFTemplate(
+        'IEEE', styles, A4,
+        {'rightMargin': 72, 'leftMargin': 72, 'topMargin': 72, 'bottomMargin': 18},
+        {
+            'introduction': 'I. INTRODUCTION',
+            'literature_review': 'II. RELATED WORK',
+            'methodology': 'III. METHODOLOGY',
+            'results': 'IV. RESULTS',
+            'conclusion': 'V. CONCLUSION'
+        },
+        'REFERENCES'
+    )
+
+
+def _build_apa() -> PDFTemplate:
+    # APA 7: Times 12pt, double spaced, bold centered level-1 headings, page number top right
+    base = getSampleStyleSheet()
+    body = ParagraphStyle(
+        name='APABody', parent=base['Normal'], fontSize=12, leading=24,
+        firstLineIndent=0.5 * inch, alignment=TA_LEFT, fontName='Times-Roman'
+    )
+    styles = {
+        'Title': ParagraphStyle(
+            name='APATitle', parent=body, fontName='Times-Bold', alignment=TA_CENTER,
+            firstLineIndent=0, spaceBefore=72, spaceAfter=24
+        ),
+        'Authors': ParagraphStyle(
+            name='APAAuthors', parent=body, alignment=TA_CENTER, firstLineIndent=0, spaceAfter=24
+        ),
+        'Section': ParagraphStyle(
+            name='APASection', parent=body, fontName='Times-Bold', alignment=TA_CENTER, firstLineIndent=0
+        ),
+        'SubSection': ParagraphStyle(
+            name='APASubSection', parent=body, fontName='Times-Bold', firstLineIndent=0
+        ),
+        'Body': body,
+        'Abstract': ParagraphStyle(name='APAAbstract', parent=body, firstLineIndent=0),
+        'Reference': ParagraphStyle(
+            name='APAReference', parent=body, firstLineIndent=-0.5 * inch, leftIndent=0.5 * inch
+        ),
+        'Caption': ParagraphStyle(
+            name='APACaption', parent=body, firstLineIndent=0, fontName='Times-Italic'
+        ),
+        'ListItem': ParagraphStyle(
+            name='APAListItem', parent=body, firstLineIndent=0,
+            leftIndent=0.5 * inch, bulletIndent=0.25 * inch
+        )
+    }
+    return PDFTemplate(
+        'APA', styles, letter,
+        {'rightMargin': inch, 'leftMargin': inch, 'topMargin': inch, 'bottomMargin': inch},
+        {
+            'introduction': 'Introduction',
+            'literature_review': 'Literature Review',
+            'methodology': 'Method',
+            'results': 'Results',
+            'conclusion': 'Conclusion'
+        },
+        'References',
+        _draw_page_number
+    )
+
+
+def _build_mla() -> PDFTemplate:
+    # MLA 9: Times 12pt, double spaced, left heading block, "Works Cited" with hanging indent
+    base = getSampleStyleSheet()
+    body = ParagraphStyle(
+        name='MLABody', parent=base['Normal'], fontSize=12, leading=24,
+        firstLineIndent=0.5 * inch, alignment=TA_LEFT, fontName='Times-Roman'
+    )
+    styles = {
+        'Title': ParagraphStyle(
+            name='MLATitle', parent=body, alignment=TA_CENTER, firstLineIndent=0
+        ),
+        'Authors': ParagraphStyle(name='MLAAuthors', parent=body, firstLineIndent=0),
+        'Section': ParagraphStyle(
+            name='MLASection', parent=body, fontName='Times-Bold', firstLineIndent=0
+        ),
+        'SubSection': ParagraphStyle(
+            name='MLASubSection', parent=body, fontName='Times-Italic', firstLineIndent=0
+        ),
+        'Body': body,
+        'Abstract': body,
+        'Reference': ParagraphStyle(
+            name='MLAReference', parent=body, firstLineIndent=-0.5 * inch, leftIndent=0.5 * inch
+        ),
+        'Caption': ParagraphStyle(name='MLACaption', parent=body, firstLineIndent=0),
+        'ListItem': ParagraphStyle(
+            name='MLAListItem', parent=body, firstLineIndent=0,
+            leftIndent=0.5 * inch, bulletIndent=0.25 * inch
+        )
+    }
+    return PDFTemplate(
+        'MLA', styles, letter,
+        {'rightMargin': inch, 'leftMargin': inch, 'topMargin': inch, 'bottomMargin': inch},
+        {
+            'introduction': 'Introduction',
+            'literature_review': 'Literature Review',
+            'methodology': 'Methodology',
+            'results': 'Results',
+            'conclusion': 'Conclusion'
+        },
+        'Works Cited',
+        _draw_page_number
+    )
+
+
+def _draw_page_number(canvas, doc):
+    canvas.saveState()
+    canvas.setFont('Times-Roman', 12)
+    canvas.drawRightString(doc.pagesize[0] - inch, doc.pagesize[1] - 0.5 * inch, str(doc.page))
+    canvas.restoreState()
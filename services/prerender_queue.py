@@ -0,0 +1,99 @@
+import copy
+import itertools
+import queue
+import threading
+from typing import Dict
+from services.export_service import export_service
+
+ARTIFACT_EXTENSIONS = {'pdf': '.pdf', 'latex': '.tex', 'zip': '.zip'}
+
+
+class PrerenderQueue:
+    """Low-priority background rendering of a new paper's exports into the artifact cache"""
+
+    def __init__(self, exporter=None):
+        self.exporter = exporter or export_service
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        # Only papers with a queued or running job have entries; numbers are never reused
+        self._counter = itertools.count(1)
+        self._generations = {}
+        self._rendered = {}
+        self._worker = None
+
+    def enqueue(self, paper_id: str, paper_content: Dict):
+        """Schedule PDF, LaTeX and ZIP renders; supersedes any pending job for the paper"""
+        # Snapshot so later edits to the stored paper can't leak into this render
+        snapshot = copy.deepcopy(paper_content)
+        with self._lock:
+            generation = next(self._counter)
+            self._generations[paper_id] = generation
+            self._start_worker()
+        self._jobs.put((paper_id, generation, snapshot))
+
+    def cancel(self, paper_id: str, discard: bool = False, paper_content: Dict = None):
+        """Stop pending renders for a paper, optionally deleting what was already rendered
+
+        Finished jobs keep no record, so discarding their artifacts needs the paper's content.
+        """
+        with self._lock:
+            # A running job sees the missing generation and stops
+            self._generations.pop(paper_id, None)
+            rendered = self._rendered.pop(paper_id, [])
+        if not discard:
+            return
+        if paper_content is not None:
+            rendered += [(self.exporter.artifact_key(paper_content, kind), extension)
+                         for kind, extension in ARTIFACT_EXTENSIONS.items()]
+        for key, extension in rendered:
+            self.exporter.store.delete(key, extension)
+
+    def _is_current(self, paper_id: str, generation: int) -> bool:
+        with self._lock:
+            return self._generations.get(paper_id) == generation
+
+    def _start_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name='prerender', daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            paper_id, generation, paper_content = self._jobs.get()
+            try:
+                self._render(paper_id, generation, paper_content)
+            except Exception as e:
+                print(f"Pre-render failed for {paper_id}: {e}")
+            finally:
+                self._finish(paper_id, generation)
+                self._jobs.task_done()
+
+    def _finish(self, paper_id: str, generation: int):
+        """Forget a finished job; its artifacts are ordinary cache entries from here on"""
+        with self._lock:
+            if self._generations.get(paper_id) == generation:
+                del self._generations[paper_id]
+                self._rendered.pop(paper_id, None)
+
+    def _render(self, paper_id: str, generation: int, paper_content: Dict):
+        renders = (
+            ('pdf', lambda: self.exporter.pdf_artifact(paper_content, background=True)),
+            ('latex', lambda: self.exporter.latex_artifact(paper_content)),
+            ('zip', lambda: self.exporter.zip_artifact(paper_content, background=True))
+        )
+        for kind, render in renders:
+            # Checked between artifacts so edits and deletes cancel the remaining work
+            if not self._is_current(paper_id, generation):
+                return
+            key, _ = render()
+            with self._lock:
+                current = self._generations.get(paper_id) == generation
+                if current:
+                    self._rendered.setdefault(paper_id, []).append((key, ARTIFACT_EXTENSIONS[kind]))
+            if not current:
+                # Cancelled while this render ran, so nothing else will ever clean it up
+                self.exporter.store.delete(key, ARTIFACT_EXTENSIONS[kind])
+                return
+
+
+prerender_queue = PrerenderQueue()
@@ -0,0 +1,178 @@
+import re
+from typing import Dict, List, Union
+
+# Entry markers at the start of a line: "[12] ..." or "12. ..." / "12) ..."
+BRACKET_MARKER = re.compile(r'^\s*\[(\d{1,4})\]\s*', re.MULTILINE)
+NUMBER_MARKER = re.compile(r'^\s*(\d{1,4})[.)]\s+(?=[A-Z])', re.MULTILINE)
+# Unnumbered (APA/MLA) entries start with "Surname, X." on a fresh line
+AUTHOR_LINE_START = re.compile(r"^[A-Z][\w'\-]+(?: [A-Z][\w'\-]+)?, (?:[A-Z]\.|[A-Z][a-z]+)", re.MULTILINE)
+
+DOI_PATTERN = re.compile(r'\b(10\.\d{4,9}/[^\s"<>]+)', re.IGNORECASE)
+PAREN_YEAR = re.compile(r'\((\d{4})[a-z]?(?:, [A-Za-z]+\.? ?\d{0,2})?\)')
+ANY_YEAR = re.compile(r'\b((?:19|20)\d{2})[a-z]?\b')
+QUOTED_TITLE = re.compile(r'["“]([^"”]{4,}?)[,.]?["”]')
+VENUE_STOP = re.compile(r',?\s*(?:vol\.|no\.|pp\.|\(|doi:|https?://|(?:19|20)\d{2})|,\s*\d', re.IGNORECASE)
+AUTHOR_SPLIT = re.compile(r',?\s+and\s+|\s*&\s*|;\s*|,\s+(?=[A-Z]\.)|,\s+(?=[A-Z][a-z]+ [A-Z])')
+LEADING_INITIAL = re.compile(r'^[A-Z]\.')
+SURNAME_INITIALS = re.compile(r"([A-Z][\w'\-]+(?: [A-Z][\w'\-]+)?), ((?:[A-Z]\.\s?-?)+)")
+ET_AL = re.compile(r',?\s*et al\.?', re.IGNORECASE)
+WHITESPACE = re.compile(r'\s+')
+
+
+class ReferenceParser:
+    """Offline parser turning a bibliography section into CitationService-style dicts"""
+
+    def parse(self, references_text: str) -> List[Dict]:
+        """Split a references section into entries and extract citation fields"""
+        return [self.parse_entry(entry) for entry in self.split_entries(references_text)]
+
+    def parse_references(self, references: Union[str, List]) -> List[Dict]:
+        """Parse a references section or a list of entries as returned by the AI extraction"""
+        if isinstance(references, str):
+            return self.parse(references)
+        if not isinstance(references, list):
+            if references:
+                print(f"Skipped references of unexpected type {type(references).__name__}")
+            return []
+
+        citations = []
+        for entry in references:
+            if isinstance(entry, str) and entry.strip():
+                citations.append(self.parse_entry(WHITESPACE.sub(' ', entry).strip()))
+            elif isinstance(entry, dict):
+                citations.append(self.parse_structured(entry))
+            elif entry:
+                print(f"Skipped reference entry of unexpected type {type(entry).__name__}: {entry!r:.80}")
+        return citations
+
+    def parse_structured(self, entry: Dict) -> Dict:
+        """Coerce a reference the model returned as fields into the same schema as parse_entry"""
+        raw = entry.get('raw') or entry.get('text') or entry.get('citation')
+        parsed = self.parse_entry(WHITESPACE.sub(' ', raw).strip()) if isinstance(raw, str) and raw.strip() else {}
+
+        authors = entry.get('authors') or entry.get('author')
+        if isinstance(authors, str):
+            authors = self._parse_authors(authors)
+        elif isinstance(authors, list):
+            authors = [str(author).strip() for author in authors if str(author).strip()]
+
+        year = ANY_YEAR.search(str(entry.get('year') or entry.get('date') or ''))
+        title = str(entry.get('title') or '').strip(' .,')
+        venue = str(entry.get('journal') or entry.get('venue') or entry.get('container') or '').strip(' .,')
+        doi_match = DOI_PATTERN.search(str(entry.get('doi') or ''))
+
+        citation = {
+            'title': title or parsed.get('title', 'Unknown Title'),
+            'authors': authors or parsed.get('authors', ['Unknown']),
+            'year': int(year.group(1)) if year else parsed.get('year', 'n.d.'),
+            'doi': doi_match.group(1).rstrip('.,;)') if doi_match else parsed.get('doi', ''),
+            'journal': venue or parsed.get('journal', 'Unknown Journal'),
+        }
+        citation['raw'] = raw if parsed else self._format_raw(citation)
+        return citation
+
+    def split_entries(self, references_text: str) -> List[str]:
+        """Split raw bibliography text into one string per reference"""
+        if not references_text:
+            return []
+
+        for marker in (BRACKET_MARKER, NUMBER_MARKER):
+            starts = [match.start() for match in marker.finditer(references_text)]
+            if len(starts) >= 2 or (starts and not references_text[:starts[0]].strip()):
+                return self._slice_entries(references_text, starts, marker)
+
+        starts = [match.start() for match in AUTHOR_LINE_START.finditer(references_text)]
+        if len(starts) >= 2:
+            return self._slice_entries(references_text, starts)
+
+        # Fall back to blank-line separated entries
+        return [WHITESPACE.sub(' ', block).strip() for block in references_text.split('\n\n') if block.strip()]
+
+    def parse_entry(self, entry: str) -> Dict:
+        """Extract authors, title, venue, year and DOI from a single reference"""
+        doi_match = DOI_PATTERN.search(entry)
+        doi = doi_match.group(1).rstrip('.,;)') if doi_match else ''
+        text = entry[:doi_match.start()].rstrip(' ,;') if doi_match else entry
+        text = re.sub(r'(?:doi:|https?://(?:dx\.)?doi\.org/?)\s*$', '', text, flags=re.IGNORECASE).rstrip(' ,;')
+
+        quoted = QUOTED_TITLE.search(text)
+        paren_year = PAREN_YEAR.search(text)
+        if quoted:
+            # IEEE: A. Author, B. Author, "Title," Venue, vol. 1, 2021.
+            authors_text = text[:quoted.start()]
+            title = quoted.group(1)
+            venue = text[quoted.end():]
+        elif paren_year:
+            # APA: Author, A., & Author, B. (2021). Title. Venue, 1(2), 3-4.
+            authors_text = text[:paren_year.start()]
+            title, _, venue = text[paren_year.end():].lstrip(' .').partition('. ')
+        else:
+            # MLA and others: Author, A. Title. Venue, 2021.
+            authors_text, title, venue = self._split_sentences(text)
+
+        year_match = paren_year or ANY_YEAR.search(venue) or ANY_YEAR.search(text)
+
+        return {
+            'title': title.strip(' .,') or 'Unknown Title',
+            'authors': self._parse_authors(authors_text) or ['Unknown'],
+            'year': int(year_match.group(1)) if year_match else 'n.d.',
+            'doi': doi,
+            'journal': self._clean_venue(venue) or 'Unknown Journal',
+            'raw': entry
+        }
+
+    def _format_raw(self, citation: Dict) -> str:
+        raw = f"{', '.join(citation['authors'])} ({citation['year']}). {citation['title']}. {citation['journal']}."
+        return raw + (f" doi:{citation['doi']}" if citation['doi'] else '')
+
+    def _slice_entries(self, text: str, starts: List[int], marker=None) -> List[str]:
+        entries = []
+        for i, start in enumerate(starts):
+            end = starts[i + 1] if i + 1 < len(starts) else len(text)
+            entry = text[start:end]
+            if marker is not None:
+                entry = marker.sub('', entry, count=1)
+            entry = WHITESPACE.sub(' ', entry).strip()
+            if entry:
+                entries.append(entry)
+        return entries
+
+    def _split_sentences(self, text: str):
+        parts = [part for part in text.split('. ') if part]
+        # Author lists end with initials ("Smith, J.") so glue short fragments back on
+        while len(parts) > 3 and len(parts[0].split()) <= 3 and len(parts[1].split()) <= 2:
+            parts[0:2] = [parts[0] + '. ' + parts[1]]
+        if len(parts) >= 3:
+            return parts[0], parts[1], '. '.join(parts[2:])
+        if len(parts) == 2:
+            return parts[0], parts[1], ''
+        return '', text, ''
+
+    def _parse_authors(self, authors_text: str) -> List[str]:
+        authors_text = ET_AL.sub('', authors_text).strip(' ,')
+        if not authors_text:
+            return []
+
+        # "Smith, J. A., & Doe, B." becomes ["J. A. Smith", "B. Doe"]
+        pairs = None if LEADING_INITIAL.match(authors_text) else SURNAME_INITIALS.findall(authors_text)
+        if pairs:
+            return [f"{initials.strip()} {surname}" for surname, initials in pairs]
+
+        authors = []
+        for name in AUTHOR_SPLIT.split(authors_text):
+            name = name.strip(' ,.')
+            if name and any(c.isalpha() for c in name):
+                if ', ' in name:
+                    last, _, first = name.partition(', ')
+                    name = f"{first} {last}"
+                authors.append(name)
+        return authors
+
+    def _clean_venue(self, venue: str) -> str:
+        venue = venue.strip(' ,.')
+        if venue.lower().startswith('in '):
+            venue = venue[3:]
+        stop = VENUE_STOP.search(venue)
+        if stop:
+            venue = venue[:stop.start()]
+        return venue.strip(' ,.*')
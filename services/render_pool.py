@@ -0,0 +1,131 @@
+import threading
+import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict
+from config import Config
+
+# Background jobs poll for a free slot so waiting interactive renders get it first
+BACKGROUND_POLL_INTERVAL = 0.5
+
+# PDFService of the current worker process, built on its first job
+_worker_pdf_service = None
+
+
+def _get_worker_pdf_service():
+    global _worker_pdf_service
+    if _worker_pdf_service is None:
+        from services.pdf_service import PDFService
+        _worker_pdf_service = PDFService()
+    return _worker_pdf_service
+
+
+def _render_pdf_job(paper_data: Dict, metadata: Dict = None) -> bytes:
+    """Runs inside a worker process"""
+    if metadata:
+        return _get_worker_pdf_service().create_with_metadata(paper_data, metadata).getvalue()
+    return _get_worker_pdf_service().generate_pdf(paper_data).getvalue()
+
+
+def _render_pdf_file_job(paper_data: Dict, path: str, profile: str = 'standard') -> str:
+    """Runs inside a worker process; the PDF goes to disk instead of back through the pipe"""
+    return _get_worker_pdf_service().generate_pdf_streaming(paper_data, path, profile)
+
+
+class RenderBusy(Exception):
+    """All render slots stayed taken for the whole queue timeout"""
+
+
+class RenderTimeout(Exception):
+    """A render exceeded its time budget and its worker was stopped"""
+
+
+class RenderPool:
+    """ReportLab layout in worker processes so renders don't hold the web process GIL"""
+
+    def __init__(self, workers: int = None, max_concurrent: int = None,
+                 timeout: float = None, queue_timeout: float = None):
+        self.workers = Config.RENDER_WORKERS if workers is None else workers
+        self.max_concurrent = max_concurrent or Config.RENDER_MAX_CONCURRENT or max(self.workers, 1)
+        self.timeout = timeout or Config.RENDER_TIMEOUT
+        self.queue_timeout = queue_timeout or Config.RENDER_QUEUE_TIMEOUT
+
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def render_pdf(self, paper_data: Dict, metadata: Dict = None, background: bool = False) -> bytes:
+        """Render a paper to PDF bytes, waiting for a free slot first"""
+        return self.run(_render_pdf_job, paper_data, metadata, background=background)
+
+    def render_pdf_file(self, paper_data: Dict, path: str, background: bool = False,
+                        profile: str = 'standard') -> str:
+        """Low-memory streaming render written straight to path"""
+        return self.run(_render_pdf_file_job, paper_data, path, profile, background=background)
+
+    def run(self, job, *args, background: bool = False):
+        if not self._acquire_slot(background):
+            raise RenderBusy(f"No render slot free after {self.queue_timeout}s")
+        try:
+            for attempt in range(2):
+                executor = self._get_executor()
+                if executor is None:
+                    return job(*args)
+
+                try:
+                    future = executor.submit(job, *args)
+                    return future.result(timeout=self.timeout)
+                except FutureTimeoutError:
+                    future.cancel()
+                    self._reset_executor(executor)
+                    raise RenderTimeout(f"Render exceeded {self.timeout}s")
+                except (BrokenProcessPool, CancelledError, RuntimeError):
+                    # Another render's timeout replaced the pool under this one: run it once more on the new pool
+                    with self._lock:
+                        replaced = self._executor is not executor
+                    self._reset_executor(executor)
+                    if not replaced or attempt:
+                        raise
+        finally:
+            self._slots.release()
+
+    def _acquire_slot(self, background: bool) -> bool:
+        if not background:
+            return self._slots.acquire(timeout=self.queue_timeout)
+        while not self._slots.acquire(blocking=False):
+            time.sleep(BACKGROUND_POLL_INTERVAL)
+        return True
+
+    def _get_executor(self):
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                try:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                except (OSError, NotImplementedError) as e:
+                    # e.g. serverless runtimes without process support
+                    print(f"Render pool unavailable, rendering in-process: {e}")
+                    self.workers = 0
+                    return None
+            return self._executor
+
+    def _reset_executor(self, executor):
+        """Drop a pool whose worker hung or died; the next render starts a fresh one"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        processes = list((getattr(executor, '_processes', None) or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+render_pool = RenderPool()
@@ -0,0 +1,124 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+import numpy as np
+from services.minhash_index import WORD, hash_words, kgram_hashes
+
+# Exact word runs are seeded by k-grams of this many words and kept from MIN_SPAN_WORDS up
+SEED_WORDS = 4
+MIN_SPAN_WORDS = 8
+# Runs separated by at most this many differing words in both texts are reported as one span
+MAX_GAP_WORDS = 3
+# Seeds repeated more often than this in the source (boilerplate phrases) are skipped
+MAX_SEED_OCCURRENCES = 16
+
+TOKEN_CACHE_SIZE = 64
+# Tokenized source texts keyed by SHA-256 of the text
+token_cache = OrderedDict()
+token_cache_lock = threading.Lock()
+
+# Word hashes with the start and end character offsets of each word
+Tokens = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+class SpanAligner:
+    """Longest common word runs between a checked text and a candidate source, with offsets in both"""
+
+    def tokens(self, text: str) -> Tokens:
+        spans = [(match.start(), match.end(), match.group().lower()) for match in WORD.finditer(text)]
+        return (
+            hash_words([span[2] for span in spans]),
+            np.fromiter((span[0] for span in spans), dtype=np.int64, count=len(spans)),
+            np.fromiter((span[1] for span in spans), dtype=np.int64, count=len(spans))
+        )
+
+    def source_tokens(self, text: str) -> Tokens:
+        """Tokens of a source text, cached since the same candidates come back check after check"""
+        key = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        with token_cache_lock:
+            cached = token_cache.get(key)
+            if cached is not None:
+                token_cache.move_to_end(key)
+                return cached
+
+        tokens = self.tokens(text)
+        with token_cache_lock:
+            token_cache[key] = tokens
+            while len(token_cache) > TOKEN_CACHE_SIZE:
+                token_cache.popitem(last=False)
+        return tokens
+
+    def align(self, query: Tokens, source: Tokens) -> List[Dict]:
+        """Non-overlapping matching spans, longest first, then in query order"""
+        query_words, source_words = query[0], source[0]
+        if len(query_words) < MIN_SPAN_WORDS or len(source_words) < MIN_SPAN_WORDS:
+            return []
+        query_seeds = kgram_hashes(query_words, SEED_WORDS)
+        source_seeds = kgram_hashes(source_words, SEED_WORDS)
+
+        # Every (query, source) position pair whose seeds agree, via a sorted view of the source
+        order = np.argsort(source_seeds, kind='stable')
+        sorted_seeds = source_seeds[order]
+        lower = np.searchsorted(sorted_seeds, query_seeds, side='left')
+        counts = np.searchsorted(sorted_seeds, query_seeds, side='right') - lower
+        counts[counts > MAX_SEED_OCCURRENCES] = 0
+        if not counts.any():
+            return []
+        query_positions = np.repeat(np.arange(len(query_seeds)), counts)
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        source_positions = order[np.repeat(lower, counts) + within]
+
+        # Seeds on one diagonal at consecutive query positions form one exact run
+        diagonals = source_positions - query_positions
+        by_diagonal = np.lexsort((query_positions, diagonals))
+        query_positions, diagonals = query_positions[by_diagonal], diagonals[by_diagonal]
+        breaks = np.flatnonzero((np.diff(diagonals) != 0) | (np.diff(query_positions) != 1)) + 1
+        run_starts = np.concatenate(([0], breaks))
+        run_lengths = np.diff(np.concatenate((run_starts, [len(query_positions)]))) + SEED_WORDS - 1
+
+        long_enough = run_lengths >= MIN_SPAN_WORDS
+        runs = sorted(
+            zip(run_lengths[long_enough].tolist(), query_positions[run_starts[long_enough]].tolist(),
+                diagonals[run_starts[long_enough]].tolist()),
+            reverse=True
+        )
+
+        # Longest runs claim their query words first
+        taken = np.zeros(len(query_words), dtype=bool)
+        kept = []
+        for length, query_start, diagonal in runs:
+            if taken[query_start:query_start + length].any():
+                continue
+            taken[query_start:query_start + length] = True
+            kept.append((query_start, query_start + diagonal, length))
+        kept.sort()
+
+        spans = []
+        for query_start, source_start, length in kept:
+            previous = spans[-1] if spans else None
+            if previous:
+                query_gap = query_start - previous['query_word_end']
+                source_gap = source_start - previous['source_word_end']
+                if 0 <= query_gap <= MAX_GAP_WORDS and 0 <= source_gap <= MAX_GAP_WORDS:
+                    previous['query_word_end'] = query_start + length
+                    previous['source_word_end'] = source_start + length
+                    previous['words'] += length
+                    continue
+            spans.append({'query_word_start': query_start, 'query_word_end': query_start + length,
+                          'source_word_start': source_start, 'source_word_end': source_start + length,
+                          'words': length})
+
+        return [
+            {
+                'query_start': int(query[1][span['query_word_start']]),
+                'query_end': int(query[2][span['query_word_end'] - 1]),
+                'source_start': int(source[1][span['source_word_start']]),
+                'source_end': int(source[2][span['source_word_end'] - 1]),
+                'matched_words': span['words']
+            }
+            for span in spans
+        ]
+
+
+span_aligner = SpanAligner()
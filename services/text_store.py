@@ -0,0 +1,117 @@
+import threading
+import zlib
+from typing import Dict, List, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class CompressedText:
+    """Document text kept as independently compressed pages for random access"""
+
+    def __init__(self, pages: List[bytes], codec: str, original_size: int):
+        self.pages = pages
+        self.codec = codec
+        self.original_size = original_size
+
+    @classmethod
+    def from_pages(cls, pages: List[str], codec: str = None) -> 'CompressedText':
+        """Compress each page separately so page ranges decompress on their own"""
+        codec = codec or ('zstd' if zstandard else 'zlib')
+        if codec == 'zstd':
+            compressor = zstandard.ZstdCompressor(level=10)
+            compress = compressor.compress
+        else:
+            compress = lambda data: zlib.compress(data, 9)
+
+        encoded = [page.encode('utf-8') for page in pages]
+        return cls([compress(page) for page in encoded], codec, sum(len(page) for page in encoded))
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    @property
+    def compressed_size(self) -> int:
+        return sum(len(page) for page in self.pages)
+
+    def get_pages(self, start: int = 0, end: int = None) -> List[str]:
+        """Decompress only the pages in [start, end)"""
+        if self.codec == 'zstd':
+            decompress = zstandard.ZstdDecompressor().decompress
+        else:
+            decompress = zlib.decompress
+        return [decompress(page).decode('utf-8') for page in self.pages[start:end]]
+
+    def get_text(self, start: int = 0, end: int = None) -> str:
+        return '\n'.join(self.get_pages(start, end))
+
+    def get_info(self) -> Dict:
+        return {
+            'pages': self.page_count,
+            'codec': self.codec,
+            'original_bytes': self.original_size,
+            'compressed_bytes': self.compressed_size
+        }
+
+    def to_document(self) -> Dict:
+        """BSON-friendly representation for MongoDB"""
+        return {'codec': self.codec, 'original_size': self.original_size, 'pages': self.pages}
+
+    @classmethod
+    def from_document(cls, document: Dict) -> 'CompressedText':
+        return cls([bytes(page) for page in document['pages']], document['codec'], document['original_size'])
+
+
+class FullTextStore:
+    """Compressed full texts of imported papers, in memory with MongoDB persistence"""
+
+    def __init__(self):
+        self._texts = {}
+        self._lock = threading.Lock()
+
+    def save(self, paper_id: str, full_text: CompressedText, paper_content: Dict = None):
+        """Keep the text; the paper's title and source go along so it can be re-indexed after a restart"""
+        with self._lock:
+            self._texts[paper_id] = full_text
+
+        from models.database import db
+        paper_content = paper_content or {}
+        db.save_full_text(paper_id, {
+            **full_text.to_document(),
+            'title': paper_content.get('title'),
+            'source': paper_content.get('source')
+        })
+
+    def get(self, paper_id: str) -> Optional[CompressedText]:
+        with self._lock:
+            full_text = self._texts.get(paper_id)
+        if full_text is not None:
+            return full_text
+
+        from models.database import db
+        document = db.get_full_text(paper_id)
+        if not document:
+            return None
+
+        full_text = CompressedText.from_document(document)
+        with self._lock:
+            self._texts[paper_id] = full_text
+        return full_text
+
+    def get_text(self, paper_id: str, start: int = 0, end: int = None) -> Optional[str]:
+        full_text = self.get(paper_id)
+        return full_text.get_text(start, end) if full_text else None
+
+    def delete(self, paper_id: str):
+        with self._lock:
+            self._texts.pop(paper_id, None)
+
+    def paper_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._texts)
+
+
+full_text_store = FullTextStore()
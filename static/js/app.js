@@ -879,7 +879,7 @@ class PaperGenerator {
             html += `
                 <div class="col-md-6 mb-4">
                     <div class="card">
-                        <img src="${chart.image}" class="card-img-top" alt="${chart.title}" style="height: 300px; object-fit: contain;">
+                        <img src="${chart.url || chart.image}" class="card-img-top" alt="${chart.title}" style="height: 300px; object-fit: contain;">
                         <div class="card-body">
                             <h6 class="card-title">${this.escapeHtml(chart.title)}</h6>
                             <p class="card-text small text-muted">${this.escapeHtml(chart.caption)}</p>
@@ -0,0 +1,737 @@
+#!/usr/bin/env python3
+
+import base64
+import itertools
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+from io import BytesIO, StringIO
+from PIL import Image
+from PyPDF2 import PdfReader
+from reportlab import rl_config
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus import Paragraph, SimpleDocTemplate
+from services import pdf_service as pdf_service_module
+from services.pdf_service import PDFService, LazyStory, PDF_PROFILES
+from services.pdf_templates import get_template
+from services.markdown_flowables import markdown_converter
+from services.chart_store import chart_store, ChartStore, CHART_RENDER_DPI
+from services.latex_service import LaTeXService
+from services.document_tree import parse_document
+from services.markup_export import markup_exporter
+from services.export_service import export_service, ExportService
+from services.artifact_store import ArtifactStore
+from services.render_pool import RenderPool, RenderBusy, RenderTimeout
+from services.prerender_queue import PrerenderQueue
+from services import batch_export
+from services.batch_export import BatchExportManager
+
+SAMPLE_SECTION = """## Setup
+We compare **baseline** and *tuned* models where latency < 5 ms & error > 0.
+Results hold across seeds.
+
+- first finding
+- second `finding`
+1. step one
+2) step two
+"""
+
+def _pdf_text(buffer: BytesIO) -> str:
+    return ''.join(page.extract_text() for page in PdfReader(buffer).pages)
+
+def test_markdown_flowables():
+    print("Testing markdown section conversion...")
+
+    blocks = markdown_converter.tokenize(SAMPLE_SECTION)
+    for kind, text, marker in blocks:
+        print(f"{kind}: {text!r} {marker or ''}")
+
+    assert [kind for kind, _, _ in blocks] == ['heading', 'paragraph', 'bullet', 'bullet', 'number', 'number']
+    assert blocks[1][1].endswith('Results hold across seeds.')
+    assert blocks[5][2] == '2.'
+    assert markdown_converter.inline('**a < b** & *c* snake_case') == '<b>a &lt; b</b> &amp; <i>c</i> snake_case'
+
+    template = get_template('IEEE')
+    first = markdown_converter.convert(SAMPLE_SECTION, template)
+    second = markdown_converter.convert(SAMPLE_SECTION, template)
+    assert len(first) == 6
+    assert first[0] is not second[0]
+    assert first[0].frags is second[0].frags
+    print("OK Sections tokenized once and served from cache")
+
+def test_citation_style_templates():
+    print("Testing citation style templates...")
+
+    service = PDFService()
+    paper = {
+        'title': 'Latency & Accuracy',
+        'abstract': 'We study <fast> models.',
+        'introduction': SAMPLE_SECTION,
+        'conclusion': 'Done.',
+        'references': ['Doe, J. (2020). Fast models. Journal of Speed, 1(2), 3-4.']
+    }
+
+    for style, header in (('IEEE', 'REFERENCES'), ('APA', 'References'), ('MLA', 'Works Cited')):
+        text = _pdf_text(service.generate_pdf(dict(paper, metadata={'citation_style': style})))
+        print(f"{style}: {len(text)} characters")
+        assert header in text
+        assert 'latency < 5 ms & error > 0' in text
+
+    assert get_template('apa') is get_template('APA')
+    assert get_template('unknown') is get_template('IEEE')
+
+    with_metadata = _pdf_text(service.create_with_metadata(paper, {'plagiarism_score': 4, 'word_count': 120}))
+    assert 'Plagiarism Score: 4%' in with_metadata
+    assert 'Latency & Accuracy' in with_metadata
+    print("OK Each style renders with its own layout")
+
+class FakeChartDatabase:
+    def __init__(self):
+        self.charts = {}
+
+    def save_chart(self, chart_id, image_bytes):
+        self.charts[chart_id] = image_bytes
+        return chart_id
+
+    def get_chart(self, chart_id):
+        return self.charts.get(chart_id)
+
+def test_chart_store():
+    print("Testing chart storage by content hash...")
+
+    png = BytesIO()
+    Image.new('RGB', (1600, 900), (30, 90, 160)).save(png, format='PNG')
+    data_url = 'data:image/png;base64,' + base64.b64encode(png.getvalue()).decode('ascii')
+
+    charts = chart_store.store_charts([{'title': 'Accuracy', 'caption': 'Accuracy by epoch', 'image': data_url}])
+    print(f"Stored chart {charts[0]['id']} at {charts[0]['url']}")
+
+    assert 'image' not in charts[0]
+    assert chart_store.save(png.getvalue()) == charts[0]['id']
+    assert chart_store.path_for('../secret') is None
+
+    first = chart_store.image_flowable(charts[0]['id'], 360, 216)
+    second = chart_store.image_flowable(charts[0]['id'], 360, 216)
+    assert first is not second and first._img is second._img
+    assert first._img.getSize()[0] <= 750
+
+    pdf = PDFService().generate_pdf({'title': 'Charts', 'charts': charts})
+    assert 'Fig. 1. Accuracy by epoch' in _pdf_text(pdf)
+
+    # A fresh local directory (reboot, another instance) is refilled from the database
+    database = FakeChartDatabase()
+    ChartStore(tempfile.mkdtemp(), database).save(png.getvalue())
+    restored = ChartStore(tempfile.mkdtemp(), database)
+    assert restored.exists(charts[0]['id'])
+    with open(restored.path_for(charts[0]['id']), 'rb') as f:
+        assert f.read() == png.getvalue()
+    assert not restored.exists('0' * 64)
+    print("OK Charts stored once and decoded once per process")
+
+def _image_widths(path: str) -> list:
+    widths = []
+    for page in PdfReader(path).pages:
+        for xobject in page['/Resources'].get('/XObject', {}).values():
+            xobject = xobject.get_object()
+            if xobject['/Subtype'] == '/Image':
+                widths.append(xobject['/Width'])
+    return widths
+
+def test_pdf_profiles():
+    print("Testing optimized PDF profile and size report...")
+
+    # Noise doesn't compress, so the image resolution dominates the file size
+    png = BytesIO()
+    Image.effect_noise((1600, 900), 80).convert('RGB').save(png, format='PNG')
+    data_url = 'data:image/png;base64,' + base64.b64encode(png.getvalue()).decode('ascii')
+    paper = {
+        'title': 'Profiled Study',
+        'introduction': 'Results are shown below. ' * 40,
+        'charts': chart_store.store_charts([{'title': 'Noise', 'caption': 'Sensor noise', 'image': data_url}])
+    }
+
+    exporter = ExportService(store=ArtifactStore(tempfile.mkdtemp()))
+    paths = {profile: exporter.pdf_artifact(paper, profile=profile)[1] for profile in PDF_PROFILES}
+    sizes = {profile: os.path.getsize(path) for profile, path in paths.items()}
+    print(f"Sizes {sizes}")
+    assert sizes['optimized'] < sizes['standard']
+    for path in paths.values():
+        assert 'Fig. 1. Sensor noise' in _pdf_text(path)
+
+    # Standard keeps the chart resolution and page compression renders had before profiles
+    for profile, width in (('standard', round(5 * CHART_RENDER_DPI)), ('optimized', round(5 * 96))):
+        assert _image_widths(paths[profile]) == [width], profile
+    compression = rl_config.pageCompression
+    rl_config.pageCompression = 0
+    try:
+        for profile, filtered in (('standard', False), ('optimized', True)):
+            path = os.path.join(tempfile.mkdtemp(), 'out.pdf')
+            PDFService().generate_pdf_streaming(paper, path, profile)
+            contents = PdfReader(path).pages[0]['/Contents'].get_object()
+            assert ('/Filter' in contents) == filtered, profile
+    finally:
+        rl_config.pageCompression = compression
+
+    report = exporter.pdf_size_report(paper)
+    assert report['sizes'] == sizes
+    expected = round(100 * (sizes['standard'] - sizes['optimized']) / sizes['standard'], 1)
+    assert report['reduction_percent'] == {'optimized': expected} and expected > 0
+    print(f"OK optimized profile is {expected}% smaller")
+
+def test_streaming_render():
+    print("Testing chunked low-memory render...")
+
+    paper = {
+        'title': 'Long Study',
+        'introduction': '\n\n'.join(f"## Part {i}\n" + "Consistent gains across runs. " * 80 for i in range(30)),
+        'references': ['Doe, J. (2020). Long papers. Journal of Length, 1(1), 1-2.']
+    }
+    service = PDFService()
+    standard = PdfReader(service.generate_pdf(paper))
+
+    chunk_pages, pdf_service_module.CHUNK_PAGES = pdf_service_module.CHUNK_PAGES, 3
+    try:
+        path = service.generate_pdf_streaming(paper, os.path.join(tempfile.mkdtemp(), 'streaming_test.pdf'))
+    finally:
+        pdf_service_module.CHUNK_PAGES = chunk_pages
+    streamed = PdfReader(path)
+    print(f"Streamed {len(streamed.pages)} pages in chunks of 3")
+
+    assert len(streamed.pages) == len(standard.pages) > 6
+    for streamed_page, standard_page in zip(streamed.pages, standard.pages):
+        assert streamed_page.extract_text() == standard_page.extract_text()
+    assert streamed.metadata.title == standard.metadata.title
+
+    buffer = BytesIO()
+    service.generate_pdf_streaming(paper, buffer)
+    buffer.seek(0)
+    assert len(PdfReader(buffer).pages) == len(standard.pages)
+    print("OK chunked render matches the standard layout page for page")
+
+def test_lazy_story_keep_with_next():
+    print("Testing lazy story with keep-with-next headings...")
+
+    template = get_template('IEEE')
+    heading = ParagraphStyle('KeepHeading', parent=template.styles['Section'], keepWithNext=1)
+
+    def flowables():
+        for i in range(40):
+            yield Paragraph(f"Heading {i}", heading)
+            yield Paragraph(f"Body {i} " * 60, template.styles['Body'])
+
+    buffer = BytesIO()
+    SimpleDocTemplate(buffer).build(LazyStory(flowables()))
+    text = _pdf_text(BytesIO(buffer.getvalue()))
+    assert 'Heading 0' in text and 'Heading 39' in text and 'Body 39' in text
+
+    story = LazyStory(iter(range(10)))
+    assert story[:3] == [0, 1, 2] and story[-1] == 9
+    del story[:2]
+    assert story[0] == 2 and len(story) == 8
+    print("OK slices are filled before ReportLab reads them")
+
+def test_artifact_store():
+    print("Testing artifact store accounting and LRU eviction...")
+
+    store = ArtifactStore(tempfile.mkdtemp(), max_bytes=100)
+    store.put('a', '.pdf', b'a' * 40)
+    for _ in range(5):
+        store.put('a', '.pdf', b'a' * 40)
+    assert store._total_bytes == 40
+
+    store.put('b', '.pdf', b'b' * 40)
+    # Reading 'a' makes 'b' the least recently used
+    past = time.time() - 60
+    os.utime(store.path_for('b', '.pdf'), (past, past))
+    store.get('a', '.pdf')
+    store.put('c', '.pdf', b'c' * 40)
+    print(f"Kept {sorted(os.listdir(store.root))}, {store._total_bytes} bytes")
+    assert store.get('b', '.pdf') is None
+    assert store.get('a', '.pdf') and store.get('c', '.pdf')
+    assert store._total_bytes == 80
+    print("OK overwrites don't inflate the running total")
+
+def test_artifact_http_caching():
+    print("Testing ETag, 304 and range responses...")
+
+    from flask import Flask
+    from blueprints.pdf_export import pdf_bp
+    from blueprints.paper_generator import papers_storage
+
+    app = Flask(__name__)
+    app.register_blueprint(pdf_bp, url_prefix='/api/pdf')
+    client = app.test_client()
+    papers_storage['http-caching'] = {'title': 'Cached Export', 'introduction': 'Body text. ' * 50}
+
+    first = client.get('/api/pdf/latex/http-caching')
+    etag = first.headers['ETag']
+    print(f"ETag {etag}, {len(first.data)} bytes")
+    assert first.status_code == 200 and etag.strip('"') == export_service.artifact_key(papers_storage['http-caching'], 'latex')
+
+    assert client.get('/api/pdf/latex/http-caching', headers={'If-None-Match': etag}).status_code == 304
+    partial = client.get('/api/pdf/latex/http-caching', headers={'Range': 'bytes=0-9'})
+    assert partial.status_code == 206 and partial.data == first.data[:10]
+
+    papers_storage['http-caching'] = dict(papers_storage['http-caching'], title='Edited Export')
+    assert client.get('/api/pdf/latex/http-caching', headers={'If-None-Match': etag}).status_code == 200
+    del papers_storage['http-caching']
+    print("OK unchanged exports revalidate and support ranges")
+
+class BusyPool:
+    def render_pdf_file(self, *args, **kwargs):
+        raise RenderBusy("all slots taken")
+
+def test_zip_download_errors():
+    print("Testing complete-package download errors...")
+
+    from flask import Flask
+    from blueprints.pdf_export import pdf_bp
+    from blueprints.paper_generator import papers_storage
+
+    app = Flask(__name__)
+    app.register_blueprint(pdf_bp, url_prefix='/api/pdf')
+    client = app.test_client()
+    papers_storage['zip-download'] = {'title': f'Package {time.time()}', 'introduction': 'Body text.',
+                                      'additional_files': {'bibliography': '- Doe 2020'}}
+
+    pool, export_service.pool = export_service.pool, BusyPool()
+    try:
+        busy = client.get('/api/pdf/download-files/zip-download')
+    finally:
+        export_service.pool = pool
+    assert busy.status_code == 503 and 'busy' in busy.get_json()['error']
+
+    response = client.get('/api/pdf/download-files/zip-download')
+    with zipfile.ZipFile(BytesIO(response.data)) as package:
+        names = package.namelist()
+    print(f"Package: {names}")
+    assert response.status_code == 200
+    assert names == ['research_paper.tex', 'bibliography.md', 'research_paper.pdf']
+    assert client.get('/api/pdf/download-files/zip-download').data == response.data
+    del papers_storage['zip-download']
+    print("OK render errors are reported before the ZIP starts")
+
+def _sleep_then(value, seconds):
+    time.sleep(seconds)
+    return value
+
+def test_render_pool_limits():
+    print("Testing render pool busy and timeout errors...")
+
+    pool = RenderPool(workers=0, max_concurrent=1, queue_timeout=0.2)
+    started, release = threading.Event(), threading.Event()
+    holder = threading.Thread(target=pool.run, args=(lambda: (started.set(), release.wait()),))
+    holder.start()
+    started.wait()
+    try:
+        pool.run(abs, -1)
+        assert False, "expected RenderBusy"
+    except RenderBusy:
+        pass
+    release.set()
+    holder.join()
+    assert pool.run(abs, -1) == 1
+
+    pool = RenderPool(workers=1, max_concurrent=1, timeout=0.5)
+    try:
+        pool.run(time.sleep, 30)
+        assert False, "expected RenderTimeout"
+    except RenderTimeout:
+        pass
+    # The hung worker was replaced, so the next render runs normally
+    assert pool.run(abs, -2) == 2
+    pool.shutdown()
+
+    # A fast render caught in the pool reset of a hung one is run again, not failed
+    pool = RenderPool(workers=2, max_concurrent=2, timeout=2)
+    outcomes = {}
+    def render(name, *args):
+        try:
+            outcomes[name] = pool.run(_sleep_then, *args)
+        except Exception as e:
+            outcomes[name] = e
+    slow = threading.Thread(target=render, args=('slow', 'slow', 30))
+    slow.start()
+    time.sleep(1.4)
+    fast = threading.Thread(target=render, args=('fast', 'fast', 1))
+    fast.start()
+    slow.join()
+    fast.join()
+    pool.shutdown()
+    print(f"Concurrent renders: {outcomes}")
+    assert isinstance(outcomes['slow'], RenderTimeout) and outcomes['fast'] == 'fast'
+    print("OK a full queue and a hung worker fail fast")
+
+class SlowExporter:
+    """Stands in for ExportService, writing small artifacts and pausing in the PDF render"""
+
+    def __init__(self):
+        self.store = ArtifactStore(tempfile.mkdtemp())
+        self.started, self.release = threading.Event(), threading.Event()
+
+    def artifact_key(self, paper_content, kind):
+        return self.store.content_key(paper_content, kind, 'test')
+
+    def _artifact(self, paper_content, kind, extension):
+        key = self.artifact_key(paper_content, kind)
+        return key, self.store.put(key, extension, kind.encode('ascii'))
+
+    def pdf_artifact(self, paper_content, background=False):
+        self.started.set()
+        self.release.wait()
+        return self._artifact(paper_content, 'pdf', '.pdf')
+
+    def latex_artifact(self, paper_content):
+        return self._artifact(paper_content, 'latex', '.tex')
+
+    def zip_artifact(self, paper_content, background=False):
+        return self._artifact(paper_content, 'zip', '.zip')
+
+def test_prerender_cancel():
+    print("Testing pre-render cancellation...")
+
+    exporter = SlowExporter()
+    prerender = PrerenderQueue(exporter)
+    exporter.release.set()
+    prerender.enqueue('kept', {'title': 'Kept'})
+    prerender._jobs.join()
+    assert len(os.listdir(exporter.store.root)) == 3
+    # Finished jobs leave no bookkeeping behind
+    assert prerender._generations == {} and prerender._rendered == {}
+    prerender.cancel('kept', discard=True, paper_content={'title': 'Kept'})
+    assert os.listdir(exporter.store.root) == []
+
+    # Deleted while its PDF is still rendering
+    exporter.started.clear()
+    exporter.release.clear()
+    prerender.enqueue('deleted', {'title': 'Deleted'})
+    exporter.started.wait()
+    prerender.cancel('deleted', discard=True)
+    exporter.release.set()
+    prerender._jobs.join()
+    print(f"Left behind: {os.listdir(exporter.store.root)}")
+    assert os.listdir(exporter.store.root) == []
+    assert prerender._generations == {} and prerender._rendered == {}
+
+    # Superseded and cancelled jobs are forgotten too
+    for i in range(5):
+        prerender.enqueue('edited', {'title': f'Edit {i}'})
+    prerender.enqueue('other', {'title': 'Other'})
+    prerender.cancel('other')
+    prerender._jobs.join()
+    assert prerender._generations == {} and prerender._rendered == {}
+    print("OK cancelled papers leave no artifacts behind")
+
+class FlakyExporter(SlowExporter):
+    """PDF renders fail for papers titled 'Broken'"""
+
+    def __init__(self):
+        super().__init__()
+        self.pool = RenderPool(workers=0, max_concurrent=2)
+        self.release.set()
+
+    def pdf_artifact(self, paper_content, background=False):
+        if paper_content['title'] == 'Broken':
+            raise RenderTimeout("Render exceeded 60s")
+        return super().pdf_artifact(paper_content, background)
+
+def test_batch_export_jobs():
+    print("Testing batch export jobs...")
+
+    manager = BatchExportManager(FlakyExporter())
+    papers = [{'paper_id': 'good-paper', 'content': {'title': 'Good'}},
+              {'paper_id': 'broken-paper', 'content': {'title': 'Broken'}}]
+    missing = [{'paper_id': 'missing', 'format': 'pdf', 'error': 'Paper not found'}]
+    job_id = manager.submit(papers, ['pdf', 'latex'], missing)
+    manager._executor.shutdown(wait=True)
+    manager._executor = None
+
+    status = manager.status(job_id)
+    print(f"{status['completed']} completed, {status['failed']} failed")
+    assert status['status'] == 'completed' and status['total'] == 5
+    assert (status['completed'], status['failed']) == (3, 2)
+
+    with zipfile.ZipFile(BytesIO(b''.join(manager.stream_result(job_id)))) as package:
+        names = package.namelist()
+        errors = json.loads(package.read('errors.json'))
+    assert sorted(names) == ['Broken_broken-p.tex', 'Good_good-pap.pdf', 'Good_good-pap.tex', 'errors.json']
+    assert {(error['paper_id'], error['error']) for error in errors} == {
+        ('broken-paper', 'Render exceeded 60s'), ('missing', 'Paper not found')}
+
+    # Finished jobs expire, and the table never grows past its cap
+    manager._jobs[job_id]['finished_time'] -= batch_export.JOB_RETENTION_SECONDS + 1
+    assert manager.status(job_id) is None
+    for _ in range(batch_export.MAX_RETAINED_JOBS + 5):
+        manager.submit([], ['pdf'])
+    assert len(manager._jobs) == batch_export.MAX_RETAINED_JOBS
+    print("OK partial failures are reported and old jobs are dropped")
+
+def test_batch_export_validation():
+    print("Testing batch export request validation...")
+
+    from flask import Flask
+    from blueprints.pdf_export import pdf_bp
+
+    app = Flask(__name__)
+    app.register_blueprint(pdf_bp, url_prefix='/api/pdf')
+    client = app.test_client()
+    for payload in ({'paper_ids': 'abc'}, {'paper_ids': ['a', 3]}, {'paper_ids': ['a'], 'formats': 'pdf'}):
+        response = client.post('/api/pdf/export-batch', json=payload)
+        assert response.status_code == 400, payload
+    print("OK malformed paper_ids and formats are rejected")
+
+def test_latex_escaping():
+    print("Testing LaTeX escaping and rendering...")
+
+    service = LaTeXService()
+    assert service._escape_latex('50% & C:\\data {x}') == '50\\% \\& C:\\textbackslash{}data \\{x\\}'
+    assert service._escape_latex('a^b ~c') == 'a\\textasciicircum{}b \\textasciitilde{}c'
+
+    paper = {'title': 'Latency & Accuracy', 'introduction': 'See Fig. 1, Table I and Table II.',
+             'references': ['Doe, J. (2020). Fast_models.']}
+    document = service.generate_latex_document(paper)
+    print(f"Rendered {len(document)} characters")
+    assert '\\title{Latency \\& Accuracy}' in document
+    assert 'See \\ref{fig:1}, \\ref{tab:1} and Table II.' in document
+    assert 'Fast\\_models.' in document
+
+    output = StringIO()
+    assert service.write_latex_document(paper, output) == len(document)
+    assert output.getvalue() == document
+    print("OK Special characters escaped once, streamed output matches")
+
+FAKE_ENGINE = """#!{python}
+import os, resource, sys, time
+with open({calls!r}, 'a') as f:
+    f.write('run\\n')
+source = open('main.tex').read()
+if 'SLOW' in source:
+    time.sleep(30)
+if 'BROKEN' in source:
+    open('main.log', 'w').write('! Undefined control sequence.')
+    sys.exit(1)
+cpu = resource.getrlimit(resource.RLIMIT_CPU)[0]
+with open('main.pdf', 'w') as f:
+    f.write(f'%PDF-1.4 cpu={{cpu}} session={{os.getsid(0) == os.getpid()}} asset={{os.path.exists("figure1.png")}}')
+"""
+
+def _fake_latex_compiler(**kwargs):
+    """LaTeXCompiler driving a stand-in pdflatex that records each run and honours SLOW/BROKEN markers"""
+    from services.latex_compiler import LaTeXCompiler
+
+    bin_dir = tempfile.mkdtemp()
+    calls = os.path.join(bin_dir, 'calls.log')
+    engine = os.path.join(bin_dir, 'pdflatex')
+    with open(engine, 'w') as f:
+        f.write(FAKE_ENGINE.format(python=sys.executable, calls=calls))
+    os.chmod(engine, 0o755)
+
+    path = os.environ['PATH']
+    os.environ['PATH'] = bin_dir + os.pathsep + path
+    try:
+        compiler = LaTeXCompiler(store=ArtifactStore(tempfile.mkdtemp()), engine='pdflatex', **kwargs)
+    finally:
+        os.environ['PATH'] = path
+
+    def runs():
+        if not os.path.exists(calls):
+            return 0
+        with open(calls) as f:
+            return len(f.readlines())
+    return compiler, runs
+
+def test_latex_compiler():
+    print("Testing sandboxed LaTeX compiles with a fake engine...")
+
+    from services.latex_compiler import LaTeXCompileError
+
+    compiler, runs = _fake_latex_compiler(timeout=2)
+    assert compiler.available and compiler.engine == 'pdflatex'
+
+    key, path = compiler.compile('\\documentclass{article}', {'figure1.png': b'png'})
+    with open(path) as f:
+        output = f.read()
+    print(f"Compiled {key[:12]}: {output}")
+    # Two passes, each in its own session with the CPU limit applied
+    assert runs() == 2
+    assert 'cpu=3' in output and 'session=True' in output and 'asset=True' in output
+
+    assert compiler.compile('\\documentclass{article}', {'figure1.png': b'png'}) == (key, path)
+    assert runs() == 2
+
+    try:
+        compiler.compile('BROKEN')
+        assert False, 'expected a compile error'
+    except LaTeXCompileError as e:
+        assert 'Undefined control sequence' in e.log
+
+    started = time.monotonic()
+    try:
+        compiler.compile('SLOW')
+        assert False, 'expected a timeout'
+    except RenderTimeout:
+        pass
+    assert time.monotonic() - started < 10
+    print("OK compiles are cached, failures carry the log and slow engines are killed")
+
+def test_latex_compile_stub_fallback():
+    print("Testing LaTeX compile endpoint without a TeX engine...")
+
+    from flask import Flask
+    from blueprints import latex_templates
+    from blueprints.paper_generator import papers_storage
+    from services.latex_compiler import LaTeXCompiler
+
+    path = os.environ['PATH']
+    os.environ['PATH'] = tempfile.mkdtemp()
+    try:
+        unavailable = LaTeXCompiler(store=ArtifactStore(tempfile.mkdtemp()))
+    finally:
+        os.environ['PATH'] = path
+    assert not unavailable.available
+
+    app = Flask(__name__)
+    app.register_blueprint(latex_templates.latex_bp, url_prefix='/api/latex')
+    client = app.test_client()
+    papers_storage['latex-compile'] = {'title': 'Compiled Paper', 'introduction': 'Body text. ' * 20}
+
+    compiler = latex_templates.latex_compiler
+    latex_templates.latex_compiler = unavailable
+    try:
+        response = client.get('/api/latex/compile/latex-compile/ieee')
+    finally:
+        latex_templates.latex_compiler = compiler
+    assert response.status_code == 200 and response.headers['X-LaTeX-Engine'] == 'stub'
+    assert 'Compiled Paper' in _pdf_text(BytesIO(response.data))
+
+    fake, runs = _fake_latex_compiler()
+    latex_templates.latex_compiler = fake
+    try:
+        response = client.get('/api/latex/compile/latex-compile/ieee')
+    finally:
+        latex_templates.latex_compiler = compiler
+    assert response.status_code == 200 and response.headers['X-LaTeX-Engine'] == 'pdflatex'
+    assert runs() == 2
+    print("OK falls back to the ReportLab render when no engine is installed")
+
+def test_document_tree_exports():
+    print("Testing shared document tree exporters...")
+
+    paper = {
+        'title': 'Latency <& Accuracy>',
+        'introduction': SAMPLE_SECTION,
+        'methodology': 'We measure latency_ms.',
+        'results': 'Latency fell by 40%.',
+        'references': ['Doe, J. (2020). Fast models.'],
+        'plagiarism_check': {'score': 3}
+    }
+    tree = parse_document(paper)
+    assert parse_document(dict(paper, plagiarism_check={'score': 9})) is tree
+    assert list(tree.sections) == ['introduction', 'methodology', 'results']
+
+    markdown = markup_exporter.to_markdown(paper)
+    html_text = markup_exporter.to_html(paper)
+    latex = LaTeXService().generate_latex_document(paper)
+    print(f"Markdown {len(markdown)}, HTML {len(html_text)}, LaTeX {len(latex)} characters")
+
+    assert '## Methodology' in markdown and '## Results' in markdown and '### Setup' in markdown
+    assert '<h2>Methodology</h2>' in html_text and '<h2>Results</h2>' in html_text
+    assert '<h1>Latency &lt;&amp; Accuracy&gt;</h1>' in html_text
+    assert '<li>second <code>finding</code></li>' in html_text
+    assert '\\subsection{Setup}' in latex and '\\item first finding' in latex
+    assert 'latency\\_ms' in latex
+    print("OK One parse feeds Markdown, HTML and LaTeX with every section")
+
+def test_docx_export():
+    print("Testing streamed DOCX export...")
+
+    paper = {
+        'title': 'Latency & Accuracy',
+        'abstract': 'We study fast models.',
+        'introduction': SAMPLE_SECTION,
+        'results': 'Latency fell\x07 by 40%.',
+        'references': ['Doe, J. (2020). Fast models.']
+    }
+    key, path = export_service.docx_artifact(paper)
+    assert export_service.docx_artifact(paper) == (key, path)
+
+    with zipfile.ZipFile(path) as package:
+        names = package.namelist()
+        print(f"Parts: {names}")
+        for name in names:
+            if name.endswith(('.xml', '.rels')):
+                ET.fromstring(package.read(name))
+        document = package.read('word/document.xml').decode('utf-8')
+
+    assert '[Content_Types].xml' in names and 'word/numbering.xml' in names
+    assert '<w:pStyle w:val="Heading2"/></w:pPr><w:r><w:t xml:space="preserve">Setup</w:t>' in document
+    assert '<w:r><w:rPr><w:b/></w:rPr><w:t xml:space="preserve">baseline</w:t></w:r>' in document
+    assert 'latency &lt; 5 ms &amp; error &gt; 0' in document
+    assert '[1] Doe, J. (2020). Fast models.' in document
+    print("OK DOCX parts are well-formed and cached")
+
+def test_docx_charts_and_lists():
+    print("Testing DOCX charts and separate lists...")
+
+    from services.docx_writer import docx_writer
+    from services.export_service import stream_zip_entries
+
+    png = BytesIO()
+    Image.new('RGB', (320, 180), (200, 60, 40)).save(png, format='PNG')
+    data_url = 'data:image/png;base64,' + base64.b64encode(png.getvalue()).decode('ascii')
+    paper = {
+        'title': 'Listed Study',
+        'methodology': '1. Collect traces\n2. Label flows\n\nThen we train.\n\n- fast\n- small\n\nFinally:\n\n1. Evaluate\n2. Report',
+        'charts': chart_store.store_charts([{'title': 'Loss', 'caption': 'Training loss', 'image': data_url}])
+    }
+
+    # The stored chart disappears after the parts are planned but before the media entry is written
+    entries = docx_writer.iter_entries(paper)
+    first = next(entries)
+    os.remove(chart_store.path_for(paper['charts'][0]['id']))
+    try:
+        package_bytes = b''.join(stream_zip_entries(itertools.chain([first], entries)))
+    finally:
+        chart_store.save(png.getvalue())
+
+    with zipfile.ZipFile(BytesIO(package_bytes)) as package:
+        document = package.read('word/document.xml').decode('utf-8')
+        numbering = package.read('word/numbering.xml').decode('utf-8')
+        assert package.read('word/media/chart1.png') == png.getvalue()
+    assert 'r:embed="chart1"' in document and 'Figure 1. Training loss' in document
+
+    num_ids = re.findall(r'<w:numId w:val="(\d+)"/>', document)
+    print(f"List paragraphs use numbering instances {num_ids}")
+    assert num_ids == ['1', '1', '2', '2', '3', '3']
+    assert re.findall(r'<w:num w:numId="(\d+)"><w:abstractNumId w:val="(\d)"/>', numbering) == [
+        ('1', '1'), ('2', '0'), ('3', '1')
+    ]
+    assert numbering.count('<w:startOverride w:val="1"/>') == 3
+    print("OK each list restarts its numbering and charts are embedded")
+
+if __name__ == "__main__":
+    test_markdown_flowables()
+    test_citation_style_templates()
+    test_chart_store()
+    test_pdf_profiles()
+    test_streaming_render()
+    test_lazy_story_keep_with_next()
+    test_artifact_store()
+    test_artifact_http_caching()
+    test_zip_download_errors()
+    test_render_pool_limits()
+    test_prerender_cancel()
+    test_batch_export_jobs()
+    test_batch_export_validation()
+    test_latex_escaping()
+    test_latex_compiler()
+    test_latex_compile_stub_fallback()
+    test_document_tree_exports()
+    test_docx_export()
+    test_docx_charts_and_lists()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+import re
+from io import BytesIO
+from types import SimpleNamespace
+from config import Config
+from services import pdf_extractors
+from services import pdf_import_service as pdf_import_module
+from services.pdf_import_service import PDFImportService
+from services.reference_parser import ReferenceParser
+from services.citation_service import CitationService
+from services.text_store import CompressedText
+
+SAMPLE_PAPER = """Learning-Based Traffic Analysis for Urban Networks
+Jane Doe, John Smith
+Abstract—Traffic analyzers struggle with encrypted flows. We study the abstract
+structure of flows and propose a learned classifier.
+Index Terms—traffic analysis, machine learning
+I. INTRODUCTION
+Network operators need visibility. The introduction of encryption changed this.
+1.1 Motivation
+Subsection text stays inside the introduction.
+II. RELATED WORK
+Prior work used port-based heuristics.
+III. PROPOSED SYSTEM
+We describe the pipeline.
+IV. CONCLUSION
+We presented a classifier that reaches 94% accuracy.
+REFERENCES
+[1] J. Smith and A. Johnson, "Machine learning for traffic," IEEE Trans. Netw., vol. 3, 2021.
+[2] M. Brown, "Encrypted flow analysis," in Proc. IEEE INFOCOM, 2022, doi: 10.1109/INFOCOM.2022.123.
+"""
+
+def test_basic_section_extraction():
+    print("Testing structural PDF section extraction...")
+
+    service = PDFImportService()
+    sections = service.extract_sections_basic(SAMPLE_PAPER)
+
+    for key, value in sections.items():
+        print(f"{key}: {value[:60]!r}")
+
+    assert sections['title'] == 'Learning-Based Traffic Analysis for Urban Networks'
+    assert sections['abstract'].startswith('Traffic analyzers')
+    assert 'abstract\nstructure' in sections['abstract']
+    assert 'Subsection text' in sections['introduction']
+    assert sections['literature_review'] == 'Prior work used port-based heuristics.'
+    assert 'pipeline' not in sections['literature_review']
+    assert sections['conclusion'].endswith('94% accuracy.')
+    assert sections['references'].count('[') == 2
+    assert service._has_core_sections(sections)
+    print("OK Sections extracted in a single pass")
+
+def test_wrapped_alias_lines():
+    print("Testing wrapped body lines that spell a section name...")
+
+    paper = """Wrapped Lines in Extracted Papers
+1. Introduction
+We motivate the problem and then present our
+approach.
+The remaining sections cover the details of the
+evaluation.
+2. Method
+We describe the pipeline.
+3. Conclusion
+It works.
+"""
+    sections = PDFImportService().extract_sections_basic(paper)
+    print(f"Sections: {sorted(sections)}")
+    assert sections['introduction'].startswith('We motivate') and sections['introduction'].endswith('evaluation.')
+    assert sections['methodology'] == 'We describe the pipeline.'
+    assert 'results' not in sections
+    print("OK only heading-shaped lines start sections")
+
+def test_reference_parsing():
+    print("Testing offline reference parsing...")
+
+    service = PDFImportService()
+    references = service.extract_sections_basic(SAMPLE_PAPER)['references']
+    citations = ReferenceParser().parse(references)
+
+    for citation in citations:
+        print(f"- {citation['authors']} ({citation['year']}) {citation['title']} / {citation['journal']}")
+
+    assert len(citations) == 2
+    assert citations[0]['authors'] == ['J. Smith', 'A. Johnson']
+    assert citations[0]['title'] == 'Machine learning for traffic'
+    assert citations[1]['doi'] == '10.1109/INFOCOM.2022.123'
+    assert citations[1]['journal'] == 'Proc. IEEE INFOCOM'
+
+    apa = ReferenceParser().parse_entry(
+        "Smith, J. A., & Doe, B. (2020). Deep learning in healthcare. Journal of Medical AI, 12(3), 45-67."
+    )
+    assert apa['authors'] == ['J. A. Smith', 'B. Doe']
+    assert apa['year'] == 2020
+    assert apa['journal'] == 'Journal of Medical AI'
+
+    # AI extraction may hand back entries as strings, field dicts or junk
+    mixed = ReferenceParser().parse_references([
+        citations[0]['raw'],
+        {'title': 'Graph models of traffic', 'authors': 'Lee, K., & Park, S.', 'year': '2019', 'venue': 'NSDI'},
+        42
+    ])
+    assert [citation['title'] for citation in mixed] == ['Machine learning for traffic', 'Graph models of traffic']
+    assert mixed[1]['authors'] == ['K. Lee', 'S. Park'] and mixed[1]['year'] == 2019 and mixed[1]['journal'] == 'NSDI'
+    assert mixed[1]['raw'].startswith('K. Lee, S. Park (2019)')
+
+    citation_service = CitationService()
+    citation_service.index_citations(citations)
+    assert citation_service.search_local('encrypted flow', 1)[0]['title'] == 'Encrypted flow analysis'
+    print("OK References parsed into citation dicts")
+
+class StubModel:
+    """Answers every chunk prompt with the sections that chunk's markers name"""
+
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        chunk = prompt.split('Content: ', 1)[1]
+        lines = [f"{key}: {body}" for key, body in re.findall(r'@(TITLE|INTRODUCTION|CONCLUSION) (\w+)', chunk)]
+        return SimpleNamespace(text='\n'.join(lines) or 'TITLE: NONE')
+
+def test_chunked_ai_extraction():
+    print("Testing map-reduce AI section extraction...")
+
+    budget = pdf_import_module.CHUNK_TOKEN_BUDGET * pdf_import_module.CHARS_PER_TOKEN
+    # Each filler paragraph leaves no room for the marker paragraph after it
+    filler = 'x' * (budget - 40)
+    paragraphs = ['@TITLE First', '@INTRODUCTION opening', filler, '@INTRODUCTION continued', filler,
+                  '@TITLE Second', filler, '@CONCLUSION closing', 'y' * (budget + 10)]
+    content = '\n\n'.join(paragraphs)
+
+    service = PDFImportService()
+    chunks = service._split_into_chunks(content)
+    print(f"{len(chunks)} chunks of {[len(chunk) for chunk in chunks]} characters")
+    assert all(len(chunk) <= budget for chunk in chunks)
+    # Paragraphs are kept whole and only the oversized one is hard-split
+    assert '\n\n'.join(chunks).replace('y' * budget + '\n\n' + 'y' * 10, 'y' * (budget + 10)) == content
+    assert len(chunks) == 5 and chunks[0].endswith(filler) and chunks[1].startswith('@INTRODUCTION continued')
+    assert chunks[2].endswith('@CONCLUSION closing')
+
+    pdf_import_module.chunk_cache.clear()
+    service.gemini_model = StubModel()
+    sections = service.extract_sections_with_ai(content)
+    assert sections['title'] == 'First'
+    assert sections['introduction'] == 'opening\ncontinued'
+    assert sections['conclusion'] == 'closing'
+
+    calls = len(service.gemini_model.prompts)
+    assert calls == len(chunks)
+    assert service.extract_sections_with_ai(content) == sections
+    assert len(service.gemini_model.prompts) == calls
+    print("OK chunks merged in document order and reused from the cache on re-import")
+
+def test_compressed_full_text():
+    print("Testing compressed full-text storage...")
+
+    pages = [f"Page {i}. " + SAMPLE_PAPER for i in range(40)]
+    full_text = CompressedText.from_pages(pages)
+    info = full_text.get_info()
+
+    print(f"Stored {info['pages']} pages: {info['original_bytes']} -> {info['compressed_bytes']} bytes ({info['codec']})")
+
+    assert full_text.get_pages(10, 12) == pages[10:12]
+    assert full_text.get_text() == '\n'.join(pages)
+    assert info['compressed_bytes'] < info['original_bytes']
+    print("OK Page ranges decompress on demand")
+
+def _two_page_pdf() -> bytes:
+    from reportlab.pdfgen import canvas
+
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer)
+    for text in ('Alpha page introduction text', 'Beta page conclusion text'):
+        pdf.drawString(72, 720, text)
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+def test_pdf_extractors():
+    print("Testing PDF text extractor backends...")
+
+    pdf_bytes = _two_page_pdf()
+    available = pdf_extractors.available_extractors()
+    print(f"Available: {available}")
+    assert available[pdf_extractors.DEFAULT_EXTRACTOR]
+    for name, installed in available.items():
+        if not installed:
+            continue
+        # Bytes and file objects are both accepted
+        for source in (pdf_bytes, BytesIO(pdf_bytes)):
+            pages = pdf_extractors.get_extractor(name).extract_pages(source)
+            words = [' '.join(page.split()) for page in pages]
+            assert len(pages) == 2, f"{name}: {pages}"
+            assert 'Alpha page introduction text' in words[0] and 'Beta page conclusion text' in words[1], f"{name}: {words}"
+
+    # The import service uses the configured backend and falls back to PyPDF2 for unknown names
+    configured = Config.PDF_EXTRACTOR
+    try:
+        for name in (name for name, installed in available.items() if installed):
+            Config.PDF_EXTRACTOR = name
+            assert PDFImportService().extractor.name == name
+        Config.PDF_EXTRACTOR = 'PyPDF2'
+        assert PDFImportService().extractor.name == 'pypdf2'
+        Config.PDF_EXTRACTOR = 'no-such-backend'
+        assert PDFImportService().extractor is pdf_extractors.EXTRACTORS[pdf_extractors.DEFAULT_EXTRACTOR]
+    finally:
+        Config.PDF_EXTRACTOR = configured
+    assert pdf_extractors.get_extractor('no-such-backend').name == pdf_extractors.DEFAULT_EXTRACTOR
+    print("OK every installed backend reads both pages")
+
+if __name__ == "__main__":
+    test_basic_section_extraction()
+    test_wrapped_alias_lines()
+    test_reference_parsing()
+    test_chunked_ai_extraction()
+    test_compressed_full_text()
+    test_pdf_extractors()
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+
+import multiprocessing
+import os
+import random
+import tempfile
+from services.minhash_index import MinHashIndex
+from services.fingerprint_index import FingerprintIndex
+from services import paraphrase_index as paraphrase_module
+from services.paraphrase_index import ParaphraseIndex
+from services import plagiarism_service as plagiarism_module
+from services.plagiarism_service import PlagiarismService, paper_text
+
+random.seed(7)
+VOCABULARY = [f"term{i}" for i in range(5000)]
+
+
+def _text(words: int) -> str:
+    return ' '.join(random.choice(VOCABULARY) for _ in range(words))
+
+
+def _service() -> PlagiarismService:
+    service = PlagiarismService(MinHashIndex(), FingerprintIndex(tempfile.mkdtemp()), ParaphraseIndex())
+    service._corpus_loaded = True
+    return service
+
+
+def test_minhash_sources():
+    print("Testing MinHash LSH source lookup...")
+
+    service = _service()
+    corpus = {f"paper-{i}": _text(1500) for i in range(50)}
+    for paper_id, text in corpus.items():
+        service.index_paper(paper_id, {'title': paper_id, 'introduction': text})
+
+    copied = corpus['paper-3'].split()
+    query = ' '.join(copied[:600]) + ' ' + _text(600)
+    result = service.check_plagiarism(query)
+    print(f"Score {result['plagiarism_score']}% in {result['elapsed_ms']} ms, sources {result['sources']}")
+    assert 40 <= result['plagiarism_score'] <= 60
+    assert result['sources'][0]['paper_id'] == 'paper-3'
+    assert 0.1 < result['sources'][0]['jaccard'] < 0.5
+
+    assert service.check_plagiarism(_text(1000))['sources'] == []
+    assert service.check_plagiarism(corpus['paper-9'], exclude_id='paper-9')['plagiarism_score'] == 0
+
+    service.remove_paper('paper-3')
+    assert service.check_plagiarism(query)['sources'] == []
+    print("OK copied passages are attributed to their source paper")
+
+def test_corpus_reload_includes_imports():
+    print("Testing corpus rebuild after a restart...")
+
+    from models.database import db
+    from services.text_store import CompressedText
+
+    generated, imported = _shared_text('reload-generated'), _shared_text('reload-imported')
+    full_text = {'paper_id': 'imported', 'title': 'Imported Study', 'source': 'https://example.org/a.pdf',
+                 **CompressedText.from_pages([imported[:8000], imported[8000:]]).to_document()}
+
+    service = PlagiarismService(MinHashIndex(), FingerprintIndex(tempfile.mkdtemp()), ParaphraseIndex())
+    originals = db.iter_papers, db.iter_full_texts
+    db.iter_papers = lambda: iter([{'paper_id': 'generated', 'content': {'title': 'Generated', 'introduction': generated}}])
+    db.iter_full_texts = lambda: iter([full_text])
+    try:
+        result = service.check_plagiarism(' '.join(imported.split()[:400]))
+    finally:
+        db.iter_papers, db.iter_full_texts = originals
+
+    print(f"Sources: {[(source['paper_id'], source['title']) for source in result['sources']]}")
+    assert 'generated' in service.index and 'imported' in service.index and 'imported' in service.paraphrases
+    assert result['sources'][0]['paper_id'] == 'imported' and result['sources'][0]['title'] == 'Imported Study'
+    print("OK imported PDFs kept only as full texts are indexed again")
+
+def test_fingerprint_passages():
+    print("Testing winnowed fingerprint passages...")
+
+    root = tempfile.mkdtemp()
+    index = FingerprintIndex(root)
+    source = _text(4000)
+    index.add('source', source, {'title': 'Source'})
+    index.add('other', _text(4000))
+
+    start = source.index(' ', 5000) + 1
+    end = source.index(' ', 6000)
+    query = 'A new opening sentence. ' + source[start:end] + ' A new closing sentence.'
+    match = index.query(query)['matches'][0]
+    print(f"Passages: {match['passages']}")
+    assert match['doc_id'] == 'source' and len(match['passages']) == 1
+    passage = match['passages'][0]
+    assert query[passage['query_start']:passage['query_end']] == source[passage['source_start']:passage['source_end']]
+    assert passage['query_end'] - passage['query_start'] > 0.9 * (end - start)
+
+    # The table and journal are reopened from disk
+    index.remove('other')
+    reopened = FingerprintIndex(root)
+    assert len(reopened) == 1 and reopened.query(query)['matches'][0]['passages'] == match['passages']
+    print("OK copied passage located in both texts and kept across restarts")
+
+def _shared_text(doc_id: str) -> str:
+    rng = random.Random(doc_id)
+    return ' '.join(rng.choice(VOCABULARY) for _ in range(3000))
+
+
+def _add_shared_documents(root: str, worker: int):
+    index = FingerprintIndex(root)
+    for i in range(10):
+        index.add(f"worker{worker}-{i}", _shared_text(f"worker{worker}-{i}"))
+
+
+def test_fingerprint_shared_directory():
+    print("Testing fingerprint index shared by several processes...")
+
+    root = tempfile.mkdtemp()
+    index = FingerprintIndex(root)
+    index.add('local', _shared_text('local'))
+
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=_add_shared_documents, args=(root, worker)) for worker in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+
+    # Enough records that some process rebuilt the table while the others were writing
+    reopened = FingerprintIndex(root)
+    numbers = [document['doc'] for document in reopened._documents.values()]
+    print(f"{len(reopened)} documents, table capacity {len(reopened._table)}")
+    assert len(reopened) == 41 and len(set(numbers)) == 41
+    assert len(reopened._table) > 1 << 16
+
+    for doc_id in ['local', 'worker0-0', 'worker3-9']:
+        for searcher in (index, reopened):
+            match = searcher.query(_shared_text(doc_id))['matches'][0]
+            assert match['doc_id'] == doc_id and match['containment'] == 1.0
+    print("OK every process got its own document numbers and sees the others' documents")
+
+def test_batch_collusion():
+    print("Testing batch check with within-batch pairs...")
+
+    service = _service()
+    source = _text(2000)
+    service.index_paper('source', {'title': 'Source', 'introduction': source})
+
+    shared = _text(400)
+    texts = [_text(600) + ' ' + shared, _text(800), shared + ' ' + _text(300), ' '.join(source.split()[:500])]
+    batch = service.check_batch(texts)
+    print(f"Pairs: {batch['collusion_pairs']}")
+    assert [(pair['first'], pair['second']) for pair in batch['collusion_pairs']] == [(0, 2)]
+    assert batch['results'][3]['sources'][0]['paper_id'] == 'source'
+    for text, result in zip(texts, batch['results']):
+        single = service.check_plagiarism(text)
+        assert (single['plagiarism_score'], single['sources']) == (result['plagiarism_score'], result['sources'])
+    print("OK batch results match single checks and copied pairs are reported")
+
+def test_section_rechecks():
+    print("Testing section-level re-checks...")
+
+    service = _service()
+    source_paper = {'title': 'Source', 'introduction': _text(1500)}
+    service.index_paper('source', source_paper)
+    source = paper_text(source_paper)
+    paper = {'title': 'Draft', 'introduction': _text(800), 'results': _text(800), 'metadata': {}}
+    service.index_paper('draft', paper)
+
+    first = service.check_paper('draft', paper)
+    assert first['plagiarism_score'] == 0 and not any(section['cached'] for section in first['sections'])
+
+    revised = {**paper, 'results': paper['results'] + ' ' + ' '.join(source.split()[:300])}
+    second = service.check_paper('draft', revised)
+    print(f"Sections: {second['sections']}")
+    assert [(section['section'], section['cached']) for section in second['sections']] == [
+        ('introduction', True), ('results', False)
+    ]
+    assert second['sections'][1]['plagiarism_score'] > 10 and second['plagiarism_score'] > 0
+    passage = second['sources'][0]['passages'][0]
+    assert passage['section'] == 'results'
+    assert revised['results'][passage['query_start']:passage['query_end']] == source[passage['source_start']:passage['source_end']]
+    print("OK only the edited section was fingerprinted again")
+
+def test_check_paper_endpoint():
+    print("Testing paper check endpoint with drafts...")
+
+    from flask import Flask
+    from blueprints import plagiarism_check
+    from blueprints.paper_generator import papers_storage
+
+    app = Flask(__name__)
+    app.register_blueprint(plagiarism_check.plagiarism_bp, url_prefix='/api/plagiarism')
+    client = app.test_client()
+    papers_storage['endpoint-paper'] = {
+        'title': 'Saved Paper', 'citations_source': 'API',
+        'abstract': _shared_text('endpoint-abstract'), 'introduction': _shared_text('endpoint-introduction')
+    }
+
+    service = plagiarism_check.plagiarism_service
+    plagiarism_check.plagiarism_service = _service()
+    try:
+        draft = client.post('/api/plagiarism/check-paper/endpoint-paper',
+                            json={'sections': {'introduction': _shared_text('endpoint-draft')}})
+        assert draft.status_code == 200
+        assert 'plagiarism_check' not in papers_storage['endpoint-paper']
+
+        saved = client.post('/api/plagiarism/check-paper/endpoint-paper')
+    finally:
+        plagiarism_check.plagiarism_service = service
+    sections = [section['section'] for section in saved.get_json()['plagiarism_check']['sections']]
+    print(f"Checked sections {sections}")
+    assert sections == ['abstract', 'introduction']
+    assert papers_storage['endpoint-paper']['plagiarism_check']['sections'] == saved.get_json()['plagiarism_check']['sections']
+    print("OK draft checks are not saved and only prose sections are scored")
+
+def test_settings_check_types():
+    print("Testing that /settings only advertises check types /check accepts...")
+
+    from flask import Flask
+    from blueprints import plagiarism_check
+
+    app = Flask(__name__)
+    app.register_blueprint(plagiarism_check.plagiarism_bp, url_prefix='/api/plagiarism')
+    client = app.test_client()
+
+    check_types = client.get('/api/plagiarism/settings').get_json()['settings']['check_types']
+    service = plagiarism_check.plagiarism_service
+    plagiarism_check.plagiarism_service = _service()
+    try:
+        for check_type in check_types:
+            response = client.post('/api/plagiarism/check',
+                                   json={'text': _shared_text('settings-check'), 'check_type': check_type})
+            print(f"{check_type}: {response.status_code}")
+            assert response.status_code == 200, response.get_json()
+        assert client.post('/api/plagiarism/check',
+                           json={'text': _shared_text('settings-check'), 'check_type': 'unknown'}).status_code == 400
+    finally:
+        plagiarism_check.plagiarism_service = service
+    print("OK every advertised check type is accepted")
+
+def test_paraphrase_check():
+    print("Testing TF-IDF paraphrase check...")
+
+    service = _service()
+    sentences = [_text(15).capitalize() + '.' for _ in range(40)]
+    service.index_paper('source', {'title': 'Source', 'introduction': ' '.join(sentences)})
+    service.index_paper('other', {'title': 'Other', 'introduction': _text(600)})
+
+    # Reorder each copied sentence and swap a quarter of its words
+    reworded = []
+    for sentence in sentences[10:16]:
+        words = sentence.rstrip('.').split()
+        words = [random.choice(VOCABULARY) if i % 4 == 0 else word for i, word in enumerate(words)]
+        reworded.append(' '.join(reversed(words)) + '.')
+    text = _text(60) + '. ' + ' '.join(reworded) + ' ' + _text(60) + '.'
+
+    assert service.check_plagiarism(text)['sources'] == []
+    result = service.check_paraphrase(text)
+    print(f"Score {result['plagiarism_score']}%, sources {result['sources']}")
+    assert [source['paper_id'] for source in result['sources']] == ['source']
+    passage = result['sources'][0]['passages'][0]
+    assert passage['similarity'] >= 0.5 and text[passage['query_start']:passage['query_end']].startswith(reworded[0][:20])
+    assert service.check_paraphrase(_text(200))['sources'] == []
+    print("OK reworded sentences are matched to their source")
+
+def test_paraphrase_incremental_updates():
+    print("Testing incremental paraphrase matrix updates...")
+
+    rng = random.Random(11)
+    def sentences(count):
+        return [' '.join(rng.choice(VOCABULARY) for _ in range(15)).capitalize() + '.' for _ in range(count)]
+
+    block_rows, paraphrase_module.QUERY_BLOCK_ROWS = paraphrase_module.QUERY_BLOCK_ROWS, 8
+    try:
+        index = ParaphraseIndex()
+        for i in range(20):
+            index.add(f"base-{i}", ' '.join(sentences(20)))
+        index.query(' '.join(sentences(4)))
+        matrix = index._matrix
+        blocks = len(matrix['blocks'])
+
+        # Spans several 8-row blocks, but is well inside the IDF drift allowance
+        added = sentences(20)
+        index.add('added', ' '.join(added))
+        assert index._matrix is matrix and len(matrix['blocks']) >= blocks + 2
+        assert all(block.shape[1] == 8 for block in matrix['blocks'][:-1])
+        assert index.query(' '.join(added[5:9]))['matches'][0]['doc_id'] == 'added'
+        assert all(match['doc_id'] != 'added' for match in index.query(' '.join(added[5:9]), exclude='added')['matches'])
+
+        # Replacing a document masks its old rows
+        replacement = sentences(20)
+        index.add('added', ' '.join(replacement))
+        assert index._matrix is matrix
+        assert index.query(' '.join(added[5:9]))['matches'] == []
+        assert index.query(' '.join(replacement[2:6]))['matches'][0]['doc_id'] == 'added'
+
+        # Growing the corpus past the drift allowance recomputes the IDF
+        for i in range(5):
+            index.add(f"late-{i}", ' '.join(sentences(20)))
+        assert index._matrix is None
+        assert index.query(' '.join(replacement[2:6]))['matches'][0]['doc_id'] == 'added'
+        assert index._matrix['window_count'] == index._window_count
+    finally:
+        paraphrase_module.QUERY_BLOCK_ROWS = block_rows
+    print("OK documents appended and masked without rebuilding the corpus matrix")
+
+def test_aligned_spans():
+    print("Testing aligned span reporting...")
+
+    # Several corpora, since LSH alone finds this low-Jaccard source only some of the time
+    for seed in range(8):
+        rng = random.Random(seed)
+        words = lambda count: ' '.join(rng.choice(VOCABULARY) for _ in range(count))
+        service = _service()
+        source_paper = {'title': 'Source', 'introduction': words(2000)}
+        service.index_paper('source', source_paper)
+        source = paper_text(source_paper)
+
+        copied = source.split()[500:800]
+        copied[100] = 'edited'
+        text = words(100) + ' ' + ' '.join(copied) + ' ' + words(100)
+        spans = service.check_plagiarism(text)['sources'][0]['spans']
+        assert len(spans) == 1 and spans[0]['matched_words'] == 299, f"seed {seed}: {spans}"
+        span = spans[0]
+        assert text[span['query_start']:span['query_end']] == ' '.join(copied)
+        assert source[span['source_start']:span['source_end']] == ' '.join(source.split()[500:800])
+    print(f"Spans: {spans}")
+
+    # With more spans than the report lists, the longest are kept
+    runs = [' '.join(source.split()[start:start + length])
+            for start, length in ((100, 20), (300, 60), (600, 20), (900, 40))]
+    text = ' '.join(run + ' ' + words(30) for run in runs)
+    plagiarism_module.MAX_PASSAGES = 2
+    try:
+        spans = service._align(text, {'matches': []}, {'matches': [{'doc_id': 'source', 'containment': 1.0}]})['source']
+    finally:
+        plagiarism_module.MAX_PASSAGES = 20
+    assert [span['matched_words'] for span in spans] == [60, 40], spans
+
+    # Source texts live on disk next to the fingerprint table, not in the MinHash index
+    assert 'text' not in service.index._documents['source']
+    assert FingerprintIndex(service.fingerprints.root).text('source') == source
+    print("OK copied run reported once across a one-word edit")
+
+def test_fingerprint_texts_on_disk():
+    print("Testing indexed texts stored on disk...")
+
+    root = tempfile.mkdtemp()
+    index = FingerprintIndex(root)
+    first, second = _shared_text('disk-first'), _shared_text('disk-second')
+    index.add('paper', first)
+    index.add('paper', second)
+    index.add('gone', _shared_text('disk-gone'))
+    index.remove('gone')
+    assert index.text('paper') == second and index.text('gone') is None
+    assert len(os.listdir(index.texts_dir)) == 3
+
+    # Texts of replaced and removed documents are dropped with their records
+    with index._locked():
+        index._rebuild(0)
+    assert os.listdir(index.texts_dir) == [index._documents['paper']['digest'] + '.z']
+
+    # An index written before texts were stored gets them on the next add
+    os.remove(index._text_path(index._documents['paper']['digest']))
+    assert index.text('paper') is None
+    index.add('paper', second)
+    assert FingerprintIndex(root).text('paper') == second
+    print("OK texts read back on demand and cleaned up on rebuild")
+
+if __name__ == "__main__":
+    test_minhash_sources()
+    test_corpus_reload_includes_imports()
+    test_fingerprint_passages()
+    test_fingerprint_shared_directory()
+    test_fingerprint_texts_on_disk()
+    test_batch_collusion()
+    test_section_rechecks()
+    test_check_paper_endpoint()
+    test_settings_check_types()
+    test_paraphrase_check()
+    test_paraphrase_incremental_updates()
+    test_aligned_spans()